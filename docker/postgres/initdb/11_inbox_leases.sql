@@ -0,0 +1,17 @@
+-- ============================================
+-- INBOX: LEASE DE PROCESSAMENTO
+-- ============================================
+-- O worker reivindica eventos marcando status = 'processing' + worker_id
+-- e commita na hora. O lease expira em lease_expires_at; o reaper do worker
+-- devolve para 'pending' eventos cujo worker morreu ou travou.
+
+ALTER TABLE webhook_inbox
+    ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_inbox_expired_leases
+ON webhook_inbox (lease_expires_at)
+WHERE status = 'processing';
+
+CREATE INDEX IF NOT EXISTS idx_inbox_processing_order
+ON webhook_inbox (order_id)
+WHERE status = 'processing';
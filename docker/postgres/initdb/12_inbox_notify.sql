@@ -0,0 +1,21 @@
+-- ============================================
+-- INBOX: NOTIFY PARA WAKE-UP DO WORKER
+-- ============================================
+-- Todo INSERT no webhook_inbox emite NOTIFY no canal 'webhook_inbox'.
+-- O worker fica em LISTEN e acorda na hora; o polling vira apenas fallback.
+-- Trigger por statement: um INSERT multi-linha gera uma única notificação.
+
+CREATE OR REPLACE FUNCTION notify_webhook_inbox()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('webhook_inbox', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_webhook_inbox_notify ON webhook_inbox;
+
+CREATE TRIGGER trigger_webhook_inbox_notify
+    AFTER INSERT ON webhook_inbox
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_webhook_inbox();
@@ -0,0 +1,14 @@
+-- ============================================
+-- INBOX: ADIAMENTO (CIRCUIT BREAKER)
+-- ============================================
+-- Com o circuito de um endpoint da Cardapioweb aberto, o worker devolve o
+-- evento para 'pending' com available_at no futuro, sem consumir tentativa.
+-- O claim ignora eventos ainda não disponíveis (e os posteriores do mesmo
+-- pedido, preservando a ordem).
+
+ALTER TABLE webhook_inbox
+    ADD COLUMN IF NOT EXISTS available_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_inbox_deferred_order
+ON webhook_inbox (order_id, received_at)
+WHERE status = 'pending' AND available_at IS NOT NULL;
@@ -0,0 +1,21 @@
+-- ============================================
+-- MERCHANTS: NOTIFY PARA INVALIDAR O CACHE DE CONFIGURAÇÃO
+-- ============================================
+-- Toda alteração em merchants emite NOTIFY no canal 'merchant_config' com o
+-- merchant_id. O worker fica em LISTEN e descarta a configuração em memória;
+-- o TTL do cache cobre processos que não estão escutando.
+
+CREATE OR REPLACE FUNCTION notify_merchant_config()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('merchant_config', COALESCE(NEW.merchant_id, OLD.merchant_id));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_merchants_config_notify ON merchants;
+
+CREATE TRIGGER trigger_merchants_config_notify
+    AFTER INSERT OR UPDATE OR DELETE ON merchants
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_merchant_config();
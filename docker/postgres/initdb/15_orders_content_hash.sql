@@ -0,0 +1,9 @@
+-- ============================================
+-- ORDERS: HASH DO CONTEÚDO (DIFF DE RE-ENRIQUECIMENTO)
+-- ============================================
+-- Hash compacto do payload normalizado da API Partner (+ distância). Quando
+-- o re-enriquecimento (closed, backfill, retries) traz o mesmo conteúdo, o
+-- upsert não reescreve a linha nem apaga/regrava itens e pagamentos.
+
+ALTER TABLE orders
+    ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32);
@@ -0,0 +1,9 @@
+-- ============================================
+-- INBOX: CLAIM DO EVENTO MAIS ANTIGO POR PEDIDO
+-- ============================================
+-- O claim só entrega o evento mais antigo em aberto de cada pedido
+-- (NOT EXISTS sobre eventos anteriores 'pending'/'processing').
+
+CREATE INDEX IF NOT EXISTS idx_inbox_open_order
+ON webhook_inbox (order_id, received_at, event_id)
+WHERE status IN ('pending', 'processing');
@@ -0,0 +1,140 @@
+"""
+Benchmark da gravação de itens e pagamentos de pedido (requer Postgres).
+
+Compara, por pedido:
+- caminho antigo: DELETE + um INSERT por item e por pagamento (N round trips);
+- caminho em lote: DELETE + um INSERT ... SELECT FROM unnest(arrays) por tabela.
+
+Tudo roda numa transação que é desfeita no final (nada fica no banco); só
+exige a loja padrão cadastrada em `merchants`.
+
+Uso: python -m scripts.bench_order_relations [pedidos] [itens_por_pedido] [pagamentos_por_pedido]
+"""
+
+import asyncio
+import sys
+import time
+
+from sqlalchemy import text
+
+from src.config import settings
+from src.core.services.order_enrichment import OrderEnrichmentService
+from src.infrastructure.db.connection import close_db, get_session_maker
+
+FIRST_FAKE_ORDER_ID = 9_900_000_000
+
+
+def build_order_data(items_per_order: int, payments_per_order: int) -> dict:
+    return {
+        "items": [
+            {
+                "item_id": 1000 + i,
+                "name": f"Item {i}",
+                "quantity": 2,
+                "unit_price": 12.5,
+                "total_price": 25.0,
+                "category_name": "Lanches",
+            }
+            for i in range(items_per_order)
+        ],
+        "payments": [
+            {
+                "payment_method": "Cartão",
+                "payment_type": "online",
+                "total": 25.0,
+                "status": "paid",
+                "payment_fee": 0.5,
+            }
+            for _ in range(payments_per_order)
+        ],
+    }
+
+
+async def legacy_path(session, service, order_id: int, order_data: dict):
+    await session.execute(
+        text("DELETE FROM order_items WHERE order_id = :id"), {"id": order_id}
+    )
+    await session.execute(
+        text("DELETE FROM order_payments WHERE order_id = :id"), {"id": order_id}
+    )
+    for item in order_data["items"]:
+        await session.execute(
+            text("""
+                INSERT INTO order_items (order_id, item_id, name, quantity, unit_price, total_price, category_name)
+                VALUES (:order_id, :item_id, :name, :quantity, :unit_price, :total_price, :category_name)
+            """),
+            service._item_row(order_id, item),
+        )
+    for pay in order_data["payments"]:
+        await session.execute(
+            text("""
+                INSERT INTO order_payments (
+                    order_id, payment_method, payment_type, total_value,
+                    change_for, status, card_number, card_brand, observation, payment_fee
+                )
+                VALUES (
+                    :order_id, :payment_method, :payment_type, :total_value,
+                    :change_for, :status, :card_number, :card_brand, :observation, :payment_fee
+                )
+            """),
+            service._payment_row(order_id, pay),
+        )
+
+
+async def bulk_path(session, service, order_id: int, order_data: dict):
+    await service._replace_relations(session, [(order_id, order_data)])
+
+
+async def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    items_per_order = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    payments_per_order = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    service = OrderEnrichmentService()
+    order_data = build_order_data(items_per_order, payments_per_order)
+    order_ids = list(range(FIRST_FAKE_ORDER_ID, FIRST_FAKE_ORDER_ID + orders))
+
+    async with get_session_maker()() as session:
+        # Expediente e pedidos descartáveis só para satisfazer as FKs (rollback no final)
+        operation_day_id = (
+            await session.execute(
+                text("""
+                    INSERT INTO operation_days (merchant_id, operation_day, start_time, end_time, opened_at, delivery_capacity)
+                    SELECT merchant_id, DATE '1900-01-01', default_start_time, default_end_time, NOW(), 0
+                    FROM merchants WHERE merchant_id = :mid
+                    RETURNING id
+                """),
+                {"mid": str(settings.default_merchant_id)},
+            )
+        ).scalar()
+        if operation_day_id is None:
+            raise SystemExit("Loja padrão (DEFAULT_MERCHANT_ID) não cadastrada em merchants.")
+
+        await session.execute(
+            text("""
+                INSERT INTO orders (id, merchant_id, operation_day_id, created_at, order_type, status, total_value)
+                SELECT id, :mid, :op_id, NOW(), 'delivery', 'closed', 0 FROM unnest(CAST(:ids AS BIGINT[])) AS id
+            """),
+            {"mid": str(settings.default_merchant_id), "op_id": operation_day_id, "ids": order_ids},
+        )
+
+        results = {}
+        for name, func in (("legacy", legacy_path), ("bulk", bulk_path)):
+            await func(session, service, order_ids[0], order_data)  # warm-up
+            started = time.perf_counter()
+            for order_id in order_ids:
+                await func(session, service, order_id, order_data)
+            results[name] = (time.perf_counter() - started) / orders * 1000
+
+        await session.rollback()
+
+    await close_db()
+
+    print(f"{orders} pedidos | {items_per_order} itens | {payments_per_order} pagamentos")
+    for name, ms in results.items():
+        print(f"{name:>8}: {ms:7.2f} ms/pedido")
+    print(f"{'speedup':>8}: {results['legacy'] / results['bulk']:7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Benchmark de CPU do parsing de webhooks (sem rede, sem banco).
+
+Compara, por requisição:
+- caminho antigo: json.loads (FastAPI) -> WebhookPayload(**payload, raw_payload=payload)
+  -> json.dumps para o JSONB do inbox;
+- fast path: WebhookEnvelope.model_validate_json(bytes) -> bytes.decode() direto
+  para o JSONB.
+
+Uso: python -m scripts.bench_webhook_ingest [iterações]
+"""
+
+import json
+import sys
+import timeit
+
+from src.core.models.webhook import WebhookEnvelope, WebhookPayload
+
+SAMPLE_BODY = json.dumps(
+    {
+        "event_id": "1psu56ytdo8ztk53rir",
+        "event_type": "ORDER_STATUS_UPDATED",
+        "merchant_id": 6758,
+        "order_id": 182564627,
+        "order_status": "released",
+        "created_at": "2026-02-09T18:30:41-03:00",
+        "cancellation_reason": None,
+        "extra": {"source": "cardapioweb", "tags": ["a", "b", "c"], "attempt": 1},
+    }
+).encode()
+
+
+def legacy_path(body: bytes) -> str:
+    payload = json.loads(body)
+    webhook_payload = WebhookPayload(**payload, raw_payload=payload)
+    return json.dumps(webhook_payload.raw_payload, default=str)
+
+
+def fast_path(body: bytes) -> str:
+    envelope = WebhookEnvelope.model_validate_json(body)
+    assert envelope.event_id
+    return body.decode("utf-8")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    results = {}
+    for name, func in (("legacy", legacy_path), ("fast_path", fast_path)):
+        func(SAMPLE_BODY)  # warm-up
+        seconds = min(
+            timeit.repeat(lambda f=func: f(SAMPLE_BODY), number=iterations, repeat=3)
+        )
+        results[name] = seconds / iterations * 1_000_000
+
+    for name, usec in results.items():
+        print(f"{name:>10}: {usec:7.2f} µs/req")
+
+    saving = 1 - results["fast_path"] / results["legacy"]
+    print(f"{'economia':>10}: {saving:7.1%} de CPU por requisição")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,13 @@ import secrets
 from fastapi import HTTPException, Request, status
 
 from src.config import settings
+from src.infrastructure.cache.local_rate_limiter import local_rate_limiter
 from src.infrastructure.cache.redis_client import redis_client
 
+# Limite de 100 requisições a cada 10 segundos por IP
+WEBHOOK_RATE_LIMIT = 100
+WEBHOOK_RATE_WINDOW_SECONDS = 10
+
 
 async def verify_payload_size(request: Request):
     """Bloqueia payloads maiores que 500KB para evitar Memory Exhaustion (DDoS)."""
@@ -21,17 +26,39 @@ async def verify_payload_size(request: Request):
 
 
 async def rate_limiter(request: Request):
-    """Limita a quantidade de requisições por IP usando Redis."""
-    await redis_client.connect()
+    """
+    Limita a quantidade de requisições por IP (sliding window no Redis).
 
+    Com RATE_LIMIT_LOCAL_PRECHECK, floods que já estouraram o limite só neste
+    processo são recusados sem consultar o Redis.
+    """
     # Usa o IP do cliente como chave. Em produção com proxy (Nginx/Cloudflare), use X-Forwarded-For
     client_ip = request.client.host if request.client else "unknown"
     key = f"rate_limit:webhook:{client_ip}"
 
-    # Limite de 100 requisições a cada 10 segundos por IP
-    allowed, remaining = await redis_client.check_rate_limit(
-        key, max_requests=100, window_seconds=10
-    )
+    if settings.rate_limit_local_precheck and local_rate_limiter.is_over_limit(
+        key, WEBHOOK_RATE_LIMIT, WEBHOOK_RATE_WINDOW_SECONDS
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please slow down.",
+        )
+
+    try:
+        await redis_client.connect()
+
+        allowed, remaining = await redis_client.check_rate_limit(
+            key,
+            max_requests=WEBHOOK_RATE_LIMIT,
+            window_seconds=WEBHOOK_RATE_WINDOW_SECONDS,
+        )
+    except Exception:
+        if not settings.spool_enabled:
+            raise
+        # Redis fora: o limite local decide e o webhook segue para o spool
+        allowed = not local_rate_limiter.is_over_limit(
+            key, WEBHOOK_RATE_LIMIT, WEBHOOK_RATE_WINDOW_SECONDS
+        )
 
     if not allowed:
         raise HTTPException(
@@ -39,6 +66,9 @@ async def rate_limiter(request: Request):
             detail="Too many requests. Please slow down.",
         )
 
+    if settings.rate_limit_local_precheck or settings.spool_enabled:
+        local_rate_limiter.record(key, WEBHOOK_RATE_WINDOW_SECONDS)
+
 
 async def verify_webhook_token(request: Request) -> bool:
     """
@@ -2,19 +2,26 @@
 # ADMIN ROUTES - PORTAL DO CLIENTE
 # =================================
 
-from fastapi import APIRouter, Depends, status, BackgroundTasks, HTTPException
+from datetime import datetime, timedelta
+from typing import Annotated
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timedelta
 
-from src.infrastructure.db.connection import get_db
-from src.infrastructure.cache.redis_client import redis_client
-from src.core.services.reconciliation_service import ReconciliationService
 from src.core.services.historical_sync_service import HistoricalSyncService
+from src.core.services.reconciliation_service import ReconciliationService
+from src.infrastructure.cache.merchant_config import merchant_configs
+from src.infrastructure.cache.redis_client import redis_client
+from src.infrastructure.db.connection import get_db
+from src.infrastructure.db.notifications import MERCHANT_CONFIG_CHANNEL
 
 router = APIRouter()
 
+# Sessão do banco por request (dependência compartilhada pelos endpoints)
+DbSession = Annotated[AsyncSession, Depends(get_db)]
+
 # -----------------------------------------------------------------------------
 # SCHEMAS (Pydantic Models)
 # -----------------------------------------------------------------------------
@@ -40,7 +47,7 @@ class SyncHistoryRequest(BaseModel):
 async def inject_merchant_credentials(
     merchant_id: str,
     payload: InjectCredentialsPayload,
-    session: AsyncSession = Depends(get_db)
+    session: DbSession
 ):
     """
     Salva ou atualiza as credenciais do lojista no banco de dados e marca o status como ACTIVE.
@@ -75,6 +82,27 @@ async def inject_merchant_credentials(
     }
 
 
+@router.post(
+    "/merchants/{merchant_id}/config/invalidate",
+    status_code=status.HTTP_200_OK,
+    summary="Descarta a configuração da loja em cache (API e worker)"
+)
+async def invalidate_merchant_config(
+    merchant_id: str,
+    session: DbSession
+):
+    """Use após alterar a tabela merchants por fora do trigger (ex.: restore, réplica)."""
+    merchant_configs.invalidate(merchant_id)
+
+    # O worker escuta o canal e descarta o cache dele também
+    await session.execute(
+        text("SELECT pg_notify(:channel, :mid)"),
+        {"channel": MERCHANT_CONFIG_CHANNEL, "mid": merchant_id}
+    )
+
+    return {"status": "success", "message": f"Configuração da loja {merchant_id} será recarregada."}
+
+
 @router.post(
     "/merchants/{merchant_id}/shifts/close", 
     status_code=status.HTTP_200_OK,
@@ -83,7 +111,7 @@ async def inject_merchant_credentials(
 async def close_merchant_shift(
     merchant_id: str,
     background_tasks: BackgroundTasks,
-    session: AsyncSession = Depends(get_db)
+    session: DbSession
 ):
     """Atualiza a tabela operation_days e agenda a reconciliação no background."""
     query = text("""
@@ -131,7 +159,7 @@ async def close_merchant_shift(
 async def sync_merchant_history(
     merchant_id: str,
     payload: SyncHistoryRequest,
-    session: AsyncSession = Depends(get_db)
+    session: DbSession
 ):
     """Enfileira um Job de Backfill e trava concorrência."""
     if payload.start_date > payload.end_date:
@@ -158,7 +186,7 @@ async def sync_merchant_history(
 
 
 @router.get("/merchants/{merchant_id}/sync-status", status_code=status.HTTP_200_OK)
-async def get_sync_status(merchant_id: str, session: AsyncSession = Depends(get_db)):
+async def get_sync_status(merchant_id: str, session: DbSession):
     """Rota para o Front-end consultar e montar a Barra de Progresso."""
     query = text("""
         SELECT id, start_date, end_date, status, total_shifts, processed_shifts, error_message, updated_at
@@ -191,4 +219,18 @@ async def unlock_merchant_sync(merchant_id: str):
     """ROTA DE EMERGÊNCIA: Remove a trava presa no Redis caso um Hard Crash ocorra."""
     lock_key = f"backfill_lock:{merchant_id}"
     await redis_client.delete(lock_key)
-    return {"message": f"Lock de sincronização removido à força para {merchant_id}."}
\ No newline at end of file
+    return {"message": f"Lock de sincronização removido à força para {merchant_id}."}
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK)
+async def get_runtime_metrics():
+    """Contadores operacionais compartilhados no Redis (ex.: hits/misses do cache de pedidos)."""
+    metrics = await redis_client.get_metrics()
+
+    cache = metrics.setdefault("order_cache", {})
+    for resource in ("partner", "dashboard"):
+        hits = cache.get(f"{resource}_hit", 0)
+        total = hits + cache.get(f"{resource}_miss", 0)
+        cache[f"{resource}_hit_ratio"] = round(hits / total, 4) if total else None
+
+    return {"metrics": metrics}
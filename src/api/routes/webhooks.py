@@ -2,10 +2,9 @@
 # WEBHOOK ROUTES - ENDPOINTS CARDAPIOWEB
 # ============================================
 
-from typing import Any, Dict
-
 from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 
 from src.api.dependencies import (
     check_idempotency,
@@ -15,7 +14,7 @@ from src.api.dependencies import (
     rate_limiter,
 )
 from src.config import settings
-from src.core.models.webhook import WebhookPayload, WebhookResponse
+from src.core.models.webhook import WebhookEnvelope, WebhookPayload, WebhookResponse
 from src.core.services.inbox_processor import InboxProcessor
 
 router = APIRouter()
@@ -39,24 +38,33 @@ router = APIRouter()
     - `202 Accepted`: Evento aceito e enfileirado
     - `200 OK`: Evento duplicado (já processado)
     - `401/403`: Token inválido
-    """
+    """,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": WebhookPayload.model_json_schema()}
+            },
+        }
+    },
 )
 async def receive_order_webhook(
     request: Request,
-    payload: Dict[str, Any],
     correlation_id: str = Depends(get_correlation_id),
     _token_valid: bool = Depends(verify_webhook_token)
 ):
     """
     Recebe webhook de pedido do Cardapioweb.
+    
+    Fast path: lê os bytes crus uma única vez, valida só o envelope
+    (event_id, order_id, event_type, order_status) e grava o corpo original
+    como JSONB, sem dict intermediário.
     """
-    # Construir modelo Pydantic (validação automática)
+    raw_body = await request.body()
+    
     try:
-        webhook_payload = WebhookPayload(
-            **payload,
-            raw_payload=payload  # Preserva payload original
-        )
-    except Exception as e:
+        webhook_payload = WebhookEnvelope.model_validate_json(raw_body)
+    except ValidationError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid payload: {str(e)}"
@@ -66,7 +74,8 @@ async def receive_order_webhook(
     processor = InboxProcessor()
     result_status, error = await processor.process_webhook(
         webhook_payload,
-        correlation_id=correlation_id
+        correlation_id=correlation_id,
+        raw_body=raw_body
     )
     
     # Responder conforme resultado
@@ -47,15 +47,82 @@ class Settings(BaseSettings):
     webhook_secret_token: str = Field(alias="WEBHOOK_SECRET_TOKEN")
     api_key_header: str = Field(default="X-API-Key", alias="API_KEY_HEADER")
     webhook_token_max_age_seconds: int = 300
+    rate_limit_local_precheck: bool = Field(
+        default=True,
+        alias="RATE_LIMIT_LOCAL_PRECHECK",
+        description="Recusa floods em memória antes de consultar o Redis",
+    )
 
     # --------------------------------------------
     # Worker
     # --------------------------------------------
     worker_enabled: bool = Field(default=True, alias="WORKER_ENABLED")
     worker_poll_interval: int = Field(default=5, alias="WORKER_POLL_INTERVAL")
+    worker_listen_enabled: bool = Field(
+        default=True,
+        alias="WORKER_LISTEN_ENABLED",
+        description="Acorda o worker via LISTEN/NOTIFY; o polling vira fallback",
+    )
     worker_batch_size: int = Field(default=10, alias="WORKER_BATCH_SIZE")
+    worker_concurrency: int = Field(
+        default=4,
+        alias="WORKER_CONCURRENCY",
+        description="Pedidos processados em paralelo por lote (1 = modo sequencial)",
+    )
     worker_max_retries: int = 3
     worker_retry_delay: int = 5
+    worker_lease_seconds: int = Field(
+        default=300,
+        alias="WORKER_LEASE_SECONDS",
+        description="Tempo máximo que um evento reivindicado fica reservado a um worker",
+    )
+    worker_reaper_interval: int = Field(default=30, alias="WORKER_REAPER_INTERVAL")
+    worker_sync_concurrency: int = Field(
+        default=1,
+        alias="WORKER_SYNC_CONCURRENCY",
+        description="Jobs de sincronização histórica executados em paralelo",
+    )
+    worker_sync_poll_interval: int = Field(default=15, alias="WORKER_SYNC_POLL_INTERVAL")
+
+    # --------------------------------------------
+    # Ingestão (Inbox)
+    # --------------------------------------------
+    inbox_ingestion_mode: str = Field(
+        default="postgres",
+        alias="INBOX_INGESTION_MODE",
+        description="postgres = grava direto no inbox; stream = Redis Stream + persister",
+    )
+    inbox_stream_key: str = "webhook:inbox:stream"
+    inbox_stream_group: str = "inbox_persisters"
+    inbox_stream_batch_size: int = Field(default=500, alias="INBOX_STREAM_BATCH_SIZE")
+    inbox_stream_block_ms: int = 1000
+    inbox_stream_claim_idle_ms: int = 60_000
+    # Entradas que o Postgres rejeita (dado inválido) saem do stream principal para cá
+    inbox_stream_dead_letter_key: str = "webhook:inbox:dead_letter"
+    inbox_batch_enabled: bool = Field(
+        default=True,
+        alias="INBOX_BATCH_ENABLED",
+        description="Agrupa webhooks concorrentes em um INSERT multi-linha",
+    )
+    inbox_batch_max_size: int = Field(default=200, alias="INBOX_BATCH_MAX_SIZE")
+    inbox_batch_linger_ms: int = Field(default=2, alias="INBOX_BATCH_LINGER_MS")
+    recent_events_filter_enabled: bool = Field(
+        default=True,
+        alias="RECENT_EVENTS_FILTER_ENABLED",
+        description="Responde duplicatas recentes em memória, antes do Redis",
+    )
+    recent_events_ttl_seconds: int = Field(default=300, alias="RECENT_EVENTS_TTL_SECONDS")
+    recent_events_max_entries: int = Field(
+        default=50_000, alias="RECENT_EVENTS_MAX_ENTRIES"
+    )
+    spool_enabled: bool = Field(
+        default=True,
+        alias="SPOOL_ENABLED",
+        description="Grava webhooks em disco quando Postgres/Redis estão indisponíveis",
+    )
+    spool_dir: str = Field(default="spool", alias="SPOOL_DIR")
+    spool_drain_interval: int = Field(default=5, alias="SPOOL_DRAIN_INTERVAL")
+    spool_backend_retry_seconds: int = 5
 
     # --------------------------------------------
     # Cardapioweb APIs (Etapa 4) - COM VALIDAÇÃO
@@ -67,6 +134,59 @@ class Settings(BaseSettings):
     cardapioweb_dashboard_api_key: str = Field(alias="CARDAPIOWEB_DASHBOARD_API_KEY")
     cardapioweb_refresh_token: str = Field(alias="CARDAPIOWEB_REFRESH_TOKEN")
     cardapioweb_api_timeout: int = Field(default=10, alias="CARDAPIOWEB_API_TIMEOUT")
+    cardapioweb_token_refresh_margin: int = Field(
+        default=300,
+        alias="CARDAPIOWEB_TOKEN_REFRESH_MARGIN",
+        description="Segundos antes da expiração em que o token de acesso é renovado em background",
+    )
+    cardapioweb_token_refresh_lock_ttl: int = Field(
+        default=30, alias="CARDAPIOWEB_TOKEN_REFRESH_LOCK_TTL"
+    )
+    cardapioweb_http2: bool = Field(
+        default=True,
+        alias="CARDAPIOWEB_HTTP2",
+        description="Usa HTTP/2 quando o pacote h2 estiver instalado",
+    )
+    cardapioweb_max_connections: int = Field(
+        default=20, alias="CARDAPIOWEB_MAX_CONNECTIONS"
+    )
+    cardapioweb_max_keepalive: int = Field(default=10, alias="CARDAPIOWEB_MAX_KEEPALIVE")
+    cardapioweb_keepalive_expiry: int = 30
+    order_cache_enabled: bool = Field(
+        default=True,
+        alias="ORDER_CACHE_ENABLED",
+        description="Cache Redis das respostas de pedido (Partner/Dashboard)",
+    )
+    order_cache_terminal_ttl: int = Field(
+        default=86400, alias="ORDER_CACHE_TERMINAL_TTL"
+    )
+    order_cache_active_ttl: int = Field(default=30, alias="ORDER_CACHE_ACTIVE_TTL")
+    enrichment_batch_concurrency: int = Field(
+        default=8,
+        alias="ENRICHMENT_BATCH_CONCURRENCY",
+        description="Pedidos buscados em paralelo por página no enriquecimento em lote",
+    )
+    merchant_config_ttl: int = Field(
+        default=300,
+        alias="MERCHANT_CONFIG_TTL",
+        description="Segundos que a configuração das lojas fica em memória",
+    )
+    cardapioweb_retry_base_delay: float = Field(
+        default=0.5, alias="CARDAPIOWEB_RETRY_BASE_DELAY"
+    )
+    cardapioweb_retry_max_delay: float = Field(
+        default=8.0, alias="CARDAPIOWEB_RETRY_MAX_DELAY"
+    )
+    cardapioweb_breaker_failure_threshold: int = Field(
+        default=5, alias="CARDAPIOWEB_BREAKER_FAILURE_THRESHOLD"
+    )
+    cardapioweb_breaker_reset_seconds: int = Field(
+        default=30, alias="CARDAPIOWEB_BREAKER_RESET_SECONDS"
+    )
+    # Reconciliação e backfill esperam o circuito reabrir até este total (ao vivo não espera)
+    cardapioweb_breaker_max_wait_seconds: int = Field(
+        default=300, alias="CARDAPIOWEB_BREAKER_MAX_WAIT_SECONDS"
+    )
 
     # --------------------------------------------
     # Cardapioweb APIs - Rate Limits
@@ -81,6 +201,11 @@ class Settings(BaseSettings):
         alias="CARDAPIOWEB_DETAILS_RATE_LIMIT",
         description="Requisições permitidas por minuto na rota aberta de detalhes do CW",
     )
+    cardapioweb_dashboard_rate_limit: int = Field(
+        default=60,
+        alias="CARDAPIOWEB_DASHBOARD_RATE_LIMIT",
+        description="Requisições permitidas por minuto na API de Dashboard do CW",
+    )
 
     # --------------------------------------------
     # Geo
@@ -99,6 +224,15 @@ class Settings(BaseSettings):
             raise ValueError(f"LOG_LEVEL deve ser um de: {allowed}")
         return v_upper
 
+    @field_validator("inbox_ingestion_mode")
+    @classmethod
+    def validate_inbox_ingestion_mode(cls, v: str) -> str:
+        allowed = {"postgres", "stream"}
+        v_lower = v.lower()
+        if v_lower not in allowed:
+            raise ValueError(f"INBOX_INGESTION_MODE deve ser um de: {allowed}")
+        return v_lower
+
     @field_validator("app_env")
     @classmethod
     def validate_app_env(cls, v: str) -> str:
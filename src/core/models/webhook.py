@@ -15,7 +15,9 @@ class WebhookPayload(BaseModel):
     Campos obrigatórios para todos os eventos.
     """
 
-    event_id: str = Field(..., description="ID único do evento (para idempotência)")
+    event_id: str = Field(
+        ..., max_length=30, description="ID único do evento (para idempotência)"
+    )
 
     order_id: int | str = Field(..., description="ID do pedido no Cardapioweb")
     event_type: str = Field(
@@ -70,6 +72,28 @@ class WebhookPayload(BaseModel):
         }
 
 
+class WebhookEnvelope(BaseModel):
+    """
+    Envelope mínimo do webhook, validado direto dos bytes crus.
+
+    Usado no fast path do endpoint: `model_validate_json` faz parse + validação
+    no pydantic-core sem montar dict Python, e o corpo original segue intacto
+    para o JSONB do inbox. Campos extras são ignorados.
+    """
+
+    # webhook_inbox.event_id é VARCHAR(30): id maior vira 422, não erro no lote
+    event_id: str = Field(max_length=30)
+    order_id: int | str
+    event_type: str
+    merchant_id: int | str
+    order_status: str | None = None
+
+    @field_validator("event_type")
+    @classmethod
+    def validate_event_type(cls, v: str) -> str:
+        return v.upper()
+
+
 class OrderCreatedPayload(WebhookPayload):
     """Payload específico para ORDER_CREATED."""
 
@@ -1,13 +1,12 @@
-import asyncio
 from datetime import datetime
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from tenacity import retry, wait_exponential, stop_after_attempt
 
 from src.core.logger import logger
 from src.infrastructure.db.connection import get_db_session
 from src.infrastructure.external.cardapioweb_public import CardapiowebPublicAPI
 from src.infrastructure.external.cardapioweb_dashboard import CardapiowebDashboardAPI
+from src.infrastructure.external.quota_governor import ApiPriority, in_priority_lane
 from src.core.services.order_enrichment import OrderEnrichmentService
 from src.core.services.reconciliation_service import ReconciliationService
 from src.infrastructure.cache.redis_client import redis_client
@@ -18,10 +17,6 @@ class HistoricalSyncService:
         self.enrichment_service = OrderEnrichmentService()
         self.reconciliation_service = ReconciliationService()
 
-    @retry(wait=wait_exponential(multiplier=1, min=2, max=10), stop=stop_after_attempt(5))
-    async def _safe_get_orders_history(self, opened_at, closed_at, page):
-        return await self.public_api.get_orders_history_page(opened_at, closed_at, page)
-
     async def _update_job_status(self, session: AsyncSession, job_id: int, status: str, total: int = None, processed: int = None, error: str = None):
         """Atualiza a barra de progresso no banco."""
         updates = ["status = :status", "updated_at = NOW()"]
@@ -41,6 +36,7 @@ class HistoricalSyncService:
         await session.execute(query, params)
         await session.commit()
 
+    @in_priority_lane(ApiPriority.BACKFILL)
     async def run_job(self, job_id: int, merchant_id: str, start_date: datetime, end_date: datetime):
         """Executa a sincronização vinculada a um Job ID e gerencia o Redis Lock."""
         lock_key = f"backfill_lock:{merchant_id}"
@@ -70,8 +66,6 @@ class HistoricalSyncService:
                 
                 async with get_db_session() as session:
                     await self._update_job_status(session, job_id, "processing", processed=index)
-                
-                await asyncio.sleep(7)
 
             async with get_db_session() as session:
                 await self._update_job_status(session, job_id, "completed")
@@ -117,36 +111,31 @@ class HistoricalSyncService:
             shift_internal_id = result.scalar()
             await session.commit()
 
-            page = 1
-            has_more = True
-            while has_more:
-                response = await self._safe_get_orders_history(opened_at, closed_at, page)
-                orders = response if isinstance(response, list) else response.get("data", [])
-                
-                if not orders: break
-
-                for order_data in orders:
-                    order_id = order_data.get("id")
-                    current_status = order_data.get("status")
-
-                    try:
-                        async with session.begin_nested():
-                            await self.enrichment_service.enrich_order(session=session, order_id=order_id, merchant_id=merchant_id)
-                            await session.execute(
-                                text("UPDATE orders SET status = :status, updated_at = NOW() WHERE id = :order_id"),
-                                {"status": current_status, "order_id": order_id}
-                            )
-                    except Exception as e:
-                        logger.error("historical_sync.order_failed", order_id=order_id, error=str(e))
+            # Página N+1 é buscada enquanto a N é enriquecida
+            async for orders in self.public_api.iter_orders_history_pages(opened_at, closed_at, prefetch=True):
+                # Página inteira de uma vez, gravada no expediente deste caixa
+                failures = await self.enrichment_service.enrich_orders(
+                    session, orders, merchant_id, operation_day_id=shift_internal_id
+                )
+                for order_id, error in failures.items():
+                    logger.error("historical_sync.order_failed", order_id=order_id, error=error)
+
+                # Status do histórico prevalece (um UPDATE por página)
+                statuses = {
+                    int(order["id"]): order.get("status")
+                    for order in orders
+                    if order.get("id") is not None and order.get("status")
+                }
+                if statuses:
+                    await session.execute(
+                        text("""
+                            UPDATE orders o SET status = v.status, updated_at = NOW()
+                            FROM unnest(CAST(:ids AS BIGINT[]), CAST(:statuses AS VARCHAR[])) AS v(id, status)
+                            WHERE o.id = v.id AND o.status IS DISTINCT FROM v.status
+                        """),
+                        {"ids": list(statuses), "statuses": list(statuses.values())}
+                    )
 
                 await session.commit()
 
-                if isinstance(response, dict):
-                    has_more = page < response.get("meta", {}).get("last_page", response.get("lastPage", 1))
-                else:
-                    has_more = len(orders) >= 100
-                
-                page += 1
-                await asyncio.sleep(1)
-
         await self.reconciliation_service.run_reconciliation_for_shift(merchant_id, opened_at, closed_at, shift_internal_id)
\ No newline at end of file
@@ -0,0 +1,165 @@
+# ============================================
+# INBOX BATCH WRITER - INGESTÃO EM LOTE
+# ============================================
+
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.core.logger import logger
+from src.infrastructure.db.connection import get_db_session
+
+# INSERT multi-linha via unnest: 1 statement e 1 commit para o lote inteiro
+INSERT_INBOX_ROWS_QUERY = text("""
+    INSERT INTO webhook_inbox (
+        event_id, order_id, event_type, order_status,
+        payload, status, received_at
+    )
+    SELECT rows.event_id, rows.order_id, rows.event_type, rows.order_status,
+           CAST(rows.payload AS JSONB), 'pending', NOW()
+    FROM unnest(
+        CAST(:event_ids AS VARCHAR[]),
+        CAST(:order_ids AS BIGINT[]),
+        CAST(:event_types AS VARCHAR[]),
+        CAST(:order_statuses AS VARCHAR[]),
+        CAST(:payloads AS TEXT[])
+    ) AS rows(event_id, order_id, event_type, order_status, payload)
+    ON CONFLICT (event_id) DO NOTHING
+    RETURNING event_id
+""")
+
+
+def is_poison_error(error: Exception) -> bool:
+    """Falha do próprio dado (repetir não resolve), não de conectividade com o banco."""
+    if isinstance(error, KeyError | ValueError | TypeError):
+        return True
+    return (
+        isinstance(error, DBAPIError)
+        and not isinstance(error, OperationalError | InterfaceError)
+        and not error.connection_invalidated
+    )
+
+
+async def insert_inbox_rows(session: AsyncSession, rows: list[dict]) -> set[str]:
+    """
+    Insere várias linhas no webhook_inbox em um único statement.
+
+    Cada linha: event_id, order_id, event_type, order_status e payload (JSON já
+    serializado). Retorna os event_ids efetivamente inseridos; os demais já
+    existiam no inbox.
+    """
+    # Mesmo event_id repetido no lote: vale a primeira ocorrência
+    unique_rows = {}
+    for row in rows:
+        unique_rows.setdefault(row["event_id"], row)
+    rows = list(unique_rows.values())
+
+    if not rows:
+        return set()
+
+    result = await session.execute(
+        INSERT_INBOX_ROWS_QUERY,
+        {
+            "event_ids": [row["event_id"] for row in rows],
+            "order_ids": [row["order_id"] for row in rows],
+            "event_types": [row["event_type"] for row in rows],
+            "order_statuses": [row["order_status"] for row in rows],
+            "payloads": [row["payload"] for row in rows],
+        },
+    )
+    return {row[0] for row in result.fetchall()}
+
+
+class InboxBatchWriter:
+    """
+    Agrupa inserts concorrentes no webhook_inbox (group commit).
+
+    O primeiro evento dispara um flush; quem chega enquanto o flush está em
+    andamento entra no lote seguinte. Sob rajada, N webhooks viram um INSERT
+    multi-linha e um commit; cada requisição recebe seu próprio resultado.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = settings.inbox_batch_max_size,
+        linger_ms: int = settings.inbox_batch_linger_ms,
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.linger_seconds = max(0, linger_ms) / 1000
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._flush_task: asyncio.Task | None = None
+
+    async def submit(self, row: dict) -> bool:
+        """Enfileira a linha e aguarda o flush. True = inserida, False = duplicada."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+        return await future
+
+    async def drain(self):
+        """Aguarda o flush em andamento (usado no shutdown)."""
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+
+    async def _flush_loop(self):
+        while self._pending:
+            if self.linger_seconds:
+                await asyncio.sleep(self.linger_seconds)
+
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: len(batch)]
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch: list[tuple[dict, asyncio.Future]]):
+        try:
+            async with get_db_session() as session:
+                inserted = await insert_inbox_rows(session, [row for row, _ in batch])
+        except Exception as e:
+            if is_poison_error(e) and len(batch) > 1:
+                # Uma linha inválida não derruba o lote: só ela falha
+                logger.warning(
+                    "inbox_batch.batch_rejected", size=len(batch), error=str(e)
+                )
+                await self._write_one_by_one(batch)
+                return
+            logger.error("inbox_batch.flush_failed", size=len(batch), error=str(e))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Repetições do mesmo event_id dentro do lote contam como duplicadas
+        resolved = set()
+        for row, future in batch:
+            event_id = row["event_id"]
+            is_new = event_id in inserted and event_id not in resolved
+            resolved.add(event_id)
+            if not future.done():
+                future.set_result(is_new)
+
+        logger.debug(
+            "inbox_batch.flushed", size=len(batch), inserted=len(inserted)
+        )
+
+    async def _write_one_by_one(self, batch: list[tuple[dict, asyncio.Future]]):
+        """Cada linha na sua transação; a exceção vai só para o dono da linha."""
+        for row, future in batch:
+            try:
+                async with get_db_session() as session:
+                    inserted = await insert_inbox_rows(session, [row])
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(row["event_id"] in inserted)
+
+
+# Singleton global
+inbox_batch_writer = InboxBatchWriter()
@@ -3,17 +3,38 @@
 # ============================================
 
 import json
-from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
-
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+import time
+from typing import Any
 
 from src.config import settings
-from src.core.models.webhook import WebhookPayload
+from src.core.logger import logger
+from src.core.models.webhook import WebhookEnvelope, WebhookPayload
+from src.core.services.inbox_batch_writer import (
+    inbox_batch_writer,
+    insert_inbox_rows,
+    is_poison_error,
+)
+from src.core.services.inbox_spool import inbox_spool
+from src.core.services.inbox_stream_persister import stream_fields_from_row
+from src.infrastructure.cache.recent_events import recent_events
 from src.infrastructure.cache.redis_client import redis_client
 from src.infrastructure.db.connection import get_db_session
 
+# Backend que acabou de falhar é pulado por SPOOL_BACKEND_RETRY_SECONDS:
+# durante um restart do DB/Redis cada webhook vai direto para o spool, sem
+# pagar timeout de conexão
+_backend_down_until: dict[str, float] = {}
+
+
+def _backend_available(name: str) -> bool:
+    return time.monotonic() >= _backend_down_until.get(name, 0.0)
+
+
+def _mark_backend_down(name: str, error: Exception) -> None:
+    if _backend_available(name):
+        logger.warning("inbox.backend_unavailable", backend=name, error=str(error))
+    _backend_down_until[name] = time.monotonic() + settings.spool_backend_retry_seconds
+
 
 class InboxProcessor:
     """
@@ -24,6 +45,9 @@ class InboxProcessor:
     2. Verificar duplicatas (Redis)
     3. Inserir no webhook_inbox
     4. Marcar como "processado" no Redis (para deduplicação)
+    
+    Com SPOOL_ENABLED, falhas de Postgres/Redis não viram 500: o evento vai
+    para o spool local em disco e é regravado no inbox depois.
     """
     
     def __init__(self):
@@ -31,91 +55,150 @@ class InboxProcessor:
     
     async def process_webhook(
         self,
-        payload: WebhookPayload,
-        correlation_id: Optional[str] = None
-    ) -> Tuple[str, Optional[str]]:
+        payload: WebhookPayload | WebhookEnvelope,
+        correlation_id: str | None = None,
+        raw_body: bytes | None = None
+    ) -> tuple[str, str | None]:
         """
         Processa webhook recebido.
         
+        Se `raw_body` for informado, os bytes originais vão direto para o JSONB
+        do inbox (sem round trip dict -> JSON).
+        
         Retorna:
             (status, error_message)
             status: "accepted", "duplicate", "error"
         """
+        # 0. Duplicata recente já confirmada por este processo (sem round trip)
+        if settings.recent_events_filter_enabled and recent_events.contains(
+            payload.event_id
+        ):
+            return "duplicate", None
+        
+        # 1. Verificar duplicata + adquirir lock (script Lua, 1 round trip)
+        has_lock = None
+        if _backend_available("redis"):
+            try:
+                has_lock = await redis_client.claim_event(payload.event_id)
+            except Exception as e:
+                if not settings.spool_enabled:
+                    return "error", str(e)
+                # Sem Redis, a deduplicação fica com o ON CONFLICT do inbox
+                _mark_backend_down("redis", e)
+        
+        if has_lock is False:
+            # Já processado ou outro processo está tratando
+            return "duplicate", None
+        
         try:
-            # 1. Verificar duplicata no Redis (rápido)
-            is_duplicate = await redis_client.is_event_processed(payload.event_id)
-            if is_duplicate:
-                return "duplicate", None
-            
-            # 2. Tentar adquirir lock (evita race condition)
-            has_lock = await redis_client.mark_event_processing(payload.event_id)
-            if not has_lock:
-                # Outro processo está tratando, considerar duplicado
-                return "duplicate", None
+            # 2. Inserir no inbox (agrupado com requisições concorrentes),
+            #    publicar no Redis Stream ou, com backends fora, gravar no spool
+            inserted = await self._insert_to_inbox(
+                payload, raw_body, redis_available=has_lock is not None
+            )
             
-            # 3. Inserir no inbox
-            await self._insert_to_inbox(payload)
+            # Só entra no filtro local depois de confirmado no inbox
+            if settings.recent_events_filter_enabled:
+                recent_events.add(payload.event_id)
             
-            # 4. Marcar como processado no Redis (TTL longo)
-            await redis_client.mark_event_processed(
-                payload.event_id,
-                ttl_seconds=86400  # 24 horas
-            )
+            # 3. Marcar como processado (TTL 24h) e liberar lock (1 round trip)
+            if has_lock:
+                try:
+                    await redis_client.finalize_event(
+                        payload.event_id,
+                        ttl_seconds=86400  # 24 horas
+                    )
+                except Exception as e:
+                    if not settings.spool_enabled:
+                        raise
+                    # Evento já está durável; o lock expira sozinho
+                    _mark_backend_down("redis", e)
             
-            # 5. Liberar lock
-            await redis_client.release_event_lock(payload.event_id)
+            if not inserted:
+                # Conflito de PK - já existia no inbox
+                return "duplicate", None
             
             return "accepted", None
             
         except Exception as e:
             # Tentar liberar lock em caso de erro
-            try:
-                await redis_client.release_event_lock(payload.event_id)
-            except:
-                pass
+            if has_lock:
+                try:
+                    await redis_client.release_event_lock(payload.event_id)
+                except:
+                    pass
             
             return "error", str(e)
     
-    async def _insert_to_inbox(self, payload: WebhookPayload) -> None:
-        """Insere evento no webhook_inbox."""
+    async def _insert_to_inbox(
+        self,
+        payload: WebhookPayload | WebhookEnvelope,
+        raw_body: bytes | None = None,
+        redis_available: bool = True
+    ) -> bool:
+        """
+        Insere evento no webhook_inbox.
+        
+        Retorna True se inseriu (ou enfileirou no stream/spool), False se o
+        event_id já existia.
+        
+        Ordem de fallback: Redis Stream (modo stream) -> Postgres -> spool.
+        """
+        row = self._build_inbox_row(payload, raw_body)
+        
+        if settings.inbox_ingestion_mode == "stream" and redis_available:
+            # Persistência assíncrona (InboxStreamPersister no worker);
+            # duplicatas no inbox são resolvidas lá via ON CONFLICT
+            try:
+                await redis_client.stream_add(
+                    settings.inbox_stream_key, stream_fields_from_row(row)
+                )
+                return True
+            except Exception as e:
+                if not settings.spool_enabled:
+                    raise
+                _mark_backend_down("redis", e)
+        
+        if _backend_available("db"):
+            try:
+                return await self._write_row(row)
+            except Exception as e:
+                # Dado rejeitado pelo banco não é queda: só este webhook falha
+                if not settings.spool_enabled or is_poison_error(e):
+                    raise
+                _mark_backend_down("db", e)
+        
+        # Durável em disco: o drainer regrava no inbox quando o banco voltar
+        await inbox_spool.append(row)
+        return True
+    
+    async def _write_row(self, row: dict[str, Any]) -> bool:
+        if settings.inbox_batch_enabled:
+            return await inbox_batch_writer.submit(row)
         
         async with get_db_session() as session:
-            # Preparar payload JSONB
+            inserted = await insert_inbox_rows(session, [row])
+        return row["event_id"] in inserted
+    
+    def _build_inbox_row(
+        self,
+        payload: WebhookPayload | WebhookEnvelope,
+        raw_body: bytes | None = None
+    ) -> dict[str, Any]:
+        """Monta a linha do inbox com os tipos nativos esperados pelas colunas."""
+        # Preparar payload JSONB: bytes originais (fast path) ou dict serializado
+        if raw_body is not None:
+            payload_json = raw_body.decode("utf-8")
+        else:
             raw_payload = payload.raw_payload if payload.raw_payload else payload.model_dump()
-            
-            # --- CONVERSÃO EXPLÍCITA (CASTING) ---
-            # Garante que o driver asyncpg receba exatamente os tipos nativos esperados pelas colunas
-            safe_event_id = str(payload.event_id)
-            safe_order_id = int(payload.order_id)
-            safe_event_type = str(payload.event_type)
-            safe_order_status = str(payload.order_status) if payload.order_status else None
-            # -------------------------------------
-            
-            query = text("""
-                INSERT INTO webhook_inbox (
-                    event_id, order_id, event_type, order_status,
-                    payload, status, received_at
-                ) VALUES (
-                    :event_id, :order_id, :event_type, :order_status,
-                    :payload, 'pending', NOW()
-                )
-                ON CONFLICT (event_id) DO NOTHING
-                RETURNING event_id
-            """)
-            
-            result = await session.execute(
-                query,
-                {
-                    "event_id": safe_event_id,
-                    "order_id": safe_order_id,
-                    "event_type": safe_event_type,
-                    "order_status": safe_order_status,
-                    "payload": json.dumps(raw_payload, default=str)
-                }
-            )
-            
-            # Verificar se inseriu (não foi conflito)
-            row = result.fetchone()
-            if not row:
-                # Conflito de PK - já existe, considerar duplicado
-                raise ValueError(f"Event {payload.event_id} already exists in inbox")
\ No newline at end of file
+            payload_json = json.dumps(raw_payload, default=str)
+        
+        # --- CONVERSÃO EXPLÍCITA (CASTING) ---
+        # Garante que o driver asyncpg receba exatamente os tipos nativos esperados pelas colunas
+        return {
+            "event_id": str(payload.event_id),
+            "order_id": int(payload.order_id),
+            "event_type": str(payload.event_type),
+            "order_status": str(payload.order_status) if payload.order_status else None,
+            "payload": payload_json,
+        }
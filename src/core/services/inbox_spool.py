@@ -0,0 +1,209 @@
+# ============================================
+# INBOX SPOOL - FALLBACK LOCAL EM DISCO
+# ============================================
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+from src.config import settings
+from src.core.logger import logger
+from src.core.services.inbox_batch_writer import insert_inbox_rows, is_poison_error
+from src.infrastructure.db.connection import get_db_session
+
+ACTIVE_FILE = "inbox.spool.jsonl"
+DRAINING_SUFFIX = ".draining"
+# Linhas que o Postgres rejeita (dado inválido): saem do replay para cá
+DEAD_LETTER_FILE = "inbox.dead_letter.jsonl"
+
+
+class InboxSpool:
+    """
+    Arquivo append-only (JSONL) onde o webhook grava quando Postgres/Redis
+    estão fora, para não devolver 500 à Cardapioweb.
+
+    Escritas concorrentes são agrupadas: um único write + fsync por lote
+    (group commit), executado fora do event loop. O drainer rotaciona o
+    arquivo ativo e regrava as linhas no webhook_inbox em lotes; o
+    ON CONFLICT (event_id) torna o replay idempotente. Lote rejeitado por
+    dado inválido é regravado linha a linha e a linha envenenada vai para
+    o arquivo de dead-letter, sem travar os eventos seguintes.
+
+    Pensado para um processo de API por container (uvicorn --workers 1).
+    """
+
+    def __init__(self, directory: str = settings.spool_dir):
+        self.directory = Path(directory)
+        self.path = self.directory / ACTIVE_FILE
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._flush_task: asyncio.Task | None = None
+        self._io_lock = asyncio.Lock()
+
+    async def append(self, row: dict) -> None:
+        """Grava a linha do inbox no spool; retorna só depois do fsync."""
+        line = json.dumps(row, separators=(",", ":"), ensure_ascii=False)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((line, future))
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+        await future
+
+    async def close(self):
+        """Aguarda o flush em andamento (usado no shutdown)."""
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+
+    async def _flush_loop(self):
+        while self._pending:
+            batch = self._pending
+            self._pending = []
+
+            try:
+                async with self._io_lock:
+                    await asyncio.to_thread(
+                        self._write_lines, [line for line, _ in batch]
+                    )
+            except Exception as e:
+                logger.error("spool.write_failed", size=len(batch), error=str(e))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+            logger.warning("spool.appended", size=len(batch), file=str(self.path))
+
+    def _write_lines(self, lines: list[str], path: Path | None = None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(path or self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # Replay
+
+    def has_pending(self) -> bool:
+        if self.path.exists() and self.path.stat().st_size > 0:
+            return True
+        return self.directory.exists() and any(
+            self.directory.glob(f"*{DRAINING_SUFFIX}")
+        )
+
+    async def drain_to_inbox(self, chunk_size: int = 500) -> int:
+        """
+        Regrava o spool no webhook_inbox. Retorna quantos eventos eram novos.
+
+        Se o banco cair no meio, o arquivo .draining permanece e é retomado
+        na próxima rodada (linhas já gravadas viram conflito e são ignoradas).
+        """
+        async with self._io_lock:
+            await asyncio.to_thread(self._rotate)
+
+        total_inserted = 0
+
+        for path in sorted(self.directory.glob(f"*{DRAINING_SUFFIX}")):
+            rows = await asyncio.to_thread(self._read_rows, path)
+            inserted = 0
+
+            for start in range(0, len(rows), chunk_size):
+                inserted += await self._replay_chunk(
+                    path, rows[start : start + chunk_size]
+                )
+
+            await asyncio.to_thread(path.unlink)
+            total_inserted += inserted
+
+            logger.info(
+                "spool.drained", file=path.name, rows=len(rows), inserted=inserted
+            )
+
+        return total_inserted
+
+    async def _replay_chunk(self, path: Path, rows: list[dict]) -> int:
+        """Grava um bloco do spool; se o banco rejeitar o dado, isola linha a linha."""
+        try:
+            async with get_db_session() as session:
+                return len(await insert_inbox_rows(session, rows))
+        except Exception as e:
+            if not is_poison_error(e):
+                raise
+            logger.warning(
+                "spool.chunk_rejected", file=path.name, rows=len(rows), error=str(e)
+            )
+
+        inserted = 0
+        dead_letters = []
+        for row in rows:
+            try:
+                async with get_db_session() as session:
+                    inserted += len(await insert_inbox_rows(session, [row]))
+            except Exception as e:
+                if not is_poison_error(e):
+                    raise
+                logger.error(
+                    "spool.dead_lettered",
+                    file=path.name,
+                    event_id=row.get("event_id"),
+                    error=str(e),
+                )
+                dead_letters.append(
+                    json.dumps(
+                        {**row, "_error": str(e)[:500]},
+                        separators=(",", ":"),
+                        ensure_ascii=False,
+                    )
+                )
+
+        if dead_letters:
+            async with self._io_lock:
+                await asyncio.to_thread(
+                    self._write_lines, dead_letters, self.directory / DEAD_LETTER_FILE
+                )
+        return inserted
+
+    def _rotate(self):
+        """Move o arquivo ativo para .draining; novas escritas abrem outro."""
+        if self.path.exists() and self.path.stat().st_size > 0:
+            target = self.directory / f"inbox.{time.time_ns()}{DRAINING_SUFFIX}"
+            os.replace(self.path, target)
+
+    def _read_rows(self, path: Path) -> list[dict]:
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Linha truncada por queda no meio do write
+                    logger.warning(
+                        "spool.corrupt_line", file=path.name, line=line_number
+                    )
+        return rows
+
+    async def run_drainer(self):
+        """Loop de replay: verifica o spool a cada SPOOL_DRAIN_INTERVAL."""
+        while True:
+            await asyncio.sleep(settings.spool_drain_interval)
+
+            try:
+                if not await asyncio.to_thread(self.has_pending):
+                    continue
+                await self.drain_to_inbox()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("spool.drain_failed", error=str(e))
+
+
+# Singleton global
+inbox_spool = InboxSpool()
@@ -0,0 +1,176 @@
+# ============================================
+# INBOX STREAM PERSISTER - REDIS STREAM -> WEBHOOK_INBOX
+# ============================================
+
+import asyncio
+import os
+import socket
+import time
+
+from src.config import settings
+from src.core.logger import logger
+from src.core.services.inbox_batch_writer import insert_inbox_rows, is_poison_error
+from src.infrastructure.cache.redis_client import redis_client
+from src.infrastructure.db.connection import get_db_session
+
+# Entradas pendentes de consumidores mortos são verificadas com esta frequência
+STALE_CLAIM_INTERVAL_SECONDS = 30
+
+
+def stream_fields_from_row(row: dict) -> dict[str, str]:
+    """Linha do inbox -> campos do stream (Redis só guarda strings)."""
+    return {
+        "event_id": row["event_id"],
+        "order_id": str(row["order_id"]),
+        "event_type": row["event_type"],
+        "order_status": row["order_status"] or "",
+        "payload": row["payload"],
+    }
+
+
+def row_from_stream_fields(fields: dict[str, str]) -> dict:
+    """Campos do stream -> linha do inbox com os tipos das colunas."""
+    return {
+        "event_id": fields["event_id"],
+        "order_id": int(fields["order_id"]),
+        "event_type": fields["event_type"],
+        "order_status": fields.get("order_status") or None,
+        "payload": fields["payload"],
+    }
+
+
+class InboxStreamPersister:
+    """
+    Consome o Redis Stream de ingestão (INBOX_INGESTION_MODE=stream) e grava
+    em lote no webhook_inbox.
+
+    Garantia at-least-once: a entrada só recebe XACK depois do commit no
+    Postgres. Se o processo morrer no meio, outro consumidor assume as
+    pendentes via XAUTOCLAIM e o ON CONFLICT (event_id) absorve a regravação.
+
+    Lote rejeitado por dado inválido (ex.: `\\u0000` no payload) é regravado
+    linha a linha; a entrada que ainda falha vai para o stream de dead-letter
+    e recebe XACK, para não travar o consumo. Falha do banco não descarta nada.
+    """
+
+    def __init__(self):
+        self.running = False
+        self.stream = settings.inbox_stream_key
+        self.group = settings.inbox_stream_group
+        self.consumer = f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = settings.inbox_stream_batch_size
+        self.block_ms = settings.inbox_stream_block_ms
+        self.claim_idle_ms = settings.inbox_stream_claim_idle_ms
+        self.dead_letter_stream = settings.inbox_stream_dead_letter_key
+
+    async def run(self):
+        self.running = True
+        await redis_client.stream_ensure_group(self.stream, self.group)
+
+        logger.info(
+            "inbox_stream.started",
+            stream=self.stream,
+            group=self.group,
+            consumer=self.consumer,
+        )
+
+        last_claim = 0.0
+
+        while self.running:
+            try:
+                entries = []
+
+                now = time.monotonic()
+                if now - last_claim >= STALE_CLAIM_INTERVAL_SECONDS:
+                    entries = await redis_client.stream_claim_stale(
+                        self.stream,
+                        self.group,
+                        self.consumer,
+                        self.claim_idle_ms,
+                        self.batch_size,
+                    )
+                    last_claim = now
+                    if entries:
+                        logger.warning("inbox_stream.stale_claimed", count=len(entries))
+
+                if not entries:
+                    entries = await redis_client.stream_read_group(
+                        self.stream,
+                        self.group,
+                        self.consumer,
+                        self.batch_size,
+                        self.block_ms,
+                    )
+
+                if entries:
+                    await self._persist(entries)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("inbox_stream.persist_error", error=str(e), exc_info=True)
+                await asyncio.sleep(1)
+
+    def stop(self):
+        self.running = False
+
+    async def _persist(self, entries: list[tuple[str, dict[str, str]]]):
+        try:
+            rows = [row_from_stream_fields(fields) for _, fields in entries]
+            async with get_db_session() as session:
+                inserted = await insert_inbox_rows(session, rows)
+        except Exception as e:
+            if not is_poison_error(e):
+                raise
+            logger.warning(
+                "inbox_stream.batch_rejected", entries=len(entries), error=str(e)
+            )
+            await self._persist_one_by_one(entries)
+            return
+
+        await redis_client.stream_ack(
+            self.stream, self.group, [entry_id for entry_id, _ in entries]
+        )
+
+        logger.debug(
+            "inbox_stream.persisted",
+            entries=len(entries),
+            inserted=len(inserted),
+        )
+
+    async def _persist_one_by_one(self, entries: list[tuple[str, dict[str, str]]]):
+        """Isola a entrada envenenada: cada linha na sua transação."""
+        handled = []
+        dead_lettered = 0
+
+        try:
+            for entry_id, fields in entries:
+                try:
+                    row = row_from_stream_fields(fields)
+                    async with get_db_session() as session:
+                        await insert_inbox_rows(session, [row])
+                except Exception as e:
+                    if not is_poison_error(e):
+                        raise
+                    await redis_client.stream_add(
+                        self.dead_letter_stream,
+                        {**fields, "source_entry_id": entry_id, "error": str(e)[:500]},
+                    )
+                    dead_lettered += 1
+                    logger.error(
+                        "inbox_stream.dead_lettered",
+                        entry_id=entry_id,
+                        event_id=fields.get("event_id"),
+                        error=str(e),
+                    )
+                handled.append(entry_id)
+        finally:
+            # O que já foi gravado (ou desviado) sai do PEL mesmo se o banco cair no meio
+            if handled:
+                await redis_client.stream_ack(self.stream, self.group, handled)
+
+        logger.info(
+            "inbox_stream.persisted_one_by_one",
+            entries=len(entries),
+            dead_lettered=dead_lettered,
+        )
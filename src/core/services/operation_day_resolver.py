@@ -0,0 +1,139 @@
+# ============================================
+# OPERATION DAY RESOLVER - EXPEDIENTE CORRENTE POR LOJA
+# ============================================
+
+import asyncio
+import zoneinfo
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.logger import logger
+from src.infrastructure.cache.merchant_config import MerchantConfig, merchant_configs
+from src.infrastructure.db.connection import get_db_session
+
+SAO_PAULO_TZ = zoneinfo.ZoneInfo("America/Sao_Paulo")
+
+
+def logical_date_for(merchant: MerchantConfig, local_now: datetime) -> date:
+    """Data lógica do expediente: turnos que viram a meia-noite pertencem ao dia anterior."""
+    logical_date = local_now.date()
+    if (
+        merchant.default_start_time > merchant.default_end_time
+        and local_now.time() <= merchant.default_end_time
+    ):
+        logical_date = logical_date - timedelta(days=1)
+    return logical_date
+
+
+class OperationDayResolver:
+    """
+    Mantém em memória o id do operation_day corrente de cada loja, indexado
+    pela data lógica calculada.
+
+    Enquanto a data lógica não muda, resolver o expediente de um pedido não
+    toca o banco. Na virada de turno (ou no primeiro pedido do processo) o
+    expediente é buscado/criado numa transação própria, serializada por
+    advisory lock, e os dias anteriores ainda abertos são fechados uma única
+    vez nesse mesmo passo.
+    """
+
+    def __init__(self):
+        self._current: dict[str, tuple[date, int]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def resolve(
+        self, merchant_id: str, session: AsyncSession | None = None
+    ) -> int | None:
+        """Id do expediente corrente. A sessão só é usada para carregar a config da loja."""
+        merchant = await merchant_configs.get(merchant_id, session)
+        if not merchant:
+            return None
+
+        logical_date = logical_date_for(merchant, datetime.now(SAO_PAULO_TZ))
+
+        cached = self._current.get(merchant.merchant_id)
+        if cached and cached[0] == logical_date:
+            return cached[1]
+
+        lock = self._locks.setdefault(merchant.merchant_id, asyncio.Lock())
+        async with lock:
+            cached = self._current.get(merchant.merchant_id)
+            if cached and cached[0] == logical_date:
+                return cached[1]
+
+            operation_day_id = await self._cross_boundary(merchant, logical_date)
+            self._current[merchant.merchant_id] = (logical_date, operation_day_id)
+            return operation_day_id
+
+    def invalidate(self, merchant_id: str | None = None) -> None:
+        if merchant_id is None:
+            self._current.clear()
+        else:
+            self._current.pop(str(merchant_id), None)
+
+    async def _cross_boundary(self, merchant: MerchantConfig, logical_date: date) -> int:
+        """Virada de turno: fecha os dias anteriores e busca/cria o expediente da data."""
+        # Transação própria: o id só entra no cache depois do commit
+        async with get_db_session() as session:
+            # Serializa API e worker criando o mesmo expediente
+            await session.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:lock_key))"),
+                {"lock_key": f"operation_day:{merchant.merchant_id}"},
+            )
+
+            closed_previous = await self._close_previous_days(
+                session, merchant.merchant_id, logical_date
+            )
+
+            result = await session.execute(
+                text(
+                    "SELECT id FROM operation_days WHERE merchant_id = :id AND operation_day = :logical_date LIMIT 1"
+                ),
+                {"id": merchant.merchant_id, "logical_date": logical_date},
+            )
+            row = result.fetchone()
+
+            if row:
+                operation_day_id = row[0]
+            else:
+                result = await session.execute(
+                    text("""
+                    INSERT INTO operation_days (merchant_id, operation_day, start_time, end_time, opened_at, delivery_capacity)
+                    VALUES (:merchant_id, :operation_day, :start_time, :end_time, NOW(), :capacity) RETURNING id;
+                """),
+                    {
+                        "merchant_id": merchant.merchant_id,
+                        "operation_day": logical_date,
+                        "start_time": merchant.default_start_time,
+                        "end_time": merchant.default_end_time,
+                        "capacity": merchant.default_delivery_capacity,
+                    },
+                )
+                operation_day_id = result.scalar_one()
+
+        logger.info(
+            "operation_day.boundary_crossed",
+            merchant_id=merchant.merchant_id,
+            operation_day=str(logical_date),
+            operation_day_id=operation_day_id,
+            closed_previous=closed_previous,
+            created=row is None,
+        )
+        return operation_day_id
+
+    async def _close_previous_days(
+        self, session: AsyncSession, merchant_id: str, logical_date: date
+    ) -> int:
+        result = await session.execute(
+            text(
+                "UPDATE operation_days SET closed_at = NOW() WHERE merchant_id = :id AND operation_day < :logical_date AND closed_at IS NULL"
+            ),
+            {"id": merchant_id, "logical_date": logical_date},
+        )
+        return result.rowcount
+
+
+# Singleton global
+operation_day_resolver = OperationDayResolver()
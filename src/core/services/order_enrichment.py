@@ -3,41 +3,239 @@
 # ORDER ENRICHMENT SERVICE
 # ============================================
 
+import asyncio
+import contextlib
+import hashlib
 import json
-import zoneinfo
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config import settings
+from src.core.logger import logger
 from src.core.services.geo_service import GeoService
+from src.core.services.operation_day_resolver import operation_day_resolver
+from src.infrastructure.cache.merchant_config import MerchantConfig, merchant_configs
+from src.infrastructure.cache.redis_client import redis_client
 from src.infrastructure.external.cardapioweb_dashboard import CardapiowebDashboardAPI
 from src.infrastructure.external.cardapioweb_public import CardapiowebPublicAPI
 
+# Contadores de gravação de pedidos (skipped = conteúdo igual, nada reescrito)
+WRITE_METRICS_NAME = "order_writes"
+
 
 class OrderEnrichmentService:
     def __init__(self):
         self.geo = GeoService()
 
     async def enrich_order(
-        self, session: AsyncSession, order_id: int, merchant_id: str
+        self,
+        session: AsyncSession,
+        order_id: int,
+        merchant_id: str,
+        status_hint: str | None = None,
     ) -> tuple[bool, str | None]:
+        """Busca e grava o pedido usando uma sessão já aberta pelo chamador."""
+        try:
+            payloads = await self.fetch_order_payloads(order_id, status_hint)
+        except Exception as e:
+            return False, str(e)
+
+        return await self.persist_order(session, order_id, merchant_id, payloads)
+
+    async def enrich_orders(
+        self,
+        session: AsyncSession,
+        orders: list[dict],
+        merchant_id: str,
+        operation_day_id: int | None = None,
+    ) -> dict[int, str]:
+        """
+        Enriquece uma página inteira (itens do histórico: `id` e `status`).
+
+        Config da loja e expediente são resolvidos uma vez; as chamadas
+        Partner/Dashboard saem em paralelo (a cota de saída dita o ritmo) e
+        pedidos, itens e pagamentos são gravados com SQL set-based. Se o
+        lote falhar no banco, cai para a gravação pedido a pedido.
+
+        Retorna {order_id: erro} dos pedidos que não foram gravados.
+        """
+        pending = {}
+        for entry in orders:
+            if entry.get("id") is not None:
+                pending[int(entry["id"])] = entry.get("status")
+
+        if not pending:
+            return {}
+
+        merchant = await merchant_configs.get(merchant_id, session)
+        if operation_day_id is None:
+            operation_day_id = await operation_day_resolver.resolve(merchant_id, session)
+        if not merchant or not operation_day_id:
+            error = "Não foi possível obter/criar operation_day."
+            return {order_id: error for order_id in pending}
+
+        # Fase de I/O: sem transação aberta, limitada pelo semáforo
+        semaphore = asyncio.Semaphore(settings.enrichment_batch_concurrency)
+
+        async def fetch(order_id: int, status_hint: str | None):
+            async with semaphore:
+                try:
+                    return await self.fetch_order_payloads(order_id, status_hint)
+                except Exception as e:
+                    return e
+
+        fetched = await asyncio.gather(
+            *(fetch(order_id, status) for order_id, status in pending.items())
+        )
+
+        failures: dict[int, str] = {}
+        # order_id -> (order_data, payloads, linha de orders)
+        ready: dict[int, tuple[dict, tuple[dict, dict | None], dict]] = {}
+
+        for order_id, payloads in zip(pending, fetched, strict=True):
+            if isinstance(payloads, Exception):
+                failures[order_id] = str(payloads)
+                continue
+
+            partner_data, dashboard_data = payloads
+            if not partner_data or partner_data.get("_api_error"):
+                failures[order_id] = f"API Partner falhou para order {order_id}"
+                continue
+
+            order_data = self._extract_from_partner(partner_data)
+            distance_km, distance_zone = self._distance_for(
+                merchant, order_data.get("delivery_address", {})
+            )
+            row = self._order_row(
+                order_id, merchant_id, operation_day_id, order_data, distance_km, distance_zone
+            )
+            ready[order_id] = (order_data, payloads, row)
+
+        if not ready:
+            return failures
+
+        # Fase de escrita set-based
+        try:
+            async with session.begin_nested():
+                written = await self._upsert_orders(
+                    session, [row for _, _, row in ready.values()]
+                )
+                await self._replace_relations(
+                    session,
+                    [(order_id, ready[order_id][0]) for order_id in ready if order_id in written],
+                )
+                for order_id, (_, (_, dashboard_data), _) in ready.items():
+                    if dashboard_data and not dashboard_data.get("_api_error"):
+                        await self._update_with_dashboard_data(
+                            session, order_id, dashboard_data
+                        )
+        except Exception as e:
+            logger.warning(
+                "enrichment.batch_write_failed",
+                size=len(ready),
+                error=str(e),
+                msg="Lote falhou no banco. Gravando pedido a pedido.",
+            )
+            for order_id, (_, payloads, _) in ready.items():
+                try:
+                    async with session.begin_nested():
+                        ok, error = await self.persist_order(
+                            session,
+                            order_id,
+                            merchant_id,
+                            payloads,
+                            operation_day_id=operation_day_id,
+                        )
+                        if not ok:
+                            raise RuntimeError(error)
+                except Exception as order_error:
+                    failures[order_id] = str(order_error)
+            return failures
+
+        if written:
+            await self._count_write("written", len(written))
+        if len(ready) > len(written):
+            await self._count_write("skipped", len(ready) - len(written))
+        return failures
+
+    async def fetch_order_payloads(
+        self, order_id: int, status_hint: str | None = None
+    ) -> tuple[dict | None, dict | None]:
+        """
+        Fase de I/O do enriquecimento: chama as APIs sem tocar no banco.
+
+        Retorna (partner_data, dashboard_data). Deve rodar FORA de qualquer
+        transação para não segurar conexão do pool durante as chamadas HTTP.
+
+        Se o chamador já sabe que o pedido está `released` (`status_hint`),
+        Partner e Dashboard são buscados em paralelo; a resposta do Dashboard
+        é descartada se o Partner mostrar que não é delivery.
+        """
+        dashboard_task = None
+        if status_hint and self._normalize_status(status_hint) == "released":
+            dashboard_task = asyncio.create_task(self._fetch_dashboard(order_id))
+
         try:
             async with CardapiowebPublicAPI() as api_public:
                 partner_data = await api_public.get_order(order_id)
+        except BaseException:
+            await self._discard(dashboard_task)
+            raise
+
+        if not partner_data or partner_data.get("_api_error"):
+            await self._discard(dashboard_task)
+            return partner_data, None
+
+        order_data = self._extract_from_partner(partner_data)
+        if not self._should_call_dashboard(order_data):
+            await self._discard(dashboard_task)
+            return partner_data, None
+
+        if dashboard_task is not None:
+            dashboard_data = await dashboard_task
+        else:
+            dashboard_data = await self._fetch_dashboard(order_id)
+
+        return partner_data, dashboard_data
+
+    async def _fetch_dashboard(self, order_id: int) -> dict | None:
+        async with CardapiowebDashboardAPI() as api_dash:
+            return await api_dash.get_order_details(order_id)
+
+    async def _discard(self, task: asyncio.Task | None) -> None:
+        """Cancela a busca especulativa do Dashboard que não será usada."""
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def persist_order(
+        self,
+        session: AsyncSession,
+        order_id: int,
+        merchant_id: str,
+        payloads: tuple[dict | None, dict | None],
+        operation_day_id: int | None = None,
+    ) -> tuple[bool, str | None]:
+        """Fase de escrita do enriquecimento: apenas banco, sem chamadas externas."""
+        partner_data, dashboard_data = payloads
 
-            if not partner_data or partner_data.get("_api_error"):
-                return False, f"API Partner falhou para order {order_id}"
+        if not partner_data or partner_data.get("_api_error"):
+            return False, f"API Partner falhou para order {order_id}"
 
+        try:
             order_data = self._extract_from_partner(partner_data)
 
             distance_km, distance_zone = await self._calculate_distance(
                 session, order_data.get("delivery_address", {}), merchant_id
             )
 
-            operation_day_id = await self._get_or_create_operation_day(
-                session, merchant_id
-            )
+            if operation_day_id is None:
+                operation_day_id = await operation_day_resolver.resolve(
+                    merchant_id, session
+                )
 
             if not operation_day_id:
                 return False, "Não foi possível obter/criar operation_day."
@@ -52,75 +250,16 @@ class OrderEnrichmentService:
                 distance_zone=distance_zone,
             )
 
-            if self._should_call_dashboard(order_data):
-                async with CardapiowebDashboardAPI() as api_dash:
-                    dashboard_data = await api_dash.get_order_details(order_id)
-
-                    if dashboard_data and not dashboard_data.get("_api_error"):
-                        await self._update_with_dashboard_data(
-                            session, order_id, dashboard_data
-                        )
+            if dashboard_data and not dashboard_data.get("_api_error"):
+                await self._update_with_dashboard_data(
+                    session, order_id, dashboard_data
+                )
 
             return True, None
 
         except Exception as e:
             return False, str(e)
 
-    async def _get_or_create_operation_day(
-        self, session: AsyncSession, merchant_id: str
-    ) -> int | None:
-        result = await session.execute(
-            text(
-                "SELECT default_start_time, default_end_time, default_delivery_capacity FROM merchants WHERE merchant_id = :id"
-            ),
-            {"id": str(merchant_id)},
-        )
-        merchant = result.fetchone()
-        if not merchant:
-            return None
-
-        start_time, end_time, capacity = merchant
-        tz = zoneinfo.ZoneInfo("America/Sao_Paulo")
-        local_now = datetime.now(tz)
-        logical_date = local_now.date()
-
-        if start_time > end_time:
-            if local_now.time() <= end_time:
-                logical_date = logical_date - timedelta(days=1)
-
-        await session.execute(
-            text(
-                "UPDATE operation_days SET closed_at = NOW() WHERE merchant_id = :id AND operation_day < :logical_date AND closed_at IS NULL"
-            ),
-            {"id": str(merchant_id), "logical_date": logical_date},
-        )
-
-        result = await session.execute(
-            text(
-                "SELECT id FROM operation_days WHERE merchant_id = :id AND operation_day = :logical_date LIMIT 1"
-            ),
-            {"id": str(merchant_id), "logical_date": logical_date},
-        )
-        row = result.fetchone()
-        if row:
-            return row[0]
-
-        result = await session.execute(
-            text("""
-            INSERT INTO operation_days (merchant_id, operation_day, start_time, end_time, opened_at, delivery_capacity) 
-            VALUES (:merchant_id, :operation_day, :start_time, :end_time, NOW(), :capacity) RETURNING id;
-        """),
-            {
-                "merchant_id": str(merchant_id),
-                "operation_day": logical_date,
-                "start_time": start_time,
-                "end_time": end_time,
-                "capacity": capacity,
-            },
-        )
-        new_row = result.fetchone()
-        return new_row[0] if new_row else None
-
     def _extract_from_partner(self, data: dict) -> dict:
         address = data.get("delivery_address") or data.get("deliveryAddress") or {}
         client = data.get("client") or data.get("customer") or {}
@@ -136,10 +275,8 @@ class OrderEnrichmentService:
         created_dt = None
         raw_created = data.get("created_at")
         if raw_created:
-            try:
+            with contextlib.suppress(ValueError):
                 created_dt = datetime.fromisoformat(str(raw_created))
-            except ValueError:
-                pass
 
         return {
             "uid": str(raw_uid) if raw_uid else None,
@@ -190,17 +327,18 @@ class OrderEnrichmentService:
     async def _calculate_distance(
         self, session: AsyncSession, address: dict, merchant_id: str
     ) -> tuple[float | None, str | None]:
-        result = await session.execute(
-            text(
-                "SELECT address_lat, address_lng, distance_threshold_near, distance_threshold_medium FROM merchants WHERE merchant_id = :id"
-            ),
-            {"id": str(merchant_id)},
-        )
-        merchant = result.fetchone()
+        merchant = await merchant_configs.get(merchant_id, session)
+        return self._distance_for(merchant, address)
+
+    def _distance_for(
+        self, merchant: MerchantConfig | None, address: dict
+    ) -> tuple[float | None, str | None]:
         if not merchant:
             return None, None
 
-        m_lat, m_lng, thresh_near, thresh_med = merchant
+        m_lat, m_lng = merchant.address_lat, merchant.address_lng
+        thresh_near = merchant.distance_threshold_near
+        thresh_med = merchant.distance_threshold_medium
         cust_lat, cust_lng = self.geo.extract_coordinates_from_address(address)
 
         if cust_lat is None or cust_lng is None:
@@ -228,135 +366,226 @@ class OrderEnrichmentService:
         distance_zone: str | None,
     ):
         """Insere a ordem principal E propaga itens e pagamentos."""
+        row = self._order_row(
+            order_id, merchant_id, operation_day_id, order_data, distance_km, distance_zone
+        )
+        written = await self._upsert_orders(session, [row])
 
-        query_order = text("""
-            INSERT INTO orders (
-                id, uid, display_id, merchant_id, operation_day_id, source_event_id, 
-                created_at, order_type, sales_channel, status, cancellation_reason,
-                customer_id, customer_name, customer_phone, customer_orders_count,
-                delivery_address, delivery_neighborhood, delivery_city,
-                total_value, delivery_fee, distance_km, distance_zone
-            ) VALUES (
-                :id, :uid, :display_id, :merchant_id, :operation_day_id, :source_event_id, 
-                :created_at, :order_type, :sales_channel, :status, :cancellation_reason,
-                :customer_id, :customer_name, :customer_phone, :customer_orders_count,
-                :delivery_address, :delivery_neighborhood, :delivery_city,
-                :total_value, :delivery_fee, :distance_km, :distance_zone
-            )
-            ON CONFLICT (id) DO UPDATE SET
-                updated_at = NOW(),
-                status = EXCLUDED.status,
-                cancellation_reason = COALESCE(EXCLUDED.cancellation_reason, orders.cancellation_reason),
-                distance_km = EXCLUDED.distance_km, distance_zone = EXCLUDED.distance_zone
-        """)
+        # Mesmo conteúdo da última gravação: o upsert não tocou a linha
+        if not written:
+            await self._count_write("skipped")
+            return
 
-        await session.execute(
-            query_order,
-            {
-                "id": int(order_id),
-                "uid": order_data.get("uid"),
-                "display_id": order_data.get("display_id"),
-                "merchant_id": str(merchant_id),
-                "operation_day_id": int(operation_day_id),
-                "source_event_id": f"api_partner_{order_id}",
-                "created_at": order_data.get("created_at") or datetime.now(),
-                "order_type": order_data.get("order_type"),
-                "sales_channel": order_data.get("sales_channel"),
-                "status": order_data.get("status", "pending"),
-                "cancellation_reason": order_data.get("cancellation_reason"),
-                "customer_id": order_data.get("customer_id"),
-                "customer_name": order_data.get("customer_name"),
-                "customer_phone": order_data.get("customer_phone"),
-                "customer_orders_count": order_data.get("customer_orders_count"),
-                "delivery_address": json.dumps(order_data.get("delivery_address", {})),
-                "delivery_neighborhood": order_data.get("delivery_neighborhood"),
-                "delivery_city": order_data.get("delivery_city"),
-                "total_value": order_data.get("total_value"),
-                "delivery_fee": order_data.get("delivery_fee"),
-                "distance_km": distance_km,
-                "distance_zone": distance_zone,
-            },
+        # 2. Itens e pagamentos: substituição em lote
+        await self._replace_relations(session, [(int(order_id), order_data)])
+        await self._count_write("written")
+
+    def _order_row(
+        self,
+        order_id: int,
+        merchant_id: str,
+        operation_day_id: int,
+        order_data: dict,
+        distance_km: float | None,
+        distance_zone: str | None,
+    ) -> dict:
+        return {
+            "id": int(order_id),
+            "uid": order_data.get("uid"),
+            "display_id": order_data.get("display_id"),
+            "merchant_id": str(merchant_id),
+            "operation_day_id": int(operation_day_id),
+            "source_event_id": f"api_partner_{order_id}",
+            "created_at": order_data.get("created_at") or datetime.now(),
+            "order_type": order_data.get("order_type"),
+            "sales_channel": order_data.get("sales_channel"),
+            "status": order_data.get("status", "pending"),
+            "cancellation_reason": order_data.get("cancellation_reason"),
+            "customer_id": order_data.get("customer_id"),
+            "customer_name": order_data.get("customer_name"),
+            "customer_phone": order_data.get("customer_phone"),
+            "customer_orders_count": order_data.get("customer_orders_count"),
+            "delivery_address": json.dumps(order_data.get("delivery_address", {})),
+            "delivery_neighborhood": order_data.get("delivery_neighborhood"),
+            "delivery_city": order_data.get("delivery_city"),
+            "total_value": order_data.get("total_value"),
+            "delivery_fee": order_data.get("delivery_fee"),
+            "distance_km": distance_km,
+            "distance_zone": distance_zone,
+            "content_hash": self._content_hash(order_data, distance_km, distance_zone),
+        }
+
+    async def _upsert_orders(self, session: AsyncSession, rows: list[dict]) -> set[int]:
+        """
+        Upsert set-based (INSERT ... SELECT FROM unnest) dos pedidos.
+
+        Só reescreve linhas cujo content_hash mudou; retorna os ids gravados
+        (inseridos ou atualizados). Ids ausentes = conteúdo igual ao do banco.
+        """
+        if not rows:
+            return set()
+
+        result = await session.execute(
+            text("""
+                INSERT INTO orders (
+                    id, uid, display_id, merchant_id, operation_day_id, source_event_id,
+                    created_at, order_type, sales_channel, status, cancellation_reason,
+                    customer_id, customer_name, customer_phone, customer_orders_count,
+                    delivery_address, delivery_neighborhood, delivery_city,
+                    total_value, delivery_fee, distance_km, distance_zone, content_hash
+                )
+                SELECT
+                    id, uid, display_id, merchant_id, operation_day_id, source_event_id,
+                    created_at, order_type, sales_channel, status, cancellation_reason,
+                    customer_id, customer_name, customer_phone, customer_orders_count,
+                    CAST(delivery_address AS JSONB), delivery_neighborhood, delivery_city,
+                    total_value, delivery_fee, distance_km, distance_zone, content_hash
+                FROM unnest(
+                    CAST(:id AS BIGINT[]), CAST(:uid AS VARCHAR[]), CAST(:display_id AS VARCHAR[]),
+                    CAST(:merchant_id AS VARCHAR[]), CAST(:operation_day_id AS INTEGER[]),
+                    CAST(:source_event_id AS VARCHAR[]), CAST(:created_at AS TIMESTAMPTZ[]),
+                    CAST(:order_type AS VARCHAR[]), CAST(:sales_channel AS VARCHAR[]),
+                    CAST(:status AS VARCHAR[]), CAST(:cancellation_reason AS TEXT[]),
+                    CAST(:customer_id AS BIGINT[]), CAST(:customer_name AS VARCHAR[]),
+                    CAST(:customer_phone AS VARCHAR[]), CAST(:customer_orders_count AS INTEGER[]),
+                    CAST(:delivery_address AS TEXT[]), CAST(:delivery_neighborhood AS VARCHAR[]),
+                    CAST(:delivery_city AS VARCHAR[]), CAST(:total_value AS NUMERIC[]),
+                    CAST(:delivery_fee AS NUMERIC[]), CAST(:distance_km AS NUMERIC[]),
+                    CAST(:distance_zone AS VARCHAR[]), CAST(:content_hash AS VARCHAR[])
+                ) AS t(
+                    id, uid, display_id, merchant_id, operation_day_id, source_event_id,
+                    created_at, order_type, sales_channel, status, cancellation_reason,
+                    customer_id, customer_name, customer_phone, customer_orders_count,
+                    delivery_address, delivery_neighborhood, delivery_city,
+                    total_value, delivery_fee, distance_km, distance_zone, content_hash
+                )
+                ON CONFLICT (id) DO UPDATE SET
+                    updated_at = NOW(),
+                    status = EXCLUDED.status,
+                    cancellation_reason = COALESCE(EXCLUDED.cancellation_reason, orders.cancellation_reason),
+                    distance_km = EXCLUDED.distance_km, distance_zone = EXCLUDED.distance_zone,
+                    content_hash = EXCLUDED.content_hash
+                WHERE orders.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+                RETURNING id
+            """),
+            self._columns(rows),
         )
+        return {row[0] for row in result.fetchall()}
+
+    def _content_hash(
+        self, order_data: dict, distance_km: float | None, distance_zone: str | None
+    ) -> str:
+        """Hash compacto (128 bits) do pedido normalizado, itens e pagamentos inclusos."""
+        content = json.dumps(
+            [order_data, distance_km, distance_zone],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    async def _count_write(self, field: str, amount: int = 1):
+        with contextlib.suppress(Exception):
+            await redis_client.incr_metric(WRITE_METRICS_NAME, field, amount)
+
+    async def _replace_relations(
+        self, session: AsyncSession, orders: list[tuple[int, dict]]
+    ):
+        """
+        Substitui itens e pagamentos dos pedidos com SQL set-based: um DELETE
+        por tabela e um INSERT ... SELECT FROM unnest(arrays) por tabela,
+        qualquer que seja o número de pedidos/linhas (idempotente para retries).
+        """
+        if not orders:
+            return
+
+        order_ids = [order_id for order_id, _ in orders]
 
-        # 2. Idempotência: Limpar itens e pagamentos antigos (útil para retries seguros)
         await session.execute(
-            text("DELETE FROM order_items WHERE order_id = :id"), {"id": int(order_id)}
+            text("DELETE FROM order_items WHERE order_id = ANY(CAST(:ids AS BIGINT[]))"),
+            {"ids": order_ids},
         )
         await session.execute(
-            text("DELETE FROM order_payments WHERE order_id = :id"),
-            {"id": int(order_id)},
+            text("DELETE FROM order_payments WHERE order_id = ANY(CAST(:ids AS BIGINT[]))"),
+            {"ids": order_ids},
         )
 
-        # 3. Inserir Itens
-        items = order_data.get("items", [])
-        if items:
-            query_items = text("""
-                INSERT INTO order_items (order_id, item_id, name, quantity, unit_price, total_price, category_name)
-                VALUES (:order_id, :item_id, :name, :quantity, :unit_price, :total_price, :category_name)
-            """)
-            for item in items:
-                await session.execute(
-                    query_items,
-                    {
-                        "order_id": int(order_id),
-                        "item_id": item.get("item_id"),
-                        "name": item.get("name"),
-                        "quantity": item.get("quantity", 1),
-                        "unit_price": item.get("unit_price", item.get("price", 0.0)),
-                        "total_price": item.get("total_price", item.get("price", 0.0)),
-                        "category_name": item.get("category_name"),
-                    },
-                )
+        item_rows = [
+            self._item_row(order_id, item)
+            for order_id, order_data in orders
+            for item in order_data.get("items", [])
+        ]
+        if item_rows:
+            await session.execute(
+                text("""
+                    INSERT INTO order_items (order_id, item_id, name, quantity, unit_price, total_price, category_name)
+                    SELECT * FROM unnest(
+                        CAST(:order_id AS BIGINT[]), CAST(:item_id AS BIGINT[]), CAST(:name AS VARCHAR[]),
+                        CAST(:quantity AS INTEGER[]), CAST(:unit_price AS NUMERIC[]),
+                        CAST(:total_price AS NUMERIC[]), CAST(:category_name AS VARCHAR[])
+                    )
+                """),
+                self._columns(item_rows),
+            )
 
-        # 4. Inserir Pagamentos
-        payments = order_data.get("payments", [])
-        if payments:
-            # 1. Substituição Idempotente: Remove apenas os pagamentos DESTE pedido
-            # antes de gravar a versão mais atualizada. Se não houver nenhum, ele apenas segue.
-            delete_query = text("DELETE FROM order_payments WHERE order_id = :order_id")
-            await session.execute(delete_query, {"order_id": int(order_id)})
-
-            # 2. Insere a foto final do pagamento com os dados completos
-            query_payments = text("""
-                INSERT INTO order_payments (
-                    order_id, payment_method, payment_type, total_value,
-                    change_for, status, card_number, card_brand, observation, payment_fee
-                )
-                VALUES (
-                    :order_id, :payment_method, :payment_type, :total_value,
-                    :change_for, :status, :card_number, :card_brand, :observation, :payment_fee
-                )
-            """)
+        payment_rows = [
+            self._payment_row(order_id, pay)
+            for order_id, order_data in orders
+            for pay in order_data.get("payments", [])
+        ]
+        if payment_rows:
+            await session.execute(
+                text("""
+                    INSERT INTO order_payments (
+                        order_id, payment_method, payment_type, total_value,
+                        change_for, status, card_number, card_brand, observation, payment_fee
+                    )
+                    SELECT * FROM unnest(
+                        CAST(:order_id AS BIGINT[]), CAST(:payment_method AS VARCHAR[]),
+                        CAST(:payment_type AS VARCHAR[]), CAST(:total_value AS NUMERIC[]),
+                        CAST(:change_for AS NUMERIC[]), CAST(:status AS VARCHAR[]),
+                        CAST(:card_number AS VARCHAR[]), CAST(:card_brand AS VARCHAR[]),
+                        CAST(:observation AS TEXT[]), CAST(:payment_fee AS NUMERIC[])
+                    )
+                """),
+                self._columns(payment_rows),
+            )
 
-            for pay in payments:
-                # Tratamento seguro para conversão de valores numéricos opcionais
-                change_for_val = pay.get("change_for")
-                change_for = (
-                    float(change_for_val) if change_for_val is not None else None
-                )
+    def _item_row(self, order_id: int, item: dict) -> dict:
+        return {
+            "order_id": order_id,
+            "item_id": item.get("item_id"),
+            "name": item.get("name"),
+            "quantity": item.get("quantity", 1),
+            "unit_price": item.get("unit_price", item.get("price", 0.0)),
+            "total_price": item.get("total_price", item.get("price", 0.0)),
+            "category_name": item.get("category_name"),
+        }
 
-                payment_fee_val = pay.get("payment_fee")
-                payment_fee = (
-                    float(payment_fee_val) if payment_fee_val is not None else 0.0
-                )
+    def _payment_row(self, order_id: int, pay: dict) -> dict:
+        # Tratamento seguro para conversão de valores numéricos opcionais
+        change_for_val = pay.get("change_for")
+        change_for = float(change_for_val) if change_for_val is not None else None
 
-                await session.execute(
-                    query_payments,
-                    {
-                        "order_id": int(order_id),
-                        "payment_method": pay.get("payment_method"),
-                        "payment_type": pay.get("payment_type"),
-                        "total_value": float(
-                            pay.get("total", pay.get("total_value", 0.0))
-                        ),
-                        "change_for": change_for,
-                        "status": pay.get("status"),
-                        "card_number": pay.get("card_number"),
-                        "card_brand": pay.get("card_brand"),
-                        "observation": pay.get("observation"),
-                        "payment_fee": payment_fee,
-                    },
-                )
+        payment_fee_val = pay.get("payment_fee")
+        payment_fee = float(payment_fee_val) if payment_fee_val is not None else 0.0
+
+        return {
+            "order_id": order_id,
+            "payment_method": pay.get("payment_method"),
+            "payment_type": pay.get("payment_type"),
+            "total_value": float(pay.get("total", pay.get("total_value", 0.0))),
+            "change_for": change_for,
+            "status": pay.get("status"),
+            "card_number": pay.get("card_number"),
+            "card_brand": pay.get("card_brand"),
+            "observation": pay.get("observation"),
+            "payment_fee": payment_fee,
+        }
+
+    def _columns(self, rows: list[dict]) -> dict[str, list]:
+        """Linhas -> um array por coluna (parâmetros do unnest)."""
+        return {column: [row[column] for row in rows] for column in rows[0]}
 
     async def _update_with_dashboard_data(
         self, session: AsyncSession, order_id: int, dashboard_data: dict
@@ -1,4 +1,3 @@
-import asyncio
 import json
 from datetime import datetime
 
@@ -9,17 +8,16 @@ from src.core.logger import logger
 from src.infrastructure.db.connection import get_db_session
 from src.infrastructure.external.cardapioweb_dashboard import CardapiowebDashboardAPI
 from src.infrastructure.external.cardapioweb_public import CardapiowebPublicAPI
+from src.infrastructure.external.quota_governor import ApiPriority, in_priority_lane
 
 
 class ReconciliationService:
     def __init__(self):
         self.public_api = CardapiowebPublicAPI()
         self.dashboard_api = CardapiowebDashboardAPI()
+        # Rate limit: cada chamada aguarda sua cota no QuotaGovernor (Redis)
 
-        # Calcula o tempo de espera dinâmico baseado no Rate Limit (.env)
-        self.history_sleep_time = (60.0 / settings.cardapioweb_history_rate_limit) + 0.5
-        self.details_sleep_time = (60.0 / settings.cardapioweb_details_rate_limit) + 0.1
-
+    @in_priority_lane(ApiPriority.RECONCILIATION)
     async def run_reconciliation_for_shift(
         self,
         merchant_id: str,
@@ -45,8 +43,7 @@ class ReconciliationService:
             # ==========================================
             # ETAPA 1: AUDITORIA DE PEDIDOS PERDIDOS
             # ==========================================
-            api_orders = await self._fetch_history_with_rate_limit(opened_at, closed_at)
-            api_order_ids = {str(order["id"]) for order in api_orders}
+            api_order_ids = await self._fetch_history_order_ids(opened_at, closed_at)
 
             if not api_order_ids:
                 logger.info("reconciliation.no_orders_api")
@@ -73,7 +70,6 @@ class ReconciliationService:
                     )
                     for missing_id in missing_ids:
                         await self._recover_and_save_order(missing_id)
-                        await asyncio.sleep(self.details_sleep_time)
 
             # ==========================================
             # ETAPA 2: AUDITORIA DE ENTREGADORES (MOTOBOYS)
@@ -103,38 +99,18 @@ class ReconciliationService:
         except Exception as e:
             logger.error("reconciliation.failed", error=str(e))
 
-    async def _fetch_history_with_rate_limit(
+    async def _fetch_history_order_ids(
         self, start_date: datetime, end_date: datetime
-    ):
-        """Varre as páginas do histórico implementando throttling dinâmico."""
-        all_orders = []
-        page = 1
-
-        while True:
-            if page > 1:
-                logger.debug(
-                    "reconciliation.rate_limit",
-                    msg=f"Aguardando {self.history_sleep_time}s (Rate Limit)...",
-                )
-                await asyncio.sleep(self.history_sleep_time)
-
-            response = await self.public_api.get_orders_history_page(
-                start_date, end_date, page
-            )
-
-            orders = response.get("orders", [])
-            all_orders.extend(orders)
-
-            pagination = response.get("pagination", {})
-            current_page = pagination.get("current_page", 1)
-            total_pages = pagination.get("total_pages", 1)
+    ) -> set[str]:
+        """Varre o histórico em streaming guardando só os IDs (throttling pela cota "history")."""
+        order_ids = set()
 
-            if current_page >= total_pages or not orders:
-                break
+        async for orders in self.public_api.iter_orders_history_pages(
+            start_date, end_date
+        ):
+            order_ids.update(str(order["id"]) for order in orders)
 
-            page += 1
-
-        return all_orders
+        return order_ids
 
     async def _recover_and_save_order(self, order_id: str):
         """Busca os detalhes completos na rota unitária e registra no banco."""
@@ -245,23 +221,21 @@ class ReconciliationService:
                         msg="Divergência detectada! Buscando lista de pedidos deste motoboy.",
                     )
 
-                    orders = await self.dashboard_api.get_orders_by_delivery_man(
+                    async for orders in self.dashboard_api.iter_orders_by_delivery_man(
                         driver.get("id"), opened_at, closed_at
-                    )
-
-                    for order in orders:
-                        order_updates.append(
-                            {
-                                "order_id": order.get("id"),
-                                "mid": merchant_id,
-                                "driver_id": int(driver_id_str)
-                                if driver_id_str and driver_id_str.isdigit()
-                                else None,
-                                "driver_name": driver_name,
-                                "driver_phone": driver_phone,
-                            }
-                        )
-                    await asyncio.sleep(self.details_sleep_time)
+                    ):
+                        for order in orders:
+                            order_updates.append(
+                                {
+                                    "order_id": order.get("id"),
+                                    "mid": merchant_id,
+                                    "driver_id": int(driver_id_str)
+                                    if driver_id_str and driver_id_str.isdigit()
+                                    else None,
+                                    "driver_name": driver_name,
+                                    "driver_phone": driver_phone,
+                                }
+                            )
 
             # if order_updates:
             #     async with get_db_session() as session:
@@ -398,10 +372,7 @@ class ReconciliationService:
             cash_flow_id = target_cash_flow.get("id")
             logger.info("reconciliation.cash_flow_matched", cash_flow_id=cash_flow_id)
 
-            await asyncio.sleep(self.details_sleep_time)
             summary = await self.dashboard_api.get_cash_flow_summary(cash_flow_id)
-
-            await asyncio.sleep(self.details_sleep_time)
             operations = await self.dashboard_api.get_cash_flow_operations(cash_flow_id)
 
             async with get_db_session() as session:
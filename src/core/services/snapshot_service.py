@@ -7,6 +7,7 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.logger import logger
+from src.infrastructure.cache.merchant_config import merchant_configs
 from src.infrastructure.db.connection import get_db_session
 
 class SnapshotService:
@@ -31,6 +32,9 @@ class SnapshotService:
 
                 for op_day in open_days:
                     op_id, merchant_id, capacity = op_day
+                    if capacity is None:
+                        merchant = await merchant_configs.get(merchant_id, session)
+                        capacity = merchant.default_delivery_capacity if merchant else None
                     await self._generate_snapshot_for_day(session, op_id, merchant_id, capacity)
 
                 await session.commit()
@@ -0,0 +1,61 @@
+# ============================================
+# RATE LIMITER LOCAL (PRÉ-CHECAGEM EM MEMÓRIA)
+# ============================================
+
+import time
+
+
+class LocalRateLimiter:
+    """
+    Contador em memória por chave, consultado antes do Redis.
+
+    Conta apenas requisições que ESTE processo já deixou passar. Como esse total
+    nunca é maior que o global, estourar o limite aqui garante que o Redis também
+    recusaria: floods óbvios são barrados sem nenhum round trip.
+    """
+
+    def __init__(self, max_keys: int = 10_000):
+        self.max_keys = max_keys
+        # chave -> [início da janela (monotonic), contagem]
+        self._windows: dict[str, list[float]] = {}
+
+    def is_over_limit(self, key: str, max_requests: int, window_seconds: int) -> bool:
+        window = self._windows.get(key)
+        if window is None:
+            return False
+
+        if time.monotonic() - window[0] >= window_seconds:
+            del self._windows[key]
+            return False
+
+        return window[1] >= max_requests
+
+    def record(self, key: str, window_seconds: int) -> None:
+        now = time.monotonic()
+        window = self._windows.get(key)
+
+        if window is None or now - window[0] >= window_seconds:
+            if window is None and len(self._windows) >= self.max_keys:
+                self._evict_expired(now, window_seconds)
+            self._windows[key] = [now, 1]
+        else:
+            window[1] += 1
+
+    def _evict_expired(self, now: float, window_seconds: int) -> None:
+        expired = [
+            key
+            for key, (started_at, _) in self._windows.items()
+            if now - started_at >= window_seconds
+        ]
+        for key in expired:
+            del self._windows[key]
+
+        # Tudo ainda ativo: descarta as janelas mais antigas (fail-open, o Redis decide)
+        if len(self._windows) >= self.max_keys:
+            oldest = sorted(self._windows, key=lambda k: self._windows[k][0])
+            for key in oldest[: len(oldest) // 2]:
+                del self._windows[key]
+
+
+# Singleton global
+local_rate_limiter = LocalRateLimiter()
@@ -0,0 +1,120 @@
+# ============================================
+# MERCHANT CONFIG - CACHE EM MEMÓRIA (TTL)
+# ============================================
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import time as dt_time
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.core.logger import logger
+from src.infrastructure.db.connection import get_db_session
+
+
+@dataclass(frozen=True)
+class MerchantConfig:
+    merchant_id: str
+    name: str
+    default_start_time: dt_time
+    default_end_time: dt_time
+    address_lat: Decimal
+    address_lng: Decimal
+    distance_threshold_near: Decimal | None
+    distance_threshold_medium: Decimal | None
+    default_delivery_capacity: int | None
+    is_active: bool
+
+
+class MerchantConfigCache:
+    """
+    Configuração das lojas (horários, coordenadas, limiares, capacidade) em
+    memória, com TTL.
+
+    A tabela é pequena: um miss recarrega todas as lojas numa única query e
+    os pedidos seguintes não tocam o banco até o TTL vencer. Alterações em
+    `merchants` disparam NOTIFY (o worker invalida na hora); o endpoint
+    admin de invalidação cobre o processo da API.
+    """
+
+    def __init__(self):
+        self._configs: dict[str, MerchantConfig] = {}
+        self._expires_at = 0.0
+        self._generation = 0
+        self._load_lock = asyncio.Lock()
+
+    async def get(
+        self, merchant_id: str, session: AsyncSession | None = None
+    ) -> MerchantConfig | None:
+        """Configuração da loja (None se não existir). Usa a sessão do chamador no miss."""
+        configs = await self._ensure_loaded(session)
+        return configs.get(str(merchant_id))
+
+    async def list_active(
+        self, session: AsyncSession | None = None
+    ) -> list[MerchantConfig]:
+        configs = await self._ensure_loaded(session)
+        return [config for config in configs.values() if config.is_active]
+
+    def invalidate(self, merchant_id: str | None = None) -> None:
+        """Força recarga no próximo acesso (assinatura compatível com callbacks do LISTEN)."""
+        self._expires_at = 0.0
+        self._generation += 1
+        logger.info("merchant_config.invalidated", merchant_id=merchant_id)
+
+    async def _ensure_loaded(
+        self, session: AsyncSession | None
+    ) -> dict[str, MerchantConfig]:
+        if time.monotonic() < self._expires_at:
+            return self._configs
+
+        async with self._load_lock:
+            # Outro chamador pode ter recarregado enquanto esperávamos
+            if time.monotonic() < self._expires_at:
+                return self._configs
+
+            generation = self._generation
+            if session is not None:
+                configs = await self._load(session)
+            else:
+                async with get_db_session() as own_session:
+                    configs = await self._load(own_session)
+
+            self._configs = configs
+            # Invalidação durante a carga: o resultado serve a este chamador, mas não fica em cache
+            if generation == self._generation:
+                self._expires_at = time.monotonic() + settings.merchant_config_ttl
+            return configs
+
+    async def _load(self, session: AsyncSession) -> dict[str, MerchantConfig]:
+        result = await session.execute(
+            text("""
+                SELECT merchant_id, name, default_start_time, default_end_time,
+                       address_lat, address_lng, distance_threshold_near,
+                       distance_threshold_medium, default_delivery_capacity, is_active
+                FROM merchants
+            """)
+        )
+        return {
+            str(row.merchant_id): MerchantConfig(
+                merchant_id=str(row.merchant_id),
+                name=row.name,
+                default_start_time=row.default_start_time,
+                default_end_time=row.default_end_time,
+                address_lat=row.address_lat,
+                address_lng=row.address_lng,
+                distance_threshold_near=row.distance_threshold_near,
+                distance_threshold_medium=row.distance_threshold_medium,
+                default_delivery_capacity=row.default_delivery_capacity,
+                is_active=bool(row.is_active),
+            )
+            for row in result.fetchall()
+        }
+
+
+# Singleton global
+merchant_configs = MerchantConfigCache()
@@ -0,0 +1,102 @@
+# ============================================
+# ORDER CACHE - READ-THROUGH DAS APIs DE PEDIDO
+# ============================================
+
+import contextlib
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from src.config import settings
+from src.core.logger import logger
+from src.infrastructure.cache.redis_client import redis_client
+
+# Status finais: o payload não muda mais
+TERMINAL_STATUSES = {"closed", "canceled", "cancelled"}
+
+METRICS_NAME = "order_cache"
+
+
+class OrderCache:
+    """
+    Cache read-through (Redis) das respostas de pedido da Cardapioweb.
+
+    TTL depende do status do payload: pedidos finalizados ficam em cache por
+    muito tempo (reconciliação e backfill reaproveitam), pedidos ativos só
+    por alguns segundos. O worker invalida o pedido a cada mudança de status.
+
+    Falhas do Redis nunca quebram a chamada: o cache é só um atalho.
+    Hits/misses vão para o hash `metrics:order_cache`.
+    """
+
+    def _key(self, resource: str, order_id: int | str) -> str:
+        return f"cw:cache:{resource}:order:{order_id}"
+
+    def status_of(self, resource: str, payload: dict) -> str:
+        """Status normalizado do payload; o dashboard aninha o pedido em `data`/`order`."""
+        core = payload
+        if resource == "dashboard":
+            nested = payload.get("data") or payload.get("order")
+            if isinstance(nested, dict):
+                core = nested
+        return str(core.get("status") or "").lower().replace(" ", "_")
+
+    def ttl_for(self, resource: str, payload: dict) -> int:
+        status = self.status_of(resource, payload)
+        if status in TERMINAL_STATUSES:
+            return settings.order_cache_terminal_ttl
+        return settings.order_cache_active_ttl
+
+    async def read_through(
+        self,
+        resource: str,
+        order_id: int | str,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Devolve o payload do cache ou chama `fetch` e guarda a resposta válida."""
+        if not settings.order_cache_enabled:
+            return await fetch()
+
+        key = self._key(resource, order_id)
+
+        try:
+            cached = await redis_client.get_json(key)
+        except Exception as e:
+            logger.debug("order_cache.read_failed", key=key, error=str(e))
+            cached = None
+
+        if cached is not None:
+            await self._count(f"{resource}_hit")
+            return cached
+
+        await self._count(f"{resource}_miss")
+        payload = await fetch()
+
+        # None / fallback de erro não entram no cache
+        if isinstance(payload, dict) and payload and not payload.get("_api_error"):
+            try:
+                await redis_client.set_json(
+                    key, payload, self.ttl_for(resource, payload)
+                )
+            except Exception as e:
+                logger.debug("order_cache.write_failed", key=key, error=str(e))
+
+        return payload
+
+    async def invalidate(self, order_id: int | str) -> None:
+        """Descarta os payloads do pedido (chamado a cada mudança de status)."""
+        if not settings.order_cache_enabled:
+            return
+        try:
+            await redis_client.delete(
+                self._key("partner", order_id), self._key("dashboard", order_id)
+            )
+        except Exception as e:
+            logger.debug("order_cache.invalidate_failed", order_id=order_id, error=str(e))
+
+    async def _count(self, field: str) -> None:
+        with contextlib.suppress(Exception):
+            await redis_client.incr_metric(METRICS_NAME, field)
+
+
+# Singleton global
+order_cache = OrderCache()
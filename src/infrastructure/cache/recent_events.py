@@ -0,0 +1,51 @@
+# ============================================
+# FILTRO LOCAL DE EVENTOS RECENTES
+# ============================================
+
+import time
+
+from src.config import settings
+
+
+class RecentEventFilter:
+    """
+    Conjunto em memória dos event_ids confirmados recentemente por este processo.
+
+    Duas gerações rotativas (atual + anterior): cada id vive entre 1x e 2x o TTL
+    e a memória fica limitada a `max_entries`. É exato (sem falso positivo):
+    presença aqui é duplicata certa; ausência não prova nada e cai no Redis,
+    que continua sendo a fonte da verdade.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = settings.recent_events_ttl_seconds,
+        max_entries: int = settings.recent_events_max_entries,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.generation_size = max(1, max_entries // 2)
+        self._current: set[str] = set()
+        self._previous: set[str] = set()
+        self._rotated_at = time.monotonic()
+
+    def contains(self, event_id: str) -> bool:
+        self._maybe_rotate()
+        return event_id in self._current or event_id in self._previous
+
+    def add(self, event_id: str) -> None:
+        self._maybe_rotate()
+        self._current.add(event_id)
+
+    def _maybe_rotate(self) -> None:
+        now = time.monotonic()
+        if (
+            now - self._rotated_at >= self.ttl_seconds
+            or len(self._current) >= self.generation_size
+        ):
+            self._previous = self._current
+            self._current = set()
+            self._rotated_at = now
+
+
+# Singleton global
+recent_events = RecentEventFilter()
@@ -1,10 +1,92 @@
 import json
+import secrets
 from typing import Any
 
 import redis.asyncio as redis
 
 from src.config import settings
 
+# Check-and-claim atômico: 0 = já processado ou em processamento, 1 = lock adquirido
+CLAIM_EVENT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[1]) then
+    return 1
+end
+return 0
+"""
+
+# Marca como processado e libera o lock numa única ida ao Redis
+FINALIZE_EVENT_SCRIPT = """
+redis.call('SET', KEYS[1], '1', 'EX', ARGV[1])
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+# Libera o lock só se ainda for do dono (o TTL pode ter expirado e outro ter pego)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Sliding window log (ZSET): remove o que saiu da janela, conta e registra se couber.
+# ARGV: max_requests, window_seconds, nonce. Retorna {permitido (0/1), restantes}
+RATE_LIMIT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local window = tonumber(ARGV[2]) * 1000000
+local limit = tonumber(ARGV[1])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count >= limit then
+    return {0, 0}
+end
+
+redis.call('ZADD', KEYS[1], now, t[1] .. '.' .. t[2] .. '-' .. ARGV[3])
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[2]) * 1000)
+return {1, limit - count - 1}
+"""
+
+# Token bucket com reserva: desconta o token na hora (saldo pode ficar negativo)
+# e devolve quantos segundos o chamador deve esperar até a vez dele.
+# ARGV: capacidade, tokens por segundo, tokens pedidos, piso (opcional).
+# Com piso, só reserva se o saldo restante ficar >= piso; senão devolve a
+# espera estimada SEM reservar (raias de menor prioridade tentam de novo).
+# Retorna {reservado (0/1), espera em segundos}
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local floor = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local reserved = 1
+local wait = 0
+if floor and tokens - requested < floor then
+    reserved = 0
+    wait = (floor + requested - tokens) / rate
+else
+    tokens = tokens - requested
+    if tokens < 0 then
+        wait = -tokens / rate
+    end
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {reserved, tostring(wait)}
+"""
+
 
 class RedisClient:
     """
@@ -16,22 +98,49 @@ class RedisClient:
 
     def __init__(self):
         self._client: redis.Redis | None = None
+        self._claim_event_script = None
+        self._finalize_event_script = None
+        self._rate_limit_script = None
+        self._token_bucket_script = None
+        self._release_lock_script = None
 
     async def connect(self):
         if self._client is None:
-            self._client = redis.from_url(
+            client = redis.from_url(
                 str(settings.redis_url),
                 socket_timeout=settings.redis_socket_timeout,
                 socket_connect_timeout=settings.redis_socket_connect_timeout,
                 retry_on_timeout=settings.redis_retry_on_timeout,
                 decode_responses=True,
             )
-            await self._client.ping()
+            await client.ping()
+            self._client = client
+            await self._load_scripts()
+
+    async def _load_scripts(self):
+        """Registra os scripts Lua e já os carrega no servidor (EVALSHA direto)."""
+        self._claim_event_script = self._client.register_script(CLAIM_EVENT_SCRIPT)
+        self._finalize_event_script = self._client.register_script(
+            FINALIZE_EVENT_SCRIPT
+        )
+        self._rate_limit_script = self._client.register_script(RATE_LIMIT_SCRIPT)
+        self._token_bucket_script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._release_lock_script = self._client.register_script(RELEASE_LOCK_SCRIPT)
+        await self._client.script_load(CLAIM_EVENT_SCRIPT)
+        await self._client.script_load(FINALIZE_EVENT_SCRIPT)
+        await self._client.script_load(RATE_LIMIT_SCRIPT)
+        await self._client.script_load(TOKEN_BUCKET_SCRIPT)
+        await self._client.script_load(RELEASE_LOCK_SCRIPT)
 
     async def disconnect(self):
         if self._client:
             await self._client.close()
             self._client = None
+            self._claim_event_script = None
+            self._finalize_event_script = None
+            self._rate_limit_script = None
+            self._token_bucket_script = None
+            self._release_lock_script = None
 
     @property
     def client(self) -> redis.Redis:
@@ -61,6 +170,29 @@ class RedisClient:
         key = f"webhook:processing:{event_id}"
         await self.client.delete(key)
 
+    async def claim_event(self, event_id: str, lock_ttl_seconds: int = 60) -> bool:
+        """
+        Verifica duplicata e adquire o lock de processamento em um round trip.
+
+        Retorna True se o evento é novo e o lock foi adquirido.
+        """
+        if self._claim_event_script is None:
+            raise RuntimeError("Redis não conectado. Chame connect() primeiro.")
+        result = await self._claim_event_script(
+            keys=[f"webhook:processed:{event_id}", f"webhook:processing:{event_id}"],
+            args=[lock_ttl_seconds],
+        )
+        return int(result) == 1
+
+    async def finalize_event(self, event_id: str, ttl_seconds: int = 86400) -> None:
+        """Marca o evento como processado e libera o lock em um round trip."""
+        if self._finalize_event_script is None:
+            raise RuntimeError("Redis não conectado. Chame connect() primeiro.")
+        await self._finalize_event_script(
+            keys=[f"webhook:processed:{event_id}", f"webhook:processing:{event_id}"],
+            args=[ttl_seconds],
+        )
+
     # Cache Genérico
 
     async def get_json(self, key: str) -> Any | None:
@@ -70,31 +202,132 @@ class RedisClient:
         return None
 
     async def set_json(self, key: str, value: Any, ttl_seconds: int = 300) -> None:
-        await self.client.setex(key, ttl_seconds, json.dumps(value))
+        # Encoding compacto: sem espaços e UTF-8 cru (payloads de pedido ~15% menores)
+        await self.client.setex(
+            key,
+            ttl_seconds,
+            json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str),
+        )
 
-    async def delete(self, key: str) -> None:
-        await self.client.delete(key)
+    async def delete(self, key: str, *keys: str) -> None:
+        await self.client.delete(key, *keys)
+
+    async def get_with_ttl(self, key: str) -> tuple[str | None, float | None]:
+        """Valor e TTL restante (segundos) em um round trip. TTL None = sem expiração."""
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            value, pttl = await pipe.execute()
+        if value is None:
+            return None, None
+        return value, (pttl / 1000 if pttl >= 0 else None)
 
-    # TODO: Rate Limiting
+    # Locks distribuídos
+
+    async def acquire_lock(self, key: str, ttl_seconds: int) -> str | None:
+        """SET NX com token do dono. Retorna o token ou None se já estiver em uso."""
+        token = secrets.token_hex(8)
+        acquired = await self.client.set(key, token, nx=True, ex=ttl_seconds)
+        return token if acquired else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        if self._release_lock_script is None:
+            raise RuntimeError("Redis não conectado. Chame connect() primeiro.")
+        await self._release_lock_script(keys=[key], args=[token])
+
+    # Métricas (contadores compartilhados entre API e worker)
+
+    async def incr_metric(self, name: str, field: str, amount: int = 1) -> None:
+        await self.client.hincrby(f"metrics:{name}", field, amount)
+
+    async def get_metrics(self) -> dict[str, dict[str, int]]:
+        metrics = {}
+        async for key in self.client.scan_iter(match="metrics:*"):
+            values = await self.client.hgetall(key)
+            metrics[key.removeprefix("metrics:")] = {
+                field: int(value) for field, value in values.items()
+            }
+        return metrics
+
+    # Streams (fila de ingestão - alternativa ao polling DB)
+
+    async def stream_add(self, stream: str, fields: dict[str, str]) -> str:
+        return await self.client.xadd(stream, fields)
+
+    async def stream_ensure_group(self, stream: str, group: str) -> None:
+        """Cria o consumer group (e o stream) se ainda não existirem."""
+        try:
+            await self.client.xgroup_create(stream, group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def stream_read_group(
+        self, stream: str, group: str, consumer: str, count: int, block_ms: int
+    ) -> list[tuple[str, dict[str, str]]]:
+        """Lê entradas novas do grupo. Retorna [(entry_id, campos)]."""
+        response = await self.client.xreadgroup(
+            group, consumer, {stream: ">"}, count=count, block=block_ms
+        )
+        return response[0][1] if response else []
+
+    async def stream_claim_stale(
+        self, stream: str, group: str, consumer: str, min_idle_ms: int, count: int
+    ) -> list[tuple[str, dict[str, str]]]:
+        """Assume entradas pendentes de consumidores mortos (XAUTOCLAIM)."""
+        response = await self.client.xautoclaim(
+            stream, group, consumer, min_idle_time=min_idle_ms, count=count
+        )
+        return [entry for entry in response[1] if entry and entry[1]]
+
+    async def stream_ack(self, stream: str, group: str, entry_ids: list[str]) -> None:
+        """Confirma e remove as entradas: o stream guarda só o que falta persistir."""
+        if not entry_ids:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.xack(stream, group, *entry_ids)
+        pipe.xdel(stream, *entry_ids)
+        await pipe.execute()
+
+    # Rate Limiting
 
     async def check_rate_limit(
         self, key: str, max_requests: int, window_seconds: int
     ) -> tuple[bool, int]:
-        pipe = self.client.pipeline()
-        now = await self.client.time()  # Redis server time
+        """
+        Sliding window atômico (script Lua, 1 round trip).
 
-        # Implementação simplificada - pode ser melhorada
-        current = await self.client.get(key)
-        count = int(current) if current else 0
-
-        if count >= max_requests:
-            return False, 0
+        Retorna (permitido, requisições restantes na janela).
+        """
+        if self._rate_limit_script is None:
+            raise RuntimeError("Redis não conectado. Chame connect() primeiro.")
+        allowed, remaining = await self._rate_limit_script(
+            keys=[key],
+            args=[max_requests, window_seconds, secrets.token_hex(4)],
+        )
+        return bool(allowed), int(remaining)
 
-        pipe.incr(key)
-        pipe.expire(key, window_seconds)
-        await pipe.execute()
+    async def reserve_tokens(
+        self,
+        key: str,
+        capacity: float,
+        refill_per_second: float,
+        requested: int = 1,
+        floor: float | None = None,
+    ) -> tuple[bool, float]:
+        """
+        Reserva tokens no bucket compartilhado (script Lua, 1 round trip).
 
-        return True, max_requests - count - 1
+        Retorna (reservado, segundos de espera). Reservado: esperar e usar.
+        Não reservado (saldo abaixo do `floor`): esperar e pedir de novo.
+        """
+        if self._token_bucket_script is None:
+            raise RuntimeError("Redis não conectado. Chame connect() primeiro.")
+        args = [capacity, refill_per_second, requested]
+        if floor is not None:
+            args.append(floor)
+        reserved, wait = await self._token_bucket_script(keys=[key], args=args)
+        return bool(reserved), float(wait)
 
 
 # Singleton global
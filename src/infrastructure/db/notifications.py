@@ -0,0 +1,69 @@
+# ============================================
+# LISTEN/NOTIFY - POSTGRESQL
+# Conexão asyncpg dedicada, fora do pool do SQLAlchemy
+# ============================================
+
+from collections.abc import Callable
+
+import asyncpg
+
+from src.config import settings
+from src.core.logger import logger
+
+INBOX_CHANNEL = "webhook_inbox"
+# Trigger da tabela merchants (payload = merchant_id)
+MERCHANT_CONFIG_CHANNEL = "merchant_config"
+
+
+class PgNotificationListener:
+    """
+    Mantém uma conexão dedicada em LISTEN e repassa as notificações
+    para callbacks síncronos registrados por canal.
+    """
+
+    def __init__(self):
+        self._conn: asyncpg.Connection | None = None
+        self._callbacks: dict[str, list[Callable[[str], None]]] = {}
+
+    @property
+    def is_connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        """Registra callback(payload) para o canal. Vale também após reconexões."""
+        self._callbacks.setdefault(channel, []).append(callback)
+
+    async def connect(self):
+        if self.is_connected:
+            return
+
+        dsn = settings.database_url_async.replace(
+            "postgresql+asyncpg://", "postgresql://", 1
+        )
+        conn = await asyncpg.connect(dsn)
+        for channel in self._callbacks:
+            await conn.add_listener(channel, self._dispatch)
+        conn.add_termination_listener(self._on_terminated)
+
+        self._conn = conn
+        logger.info("pg_listener.connected", channels=list(self._callbacks))
+
+    async def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            if not conn.is_closed():
+                await conn.close()
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str) -> None:
+        for callback in self._callbacks.get(channel, []):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.error("pg_listener.callback_failed", channel=channel, error=str(e))
+
+    def _on_terminated(self, connection) -> None:
+        logger.warning(
+            "pg_listener.disconnected",
+            msg="Conexão LISTEN caiu. Worker segue em polling até reconectar.",
+        )
+        self._conn = None
@@ -2,68 +2,323 @@
 # BASE HTTP CLIENT - Padrão para todas as APIs
 # ============================================
 
+import asyncio
+import importlib.util
+import random
+import re
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
 from functools import wraps
-from typing import Any, Callable, Dict, Optional, TypeVar
+from typing import Any, TypeVar
 
 import httpx
 
+from src.config import settings
+from src.core.logger import logger
+from src.infrastructure.external.quota_governor import (
+    ApiPriority,
+    current_priority,
+    quota_governor,
+)
+
 T = TypeVar('T')
 
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Um httpx.AsyncClient por base URL para o processo inteiro: instâncias dos
+# clients de API são baratas e reaproveitam conexões keep-alive (sem TCP+TLS
+# a cada pedido enriquecido)
+_shared_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_shared_client(base_url: str) -> httpx.AsyncClient:
+    """Retorna (ou cria) o client HTTP compartilhado da base URL."""
+    client = _shared_clients.get(base_url)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=settings.cardapioweb_http2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=settings.cardapioweb_max_connections,
+                max_keepalive_connections=settings.cardapioweb_max_keepalive,
+                keepalive_expiry=settings.cardapioweb_keepalive_expiry,
+            ),
+            follow_redirects=True,
+        )
+        _shared_clients[base_url] = client
+    return client
+
+
+async def close_shared_clients() -> None:
+    """Fecha os pools HTTP (shutdown da API e do worker)."""
+    clients = list(_shared_clients.values())
+    _shared_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+# Falhas transitórias: vale tentar de novo (com espera)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None) -> float:
+    """Backoff exponencial com full jitter; Retry-After do servidor tem prioridade."""
+    if retry_after is not None:
+        return retry_after
+    ceiling = min(
+        settings.cardapioweb_retry_max_delay,
+        settings.cardapioweb_retry_base_delay * (2 ** attempt),
+    )
+    return random.uniform(0, ceiling)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Interpreta Retry-After em segundos ou como data HTTP."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+class CircuitOpenError(Exception):
+    """Circuito do endpoint aberto: a chamada nem foi feita."""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(
+            f"Circuito aberto para {endpoint} (nova tentativa em {retry_after:.0f}s)"
+        )
+
+
+class PageFetchError(Exception):
+    """Página da paginação falhou: interrompe a iteração em vez de parecer o fim dos dados."""
+
+    def __init__(self, endpoint: str, page: int):
+        self.endpoint = endpoint
+        self.page = page
+        super().__init__(f"Falha ao buscar a página {page} de {endpoint}")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por endpoint (closed -> open -> half-open).
+    
+    Após `failure_threshold` requisições seguidas falhando (retries já
+    esgotados), o circuito abre e as chamadas falham na hora por
+    `reset_seconds`. Depois disso, uma única chamada de teste decide se
+    fecha de novo ou reabre.
+    """
+    
+    def __init__(
+        self,
+        endpoint: str,
+        failure_threshold: int = settings.cardapioweb_breaker_failure_threshold,
+        reset_seconds: float = settings.cardapioweb_breaker_reset_seconds,
+    ):
+        self.endpoint = endpoint
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.open_until = 0.0
+        self._probe_started_at: float | None = None
+    
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return "closed"
+        if time.monotonic() < self.open_until:
+            return "open"
+        return "half_open"
+    
+    def before_call(self) -> None:
+        state = self.state
+        now = time.monotonic()
+        # Teste que nunca reportou resultado (exceção inesperada) expira
+        probe_in_flight = (
+            self._probe_started_at is not None
+            and now - self._probe_started_at < self.reset_seconds
+        )
+        if state == "open" or (state == "half_open" and probe_in_flight):
+            retry_after = max(self.open_until - now, 1.0)
+            raise CircuitOpenError(self.endpoint, retry_after)
+        if state == "half_open":
+            self._probe_started_at = now
+    
+    def record_success(self) -> None:
+        if self.failures >= self.failure_threshold:
+            logger.info("api.circuit_closed", endpoint=self.endpoint)
+        self.failures = 0
+        self._probe_started_at = None
+    
+    def record_failure(self, cooldown: float | None = None) -> None:
+        """Conta a falha; `cooldown` (Retry-After) abre o circuito imediatamente."""
+        self._probe_started_at = None
+        self.failures = (
+            max(self.failures + 1, self.failure_threshold)
+            if cooldown is not None
+            else self.failures + 1
+        )
+        
+        if self.failures >= self.failure_threshold:
+            self.open_until = time.monotonic() + max(
+                self.reset_seconds, cooldown or 0.0
+            )
+            logger.warning(
+                "api.circuit_opened",
+                endpoint=self.endpoint,
+                failures=self.failures,
+                open_seconds=round(self.open_until - time.monotonic(), 1),
+            )
+
+
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+
+# IDs no path viram placeholder: /orders/123 e /orders/456 dividem o circuito
+_NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def get_circuit_breaker(method: str, base_url: str, path: str) -> CircuitBreaker:
+    endpoint = f"{method.upper()} {base_url}{_NUMERIC_SEGMENT.sub('/{id}', path)}"
+    breaker = _circuit_breakers.get(endpoint)
+    if breaker is None:
+        breaker = CircuitBreaker(endpoint)
+        _circuit_breakers[endpoint] = breaker
+    return breaker
+
+
+async def wait_for_circuit(breaker: CircuitBreaker) -> None:
+    """
+    Libera a chamada pelo circuito do endpoint.
+
+    Ao vivo falha na hora (o worker adia o evento). Reconciliação e backfill
+    esperam o circuito reabrir e seguem de onde pararam, até
+    `cardapioweb_breaker_max_wait_seconds`; a raia é relida a cada fatia
+    (uma chamada compartilhada pode ter sido promovida para LIVE).
+    """
+    waited = 0.0
+    while True:
+        try:
+            breaker.before_call()
+            return
+        except CircuitOpenError as e:
+            if (
+                current_priority() == ApiPriority.LIVE
+                or waited >= settings.cardapioweb_breaker_max_wait_seconds
+            ):
+                raise
+            if waited == 0.0:
+                logger.info(
+                    "api.circuit_wait",
+                    endpoint=e.endpoint,
+                    lane=current_priority().name,
+                    retry_after=round(e.retry_after, 1),
+                )
+            delay = min(e.retry_after, 1.0)
+            await asyncio.sleep(delay)
+            waited += delay
+
 
 class BaseAPIClient:
     """
     Client HTTP base com retry, auth e error handling.
+    
+    O transporte é compartilhado por base URL (`get_shared_client`); headers
+    de autenticação ficam na instância e vão em cada requisição.
     """
     
     def __init__(
         self,
         base_url: str,
-        api_key: Optional[str] = None,
+        api_key: str | None = None,
         api_key_header: str = "X-API-Key",
         timeout: int = 10,
-        retries: int = 3
+        retries: int = 3,
+        quota: str | None = None
     ):
         self.base_url = base_url.rstrip('/')
+        self.quota = quota
         self.api_key = api_key
         self.api_key_header = api_key_header
         self.timeout = timeout
         self.retries = retries
         
-        headers = {
+        self.headers = {
             "Accept": "application/json",
             "User-Agent": "Cardapioweb-Integrator/15.0"
         }
         
         if api_key:
-            headers[api_key_header] = api_key
+            self.headers[api_key_header] = api_key
         
-        self.client = httpx.AsyncClient(
-            timeout=timeout,
-            headers=headers,
-            follow_redirects=True
-        )
+        self.client = get_shared_client(self.base_url)
     
     async def __aenter__(self):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        # Pool compartilhado: fechado só no shutdown (close_shared_clients)
+        pass
     
     async def request(
         self,
         method: str,
         path: str,
+        quota: str | None = None,
         **kwargs
-    ) -> Optional[Dict[str, Any]]:
+    ) -> dict[str, Any] | None:
         """
         Faz requisição HTTP com retry e error handling.
+        
+        Retries só para falhas transitórias (rede, 408, 429, 5xx), com backoff
+        exponencial + full jitter e respeitando Retry-After. Com o circuito do
+        endpoint aberto, levanta CircuitOpenError sem tocar na rede (fora da
+        raia LIVE, espera o circuito reabrir antes; ver `wait_for_circuit`).
+        
+        Cada tentativa consome um token da classe `quota` (ou a padrão do
+        client) no QuotaGovernor.
         """
         url = f"{self.base_url}{path}"
+        kwargs["headers"] = {**self.headers, **(kwargs.get("headers") or {})}
+        kwargs.setdefault("timeout", self.timeout)
+        
+        breaker = get_circuit_breaker(method, self.base_url, path)
+        await wait_for_circuit(breaker)
+        quota = quota or self.quota
         
         for attempt in range(self.retries):
+            is_last_attempt = attempt == self.retries - 1
+            if quota:
+                await quota_governor.acquire(quota)
             try:
                 response = await self.client.request(method, url, **kwargs)
                 
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    
+                    # Retry-After maior que o teto: não adianta insistir agora
+                    if is_last_attempt or (
+                        retry_after is not None
+                        and retry_after > settings.cardapioweb_retry_max_delay
+                    ):
+                        print(f"❌ API HTTP {response.status_code}: {response.text[:200]}")
+                        breaker.record_failure(cooldown=retry_after)
+                        return None
+                    
+                    await asyncio.sleep(backoff_delay(attempt, retry_after))
+                    continue
+                
+                # Servidor respondeu: o endpoint está de pé, mesmo com 4xx
+                breaker.record_success()
+                
                 if response.status_code == 401:
                     print(f"❌ API {self.base_url}: Unauthorized")
                     raise PermissionError("401 Unauthorized")
@@ -78,26 +333,66 @@ class BaseAPIClient:
                 return response.json()
                 
             except httpx.HTTPStatusError as e:
-                if attempt == self.retries - 1:
-                    print(f"❌ API HTTP {e.response.status_code}: {e.response.text[:200]}")
-                    return None
-                continue
+                # 4xx de requisição inválida: repetir não muda o resultado
+                print(f"❌ API HTTP {e.response.status_code}: {e.response.text[:200]}")
+                return None
                 
             except httpx.RequestError as e:
-                if attempt == self.retries - 1:
+                if is_last_attempt:
                     print(f"❌ API Request error: {e}")
+                    breaker.record_failure()
                     return None
-                continue
+                await asyncio.sleep(backoff_delay(attempt))
         
         return None
     
-    async def get(self, path: str, **kwargs) -> Optional[Dict[str, Any]]:
+    async def get(self, path: str, **kwargs) -> dict[str, Any] | None:
         return await self.request("GET", path, **kwargs)
     
-    async def post(self, path: str, **kwargs) -> Optional[Dict[str, Any]]:
+    async def post(self, path: str, **kwargs) -> dict[str, Any] | None:
         return await self.request("POST", path, **kwargs)
 
 
+async def paginate(
+    fetch_page: Callable[[int], Awaitable[Any]],
+    parse_page: Callable[[Any, int], tuple[list[Any], bool]],
+    start_page: int = 1,
+    prefetch: bool = False,
+) -> AsyncIterator[list[Any]]:
+    """
+    Itera páginas de um endpoint como `async for`, uma lista de itens por vez.
+    
+    `parse_page(resposta, página)` devolve (itens, tem_mais). Com `prefetch`,
+    a próxima página já é buscada enquanto o consumidor processa a atual
+    (ex.: grava no banco). Interromper o `async for` cancela o prefetch.
+    """
+    page = start_page
+    pending: asyncio.Future | None = asyncio.ensure_future(fetch_page(page))
+    
+    try:
+        while pending is not None:
+            response = await pending
+            pending = None
+            
+            items, has_more = parse_page(response, page)
+            
+            if has_more and prefetch:
+                pending = asyncio.ensure_future(fetch_page(page + 1))
+            
+            if items:
+                yield items
+            
+            if not has_more:
+                break
+            
+            page += 1
+            if pending is None:
+                pending = asyncio.ensure_future(fetch_page(page))
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
 def api_method(f: Callable[..., T]) -> Callable[..., T]:
     """
     Decorator para métodos de API com fallback automático.
@@ -1,24 +1,36 @@
 import asyncio
+import time
 
-import httpx
 from sqlalchemy import text
 
 from src.config import settings
 from src.core.logger import logger
 from src.infrastructure.cache.redis_client import redis_client
 from src.infrastructure.db.connection import get_db_session
+from src.infrastructure.external.base_client import get_shared_client
+
+# Token sem validade conhecida (seed do .env): reconsulta o Redis a cada minuto
+UNKNOWN_EXPIRY_RECHECK_SECONDS = 60
+
+# Espera antes de tentar de novo quando a renovação em background falha
+BACKGROUND_RETRY_SECONDS = 30
 
 
 class CardapiowebAuthManager:
     """
     Gerencia o ciclo de vida dos tokens OAuth2 da Cardapioweb.
-    Estratégia: Redis (Cache ultra-rápido) -> PostgreSQL (Persistência) -> Rotação Automática.
+    Estratégia: Memória (com validade) -> Redis (compartilhado) -> PostgreSQL (Persistência) -> Rotação Automática.
+
+    O caminho quente só lê a memória. `run_refresher` renova o token antes de
+    expirar; entre processos, um lock no Redis garante que só um chama o
+    endpoint de auth e os demais adotam o token que ele gravou.
     """
 
     _instance = None
 
     ACCESS_TOKEN_KEY = "cardapioweb:access_token"
     REFRESH_TOKEN_KEY = "cardapioweb:refresh_token"
+    REFRESH_LOCK_KEY = "cardapioweb:refresh_lock"
 
     def __new__(cls):
         if cls._instance is None:
@@ -26,6 +38,9 @@ class CardapiowebAuthManager:
             cls._instance._auth_lock = asyncio.Lock()
             # Guarda o último token conhecido em memória para evitar chamadas redundantes
             cls._instance._memory_access_token = settings.cardapioweb_dashboard_api_key
+            # Relógio monotônico: expiração (None = desconhecida) e próxima renovação
+            cls._instance._expires_at = None
+            cls._instance._refresh_at = 0.0
         return cls._instance
 
     @property
@@ -34,141 +49,282 @@ class CardapiowebAuthManager:
 
     async def get_valid_access_token(self, force_refresh: bool = False) -> str:
         """Retorna um token válido. Se não existir ou for forçado, renova antes."""
-        if not force_refresh:
-            access_token = await redis_client.client.get(self.ACCESS_TOKEN_KEY)
-            if access_token:
-                self._memory_access_token = access_token
-                return self._memory_access_token
+        if force_refresh:
+            return await self.refresh_tokens()
 
-            if self._memory_access_token:
+        if self._memory_access_token and self._is_fresh():
+            return self._memory_access_token
+
+        try:
+            return await self._renew()
+        except Exception as e:
+            if self._memory_access_token and not self._is_expired():
+                logger.warning(
+                    "auth.refresh_deferred",
+                    error=str(e),
+                    msg="Renovação falhou. Usando token em memória ainda válido.",
+                )
                 return self._memory_access_token
+            raise
+
+    async def run_refresher(self):
+        """Loop de renovação em background: troca o token antes de expirar."""
+        while True:
+            await asyncio.sleep(self._seconds_until_refresh())
+
+            try:
+                await self._renew()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("auth.background_refresh_failed", error=str(e))
+                await asyncio.sleep(BACKGROUND_RETRY_SECONDS)
+
+    # Estado em memória
+
+    def _is_fresh(self) -> bool:
+        return time.monotonic() < self._refresh_at
+
+    def _is_expired(self) -> bool:
+        return self._expires_at is not None and time.monotonic() >= self._expires_at
+
+    def _seconds_until_refresh(self) -> float:
+        return max(1.0, self._refresh_at - time.monotonic())
+
+    def _remember(self, access_token: str, ttl_seconds: float | None):
+        now = time.monotonic()
+        self._memory_access_token = access_token
+
+        if ttl_seconds is None:
+            self._expires_at = None
+            self._refresh_at = now + UNKNOWN_EXPIRY_RECHECK_SECONDS
+            return
+
+        self._expires_at = now + ttl_seconds
+        # Renova com a margem configurada (ou na metade da vida, se o token for curto)
+        self._refresh_at = now + max(
+            ttl_seconds - settings.cardapioweb_token_refresh_margin, ttl_seconds / 2
+        )
+
+    async def _renew(self) -> str:
+        """Adota um token mais novo do Redis; se não houver, renova na API."""
+        try:
+            shared_token, ttl = await redis_client.get_with_ttl(self.ACCESS_TOKEN_KEY)
+        except Exception as e:
+            logger.warning("auth.redis_unavailable", error=str(e))
+            shared_token, ttl = None, None
+
+        # Token diferente (outro processo renovou) ou o mesmo, mas agora com validade
+        if shared_token and (
+            shared_token != self._memory_access_token or self._expires_at is None
+        ):
+            self._remember(shared_token, ttl)
+            return shared_token
+
+        if self._memory_access_token and self._expires_at is None:
+            # Seed do .env sem validade conhecida: renovação só reativa (401)
+            self._remember(self._memory_access_token, None)
+            return self._memory_access_token
 
         return await self.refresh_tokens()
 
+    # Coordenação entre processos
+
+    async def _adopt_peer_token(self, stale_token: str | None) -> str | None:
+        """Se outro processo já gravou um token novo no Redis, passa a usá-lo."""
+        try:
+            redis_access_token, ttl = await redis_client.get_with_ttl(
+                self.ACCESS_TOKEN_KEY
+            )
+        except Exception:
+            return None
+
+        if redis_access_token and redis_access_token != stale_token:
+            logger.info(
+                "auth.token_already_refreshed",
+                msg="Token renovado por outro processo. Atualizando estado local.",
+            )
+            self._remember(redis_access_token, ttl)
+            return redis_access_token
+        return None
+
+    async def _acquire_refresh_lock(
+        self, stale_token: str | None
+    ) -> tuple[str | None, str | None]:
+        """
+        Disputa o lock de renovação. Retorna (lock, None) para quem vai renovar
+        ou (None, token) quando outro processo renovou enquanto esperávamos.
+        Sem Redis, segue sem lock.
+        """
+        lock_ttl = settings.cardapioweb_token_refresh_lock_ttl
+        deadline = time.monotonic() + 2 * lock_ttl
+
+        while True:
+            try:
+                lock_token = await redis_client.acquire_lock(
+                    self.REFRESH_LOCK_KEY, lock_ttl
+                )
+            except Exception as e:
+                logger.warning("auth.refresh_lock_unavailable", error=str(e))
+                return None, None
+
+            if lock_token:
+                return lock_token, None
+
+            await asyncio.sleep(0.5)
+
+            adopted = await self._adopt_peer_token(stale_token)
+            if adopted:
+                return None, adopted
+
+            if time.monotonic() >= deadline:
+                raise Exception(
+                    "Timeout aguardando a renovação de token em outro processo."
+                )
+
     async def refresh_tokens(self) -> str:
         """Busca o Refresh Token no Banco/Env, faz a renovação e persiste os novos tokens."""
+        stale_token = self._memory_access_token
+
         async with self._auth_lock:
+            # Outra corrotina deste processo renovou enquanto esperávamos o lock
+            if self._memory_access_token != stale_token:
+                return self._memory_access_token
+
             logger.info(
                 "auth.refresh_token_started",
                 msg="Iniciando renovação do token de acesso",
             )
 
             # --- DOUBLE CHECK ---
-            redis_access_token = await redis_client.client.get(self.ACCESS_TOKEN_KEY)
+            adopted = await self._adopt_peer_token(stale_token)
+            if adopted:
+                return adopted
 
-            if redis_access_token and redis_access_token != self._memory_access_token:
-                logger.info(
-                    "auth.token_already_refreshed",
-                    msg="Token renovado por outro processo. Atualizando estado local.",
-                )
-                self._memory_access_token = redis_access_token
-                return redis_access_token
-
-            # --- BUSCA DO REFRESH TOKEN (CASCATA: Redis -> Postgres -> Env) ---
-            refresh_token = await redis_client.client.get(self.REFRESH_TOKEN_KEY)
-
-            if not refresh_token:
-                async with get_db_session() as session:
-                    result = await session.execute(
-                        text(
-                            "SELECT refresh_token FROM merchant_credentials WHERE merchant_id = :mid AND auth_status = 'ACTIVE'"
-                        ),
-                        {"mid": str(settings.default_merchant_id)},
-                    )
-                    row = result.fetchone()
-                    refresh_token = row[0] if row else None
-
-            # Último recurso (Seed inicial do .env)
-            if not refresh_token:
-                refresh_token = settings.cardapioweb_refresh_token
-
-            if not refresh_token:
-                raise Exception(
-                    "Nenhum Refresh Token ativo no Redis, Banco ou .env. Necessária injeção manual."
-                )
+            # --- LOCK ENTRE PROCESSOS (só um chama o endpoint de auth) ---
+            lock_token, adopted = await self._acquire_refresh_lock(stale_token)
+            if adopted:
+                return adopted
 
-            # --- CHAMADA NA API PARA RENOVAÇÃO ---
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.auth_url,
-                    json={
-                        "grant_type": "refresh_token",
-                        "refresh_token": refresh_token,
-                    },
-                    headers={
-                        "Origin": "https://portal.cardapioweb.com",
-                        "Referer": "https://portal.cardapioweb.com/",
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Mokk/1.0",
-                    },
+            try:
+                return await self._refresh_with_api()
+            finally:
+                if lock_token:
+                    try:
+                        await redis_client.release_lock(
+                            self.REFRESH_LOCK_KEY, lock_token
+                        )
+                    except Exception as e:
+                        logger.warning("auth.refresh_lock_release_failed", error=str(e))
+
+    async def _refresh_with_api(self) -> str:
+        """Troca o refresh token por um par novo e persiste em Postgres e Redis."""
+        # --- BUSCA DO REFRESH TOKEN (CASCATA: Redis -> Postgres -> Env) ---
+        refresh_token = await redis_client.client.get(self.REFRESH_TOKEN_KEY)
+
+        if not refresh_token:
+            async with get_db_session() as session:
+                result = await session.execute(
+                    text(
+                        "SELECT refresh_token FROM merchant_credentials WHERE merchant_id = :mid AND auth_status = 'ACTIVE'"
+                    ),
+                    {"mid": str(settings.default_merchant_id)},
                 )
+                row = result.fetchone()
+                refresh_token = row[0] if row else None
 
-                # Tratamento de erro grave (Token expirado/revogado pela API)
-                if response.status_code != 200:
-                    logger.error(
-                        "auth.refresh_failed",
-                        status=response.status_code,
-                        body=response.text,
-                    )
-
-                    # Atualiza o banco para EXPIRED
-                    async with get_db_session() as session:
-                        await session.execute(
-                            text(
-                                "UPDATE merchant_credentials SET auth_status = 'EXPIRED', updated_at = NOW() WHERE merchant_id = :mid"
-                            ),
-                            {"mid": str(settings.default_merchant_id)},
-                        )
+        # Último recurso (Seed inicial do .env)
+        if not refresh_token:
+            refresh_token = settings.cardapioweb_refresh_token
 
-                    raise Exception(
-                        f"Falha fatal ao renovar tokens. Cadeia de Refresh expirou. É necessário injetar credenciais manualmente. Log: {response.text}"
-                    )
+        if not refresh_token:
+            raise Exception(
+                "Nenhum Refresh Token ativo no Redis, Banco ou .env. Necessária injeção manual."
+            )
 
-                data = response.json()
-                new_access = data.get("access_token")
-                new_refresh = data.get("refresh_token")
+        # --- CHAMADA NA API PARA RENOVAÇÃO ---
+        client = get_shared_client(settings.cardapioweb_auth_base_url)
+        response = await client.post(
+            self.auth_url,
+            json={
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+            },
+            headers={
+                "Origin": "https://portal.cardapioweb.com",
+                "Referer": "https://portal.cardapioweb.com/",
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Mokk/1.0",
+            },
+            timeout=settings.cardapioweb_api_timeout,
+        )
 
-                if not new_access or not new_refresh:
-                    raise ValueError(
-                        "A resposta da API de autenticação não devolveu os tokens esperados."
-                    )
+        # Tratamento de erro grave (Token expirado/revogado pela API)
+        if response.status_code != 200:
+            logger.error(
+                "auth.refresh_failed",
+                status=response.status_code,
+                body=response.text,
+            )
 
-                access_exp = max(
-                    1, int(data.get("access_token_expires_in", 28800)) - 60
-                )
-                refresh_exp = int(data.get("refresh_token_expires_in", 432000))
-
-                # --- 1. PERSISTÊNCIA NO BANCO (Segurança contra reinicializações) ---
-                async with get_db_session() as session:
-                    await session.execute(
-                        text("""
-                            INSERT INTO merchant_credentials (merchant_id, access_token, refresh_token, expires_at, auth_status, updated_at)
-                            VALUES (:mid, :access, :refresh, NOW() + INTERVAL '8 hours', 'ACTIVE', NOW())
-                            ON CONFLICT (merchant_id) DO UPDATE SET
-                                access_token = EXCLUDED.access_token,
-                                refresh_token = EXCLUDED.refresh_token,
-                                expires_at = EXCLUDED.expires_at,
-                                auth_status = 'ACTIVE',
-                                updated_at = NOW()
-                        """),
-                        {
-                            "mid": str(settings.default_merchant_id),
-                            "access": new_access,
-                            "refresh": new_refresh,
-                        },
-                    )
-
-                # --- 2. ATUALIZAÇÃO DO CACHE REDIS (Velocidade) ---
-                await redis_client.client.set(
-                    self.ACCESS_TOKEN_KEY, new_access, ex=access_exp
-                )
-                await redis_client.client.set(
-                    self.REFRESH_TOKEN_KEY, new_refresh, ex=refresh_exp
+            # Atualiza o banco para EXPIRED
+            async with get_db_session() as session:
+                await session.execute(
+                    text(
+                        "UPDATE merchant_credentials SET auth_status = 'EXPIRED', updated_at = NOW() WHERE merchant_id = :mid"
+                    ),
+                    {"mid": str(settings.default_merchant_id)},
                 )
 
-                self._memory_access_token = new_access
+            raise Exception(
+                f"Falha fatal ao renovar tokens. Cadeia de Refresh expirou. É necessário injetar credenciais manualmente. Log: {response.text}"
+            )
 
-                logger.info(
-                    "auth.tokens_refreshed",
-                    msg="Tokens renovados no PostgreSQL e Redis com sucesso.",
-                )
-                return new_access
+        data = response.json()
+        new_access = data.get("access_token")
+        new_refresh = data.get("refresh_token")
+
+        if not new_access or not new_refresh:
+            raise ValueError(
+                "A resposta da API de autenticação não devolveu os tokens esperados."
+            )
+
+        access_exp = max(
+            1, int(data.get("access_token_expires_in", 28800)) - 60
+        )
+        refresh_exp = int(data.get("refresh_token_expires_in", 432000))
+
+        # --- 1. PERSISTÊNCIA NO BANCO (Segurança contra reinicializações) ---
+        async with get_db_session() as session:
+            await session.execute(
+                text("""
+                    INSERT INTO merchant_credentials (merchant_id, access_token, refresh_token, expires_at, auth_status, updated_at)
+                    VALUES (:mid, :access, :refresh, NOW() + INTERVAL '8 hours', 'ACTIVE', NOW())
+                    ON CONFLICT (merchant_id) DO UPDATE SET
+                        access_token = EXCLUDED.access_token,
+                        refresh_token = EXCLUDED.refresh_token,
+                        expires_at = EXCLUDED.expires_at,
+                        auth_status = 'ACTIVE',
+                        updated_at = NOW()
+                """),
+                {
+                    "mid": str(settings.default_merchant_id),
+                    "access": new_access,
+                    "refresh": new_refresh,
+                },
+            )
+
+        # --- 2. ATUALIZAÇÃO DO CACHE REDIS (Velocidade) ---
+        await redis_client.client.set(
+            self.ACCESS_TOKEN_KEY, new_access, ex=access_exp
+        )
+        await redis_client.client.set(
+            self.REFRESH_TOKEN_KEY, new_refresh, ex=refresh_exp
+        )
+
+        self._remember(new_access, access_exp)
+
+        logger.info(
+            "auth.tokens_refreshed",
+            msg="Tokens renovados no PostgreSQL e Redis com sucesso.",
+        )
+        return new_access
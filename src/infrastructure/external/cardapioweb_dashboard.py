@@ -2,15 +2,24 @@
 # CLIENT API DASHBOARD (PLATAFORMA) - CARDAPIOWEB
 # ============================================
 
-from typing import Any, Dict
+from collections.abc import AsyncIterator
 from datetime import datetime
+from typing import Any
 
 from src.config import settings
-from src.infrastructure.external.base_client import BaseAPIClient, api_method
 from src.core.logger import logger
+from src.infrastructure.cache.order_cache import order_cache
+from src.infrastructure.external.base_client import (
+    BaseAPIClient,
+    CircuitOpenError,
+    PageFetchError,
+    api_method,
+    paginate,
+)
 
 # Importa o gerenciador de autenticação isolado
 from src.infrastructure.external.cardapioweb_auth import CardapiowebAuthManager
+from src.infrastructure.external.single_flight import order_flights
 
 
 class CardapiowebDashboardAPI(BaseAPIClient):
@@ -24,9 +33,10 @@ class CardapiowebDashboardAPI(BaseAPIClient):
     def __init__(self):
         super().__init__(
             base_url=settings.cardapioweb_dashboard_base_url,
-            timeout=settings.cardapioweb_api_timeout
+            timeout=settings.cardapioweb_api_timeout,
+            quota="dashboard"
         )
-        self.client.headers.update({
+        self.headers.update({
             "CompanyId": str(settings.default_merchant_id),
             "Accept": "application/json"
         })
@@ -37,7 +47,7 @@ class CardapiowebDashboardAPI(BaseAPIClient):
         """Busca o token válido no AuthManager e injeta nos headers."""
         token = await self.auth_manager.get_valid_access_token(force_refresh=force_refresh)
         if token:
-            self.client.headers.update({"Authorization": token})
+            self.headers.update({"Authorization": token})
 
     async def _execute_with_auth(self, method_name: str, endpoint: str, **kwargs) -> Any:
         """
@@ -49,6 +59,8 @@ class CardapiowebDashboardAPI(BaseAPIClient):
         method = getattr(self, method_name)
         try:
             return await method(endpoint, **kwargs)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             error_str = str(e).lower()
             if "401" in error_str or "unauthorized" in error_str:
@@ -58,7 +70,7 @@ class CardapiowebDashboardAPI(BaseAPIClient):
             raise e
             
     @api_method
-    async def get_order_details(self, order_id: int) -> Dict[str, Any]:
+    async def get_order_details(self, order_id: int) -> dict[str, Any]:
         """
         Busca detalhes completos do pedido na plataforma.
         Endpoint: /v1/company/orders/{orderId}
@@ -73,10 +85,20 @@ class CardapiowebDashboardAPI(BaseAPIClient):
                 }
             }
             
-        return await self._execute_with_auth("get", f"/v1/company/orders/{order_id}")
+        # Chamadas concorrentes do mesmo pedido (released, closed, reconciliação) viram uma só
+        return await order_flights.do(
+            ("dashboard.get_order_details", order_id),
+            lambda: order_cache.read_through(
+                "dashboard",
+                order_id,
+                lambda: self._execute_with_auth(
+                    "get", f"/v1/company/orders/{order_id}"
+                ),
+            ),
+        )
     
     @api_method
-    async def get_delivery_info(self, order_id: int) -> Dict[str, Any]:
+    async def get_delivery_info(self, order_id: int) -> dict[str, Any]:
         """
         Busca informações de entrega.
         A rota específica /delivery retorna 302 (redirect) na Cardapioweb,
@@ -100,18 +122,20 @@ class CardapiowebDashboardAPI(BaseAPIClient):
         
         return await self._execute_with_auth("get", "/v2/company/delivery_men/orders_summary", params=params)
 
-    @api_method
-    async def get_orders_by_delivery_man(self, delivery_man_id: int, start_date: datetime, end_date: datetime) -> list:
+    def iter_orders_by_delivery_man(
+        self,
+        delivery_man_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        prefetch: bool = False,
+    ) -> AsyncIterator[list]:
         """
-        Busca a lista completa de pedidos entregues por um motoboy específico (com paginação).
+        Itera, página a página, os pedidos entregues por um motoboy no período.
         """
         start_str = start_date.strftime("%Y-%m-%dT%H:%M:%S.000-03:00")
         end_str = end_date.strftime("%Y-%m-%dT%H:%M:%S.000-03:00")
-        
-        all_orders = []
-        page = 1
-        
-        while True:
+
+        async def fetch_page(page: int):
             params = {
                 "page": page,
                 "per_page": 100,
@@ -120,19 +144,25 @@ class CardapiowebDashboardAPI(BaseAPIClient):
                 "q[order_filters][order_dispatch_date_lteq]": end_str,
                 "q[delivery_man_filters][id_eq]": delivery_man_id
             }
-            
-            response = await self._execute_with_auth("get", "/v2/company/delivery_men/orders", params=params)
-            
-            if not response or not isinstance(response, list):
-                break
-                
-            all_orders.extend(response)
-            
-            if len(response) < 100:
-                break
-                
-            page += 1
-            
+            return await self._execute_with_auth("get", "/v2/company/delivery_men/orders", params=params)
+
+        def parse_page(response, page: int):
+            # Falha na página não é fim da lista: interrompe a iteração
+            if not isinstance(response, list):
+                raise PageFetchError("/v2/company/delivery_men/orders", page)
+            return response, len(response) >= 100
+
+        return paginate(fetch_page, parse_page, prefetch=prefetch)
+
+    @api_method
+    async def get_orders_by_delivery_man(self, delivery_man_id: int, start_date: datetime, end_date: datetime) -> list:
+        """
+        Busca a lista completa de pedidos entregues por um motoboy específico (com paginação).
+        Para períodos longos prefira `iter_orders_by_delivery_man`.
+        """
+        all_orders = []
+        async for orders in self.iter_orders_by_delivery_man(delivery_man_id, start_date, end_date):
+            all_orders.extend(orders)
         return all_orders
     
     @api_method
@@ -142,7 +172,7 @@ class CardapiowebDashboardAPI(BaseAPIClient):
         return await self._execute_with_auth("get", "/v1/company/cash_flows", params=params)
 
     @api_method
-    async def get_cash_flow_summary(self, cash_flow_id: int) -> Dict[str, Any]:
+    async def get_cash_flow_summary(self, cash_flow_id: int) -> dict[str, Any]:
         """Busca o super-resumo financeiro de um caixa específico."""
         return await self._execute_with_auth("get", f"/v1/company/cash_flow/{cash_flow_id}/summary")
 
@@ -157,45 +187,58 @@ class CardapiowebDashboardAPI(BaseAPIClient):
             return False
         return order_status in ['released', 'dispatched', 'in_transit', 'delivered', 'ready']
     
-    @api_method
-    async def get_cash_flows_by_period(self, merchant_id: str, start_date: datetime, end_date: datetime) -> list:
+    def iter_cash_flow_pages(
+        self, merchant_id: str, per_page: int = 75, prefetch: bool = False
+    ) -> AsyncIterator[list]:
         """
-        Busca os caixas fechados de um período específico.
+        Itera as páginas de caixas, do mais recente para o mais antigo.
+        O consumidor decide quando parar (basta sair do `async for`).
         """
-        page = 1
-        per_page = 75
-        target_cash_flows = []
-        keep_fetching = True
-
-        print(f"Iniciando rastreio de caixas entre {start_date.strftime('%d/%m/%Y')} e {end_date.strftime('%d/%m/%Y')}...")
+        headers = {
+            "CompanyId": str(merchant_id),
+            "Accept": "application/json",
+            "Origin": "https://portal.cardapioweb.com",
+            "Referer": "https://portal.cardapioweb.com/"
+        }
 
-        while keep_fetching:
+        async def fetch_page(page: int):
             params = {
                 "page": page,
                 "per_page": per_page,
                 "order_by": "id",
                 "order": "desc"
             }
-            
-            headers = {
-                "CompanyId": str(merchant_id),
-                "Accept": "application/json",
-                "Origin": "https://portal.cardapioweb.com",
-                "Referer": "https://portal.cardapioweb.com/"
-            }
-            
-            response = await self._execute_with_auth(
+            return await self._execute_with_auth(
                 "get",
-                "/v1/company/cash_flows", 
+                "/v1/company/cash_flows",
                 params=params,
                 headers=headers
             )
-            
+
+        def parse_page(response, page: int):
+            # Falha na página não é fim do histórico de caixas: interrompe a iteração
+            if response is None or (
+                isinstance(response, dict) and response.get("_api_error")
+            ):
+                raise PageFetchError("/v1/company/cash_flows", page)
             items = response if isinstance(response, list) else response.get("data", [])
-            
-            if not items:
-                print("Fim absoluto do histórico da loja atingido.")
-                break
+            return items, bool(items)
+
+        return paginate(fetch_page, parse_page, prefetch=prefetch)
+
+    @api_method
+    async def get_cash_flows_by_period(self, merchant_id: str, start_date: datetime, end_date: datetime) -> list:
+        """
+        Busca os caixas fechados de um período específico.
+        """
+        target_cash_flows = []
+        page = 0
+
+        print(f"Iniciando rastreio de caixas entre {start_date.strftime('%d/%m/%Y')} e {end_date.strftime('%d/%m/%Y')}...")
+
+        async for items in self.iter_cash_flow_pages(merchant_id):
+            page += 1
+            reached_start = False
 
             for item in items:
                 if item.get("status") != "close":
@@ -211,13 +254,17 @@ class CardapiowebDashboardAPI(BaseAPIClient):
                     continue
                     
                 if open_at_dt < start_date:
-                    keep_fetching = False
+                    reached_start = True
                     break
                     
                 target_cash_flows.append(item)
 
             print(f"Página {page} processada. Caixas encontrados no alvo até agora: {len(target_cash_flows)}")
-            page += 1
+
+            if reached_start:
+                break
+        else:
+            print("Fim absoluto do histórico da loja atingido.")
 
         target_cash_flows.reverse()
-        return target_cash_flows
\ No newline at end of file
+        return target_cash_flows
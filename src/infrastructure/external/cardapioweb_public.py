@@ -2,11 +2,19 @@
 # CLIENT API PÚBLICA (PARTNER) - CARDAPIOWEB
 # ============================================
 
+from collections.abc import AsyncIterator
 from datetime import datetime
 from typing import Any
 
 from src.config import settings
-from src.infrastructure.external.base_client import BaseAPIClient, api_method
+from src.infrastructure.cache.order_cache import order_cache
+from src.infrastructure.external.base_client import (
+    BaseAPIClient,
+    PageFetchError,
+    api_method,
+    paginate,
+)
+from src.infrastructure.external.single_flight import order_flights
 
 
 class CardapiowebPublicAPI(BaseAPIClient):
@@ -19,7 +27,7 @@ class CardapiowebPublicAPI(BaseAPIClient):
 
     def __init__(self):
         super().__init__(base_url=settings.cardapioweb_public_base_url)
-        self.client.headers.update(
+        self.headers.update(
             {
                 "X-API-KEY": settings.cardapioweb_public_api_key,
                 "Accept": "application/json",
@@ -44,18 +52,29 @@ class CardapiowebPublicAPI(BaseAPIClient):
                 "deliveryAddress": {"lat": -23.425, "lng": -51.915},
             }
 
-        return await self.get(f"/orders/{order_id}")
+        # Chamadas concorrentes do mesmo pedido (worker, reconciliação) viram uma só;
+        # a leitura do cache também entra no voo compartilhado
+        return await order_flights.do(
+            ("partner.get_order", order_id),
+            lambda: order_cache.read_through(
+                "partner",
+                order_id,
+                lambda: self.get(f"/orders/{order_id}", quota="details"),
+            ),
+        )
 
     @api_method
     async def get_order_by_display_id(self, display_id: str) -> dict[str, Any]:
         """Busca pedido por display ID (UID curto)."""
-        return await self.get(f"/orders/by-display-id/{display_id}")
+        return await self.get(
+            f"/orders/by-display-id/{display_id}", quota="details"
+        )
 
     @api_method
     async def get_orders_history_page(
         self, start_date: datetime, end_date: datetime, page: int = 1
     ) -> dict[str, Any]:
-        """Busca apenas UMA página do histórico. O Rate Limit é controlado pelo serviço."""
+        """Busca apenas UMA página do histórico (cota "history" do QuotaGovernor)."""
 
         start_str = start_date.strftime("%Y-%m-%dT%H:%M:%S.000-03:00")
         end_str = end_date.strftime("%Y-%m-%dT%H:%M:%S.000-03:00")
@@ -67,4 +86,43 @@ class CardapiowebPublicAPI(BaseAPIClient):
             "per_page": 100,
         }
 
-        return await self.get("/orders/history", params=params)
+        return await self.get("/orders/history", params=params, quota="history")
+
+    def iter_orders_history_pages(
+        self, start_date: datetime, end_date: datetime, prefetch: bool = False
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """
+        Itera o histórico página a página (`async for pedidos in ...`).
+
+        Com `prefetch`, a página seguinte é buscada enquanto o chamador
+        processa a atual; a memória fica limitada a duas páginas.
+        """
+        return paginate(
+            lambda page: self.get_orders_history_page(start_date, end_date, page),
+            _parse_history_page,
+            prefetch=prefetch,
+        )
+
+
+def _parse_history_page(response: Any, page: int) -> tuple[list, bool]:
+    """Aceita os dois formatos de resposta do histórico (pagination / meta)."""
+    if isinstance(response, list):
+        return response, len(response) >= 100
+
+    # Erro da API não é fim do histórico: quem itera não pode dar a varredura por completa
+    if not isinstance(response, dict) or response.get("_api_error"):
+        raise PageFetchError("/orders/history", page)
+
+    orders = response.get("orders") or response.get("data") or []
+
+    pagination = response.get("pagination")
+    if pagination:
+        current_page = pagination.get("current_page", page)
+        last_page = pagination.get("total_pages", 1)
+    else:
+        current_page = page
+        last_page = response.get("meta", {}).get(
+            "last_page", response.get("lastPage", 1)
+        )
+
+    return orders, bool(orders) and current_page < last_page
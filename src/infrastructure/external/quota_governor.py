@@ -0,0 +1,192 @@
+# ============================================
+# QUOTA GOVERNOR - RATE LIMIT DE SAÍDA (CARDAPIOWEB)
+# ============================================
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from functools import wraps
+
+from src.config import settings
+from src.core.logger import logger
+from src.infrastructure.cache.redis_client import redis_client
+
+# Classes de endpoint e seus limites (requisições por minuto)
+QUOTA_BUCKETS = {
+    "history": lambda: settings.cardapioweb_history_rate_limit,
+    "details": lambda: settings.cardapioweb_details_rate_limit,
+    "dashboard": lambda: settings.cardapioweb_dashboard_rate_limit,
+}
+
+
+class ApiPriority(IntEnum):
+    """Raias de prioridade das chamadas externas (menor valor = mais urgente)."""
+
+    LIVE = 0
+    RECONCILIATION = 1
+    BACKFILL = 2
+
+
+# Fração da capacidade do bucket que cada raia precisa deixar livre. A raia
+# LIVE reserva sempre (e entra na fila com saldo negativo); as demais só
+# consomem o que sobra acima do piso, então nunca atrasam um pedido ao vivo.
+LANE_RESERVE_FRACTION = {
+    ApiPriority.LIVE: None,
+    ApiPriority.RECONCILIATION: 0.25,
+    ApiPriority.BACKFILL: 0.5,
+}
+
+api_priority: ContextVar[ApiPriority] = ContextVar(
+    "api_priority", default=ApiPriority.LIVE
+)
+
+
+class SharedLane:
+    """Raia de uma chamada compartilhada (single-flight): sobe quando um chamador mais urgente entra."""
+
+    def __init__(self, priority: ApiPriority):
+        self.priority = priority
+
+    def promote(self, priority: ApiPriority) -> None:
+        self.priority = min(self.priority, priority)
+
+
+shared_lane: ContextVar[SharedLane | None] = ContextVar("shared_lane", default=None)
+
+
+def current_priority() -> ApiPriority:
+    """Raia efetiva: a do contexto, elevada pela raia compartilhada, se houver."""
+    priority = api_priority.get()
+    lane = shared_lane.get()
+    return priority if lane is None else min(priority, lane.priority)
+
+
+@contextmanager
+def priority_lane(priority: ApiPriority):
+    """Rebaixa a prioridade das chamadas de API no bloco (nunca eleva)."""
+    token = api_priority.set(max(api_priority.get(), priority))
+    try:
+        yield
+    finally:
+        api_priority.reset(token)
+
+
+def in_priority_lane(priority: ApiPriority):
+    """Decorator: roda a corrotina inteira na raia `priority`."""
+
+    def decorator(f):
+        @wraps(f)
+        async def wrapper(*args, **kwargs):
+            with priority_lane(priority):
+                return await f(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class LocalTokenBucket:
+    """Mesmo algoritmo do script Lua, em memória (fallback sem Redis)."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self, requested: int = 1, floor: float | None = None) -> tuple[bool, float]:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated_at) * self.refill_per_second,
+        )
+        self.updated_at = now
+
+        if floor is not None and self.tokens - requested < floor:
+            return False, (floor + requested - self.tokens) / self.refill_per_second
+
+        self.tokens -= requested
+        wait = -self.tokens / self.refill_per_second if self.tokens < 0 else 0.0
+        return True, wait
+
+
+class QuotaGovernor:
+    """
+    Token bucket por classe de endpoint, compartilhado no Redis entre API,
+    worker e jobs: todos os processos gastam da mesma cota.
+
+    Cada chamada reserva um token e dorme só o necessário até a vez dela,
+    em vez de sleeps fixos conservadores. A capacidade (rajada) é 10% do
+    limite por minuto, para que nenhuma janela de 60s passe de ~110% do
+    limite mesmo começando com o bucket cheio.
+
+    A raia da chamada vem de `current_priority()`: reconciliação e backfill
+    só usam a sobra acima do piso da sua raia.
+
+    Sem Redis, cai para um bucket local com o mesmo limite.
+    """
+
+    def __init__(self):
+        self._local_buckets: dict[str, LocalTokenBucket] = {}
+
+    def _bucket_params(self, bucket: str) -> tuple[float, float]:
+        per_minute = max(1, QUOTA_BUCKETS[bucket]())
+        capacity = max(1.0, per_minute / 10)
+        return capacity, per_minute / 60.0
+
+    async def acquire(self, bucket: str) -> None:
+        """Bloqueia até haver cota para uma requisição na classe `bucket`."""
+        capacity, refill_per_second = self._bucket_params(bucket)
+
+        while True:
+            # Relida a cada volta: uma chamada compartilhada pode ter sido promovida
+            priority = current_priority()
+
+            # Piso proporcional ao que cabe acima de 1 token (bucket de 1 token: piso 0)
+            fraction = LANE_RESERVE_FRACTION[priority]
+            floor = None if fraction is None else fraction * (capacity - 1)
+
+            reserved, wait = await self._reserve(
+                bucket, capacity, refill_per_second, floor
+            )
+
+            if wait > 0:
+                logger.debug(
+                    "quota.waiting",
+                    bucket=bucket,
+                    lane=priority.name,
+                    wait_seconds=round(wait, 2),
+                )
+                # Sem token reservado, espera em fatias para perceber a promoção
+                await asyncio.sleep(wait if reserved else min(wait, 1.0))
+
+            if reserved:
+                return
+
+    async def _reserve(
+        self,
+        bucket: str,
+        capacity: float,
+        refill_per_second: float,
+        floor: float | None,
+    ) -> tuple[bool, float]:
+        try:
+            return await redis_client.reserve_tokens(
+                f"quota:cardapioweb:{bucket}",
+                capacity,
+                refill_per_second,
+                floor=floor,
+            )
+        except Exception as e:
+            local_bucket = self._local_buckets.get(bucket)
+            if local_bucket is None:
+                local_bucket = LocalTokenBucket(capacity, refill_per_second)
+                self._local_buckets[bucket] = local_bucket
+                logger.warning("quota.local_fallback", bucket=bucket, error=str(e))
+            return local_bucket.reserve(floor=floor)
+
+
+# Singleton global
+quota_governor = QuotaGovernor()
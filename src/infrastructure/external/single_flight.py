@@ -0,0 +1,62 @@
+# ============================================
+# SINGLE FLIGHT - COALESCÊNCIA DE CHAMADAS EM VOO
+# ============================================
+
+import asyncio
+import contextvars
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from src.infrastructure.external.quota_governor import (
+    SharedLane,
+    current_priority,
+    shared_lane,
+)
+
+
+class SingleFlight:
+    """
+    Chamadas concorrentes com a mesma chave compartilham UMA execução.
+
+    O primeiro chamador dispara a corrotina numa task; quem chega enquanto
+    ela está em voo aguarda o mesmo resultado (ou a mesma exceção). Nada é
+    guardado depois que a task termina: não é cache.
+
+    A chave não inclui a raia de prioridade: a task roda numa `SharedLane`
+    que assume a raia mais urgente entre os que esperam, então uma chamada
+    ao vivo que se junta a uma de reconciliação a promove para LIVE.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, tuple[asyncio.Task, SharedLane]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        priority = current_priority()
+        flight = self._in_flight.get(key)
+
+        if flight is None:
+            lane = SharedLane(priority)
+            context = contextvars.copy_context()
+            context.run(shared_lane.set, lane)
+
+            task = asyncio.get_running_loop().create_task(fn(), context=context)
+            self._in_flight[key] = (task, lane)
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            task, lane = flight
+            lane.promote(priority)
+
+        # shield: cancelar um chamador não derruba a chamada dos demais
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        flight = self._in_flight.get(key)
+        if flight is not None and flight[0] is task:
+            del self._in_flight[key]
+        # Marca a exceção como consumida mesmo se todos os chamadores saíram
+        if not task.cancelled():
+            task.exception()
+
+
+# Singleton global (chamadas de pedido às APIs da Cardapioweb)
+order_flights = SingleFlight()
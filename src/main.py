@@ -1,15 +1,19 @@
+import asyncio
 import uuid
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy import text
 
+from src.api.routes import admin, webhooks
 from src.config import settings
+from src.core.logger import logger
+from src.core.services.inbox_batch_writer import inbox_batch_writer
+from src.core.services.inbox_spool import inbox_spool
 from src.infrastructure.cache.redis_client import redis_client
 from src.infrastructure.db.connection import close_db, init_db
-from src.api.routes import webhooks, admin
-from src.core.logger import logger
+from src.infrastructure.external.base_client import close_shared_clients
 from src.infrastructure.external.cardapioweb_auth import CardapiowebAuthManager
 
 
@@ -40,6 +44,14 @@ async def lifespan(app: FastAPI):
     #         # Não criamos tabelas aqui - SQL de initdb cuida disso
     #         pass
 
+    # Replay do spool local (eventos recebidos com Postgres/Redis fora)
+    spool_drainer = None
+    if settings.spool_enabled:
+        spool_drainer = asyncio.create_task(inbox_spool.run_drainer())
+
+    # Renova o token da Dashboard antes de expirar (fora do caminho das requisições)
+    token_refresher = asyncio.create_task(CardapiowebAuthManager().run_refresher())
+
     logger.info("startup.ready")
 
     yield
@@ -47,6 +59,16 @@ async def lifespan(app: FastAPI):
     # ========== SHUTDOWN ==========
     logger.info("shutdown.starting")
 
+    token_refresher.cancel()
+    await asyncio.gather(token_refresher, return_exceptions=True)
+
+    if spool_drainer:
+        spool_drainer.cancel()
+        await asyncio.gather(spool_drainer, return_exceptions=True)
+
+    await inbox_batch_writer.drain()
+    await inbox_spool.close()
+    await close_shared_clients()
     await close_db()
     await redis_client.disconnect()
 
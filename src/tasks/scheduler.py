@@ -1,15 +1,20 @@
-from datetime import datetime
+import zoneinfo
+from datetime import datetime, timedelta
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy import text
 
+from src.config import settings
 from src.core.logger import logger
-from src.core.services.snapshot_service import SnapshotService
 from src.core.services.reconciliation_service import ReconciliationService
+from src.core.services.snapshot_service import SnapshotService
+from src.infrastructure.cache.merchant_config import merchant_configs
 from src.infrastructure.db.connection import get_db_session
 from src.infrastructure.external.cardapioweb_auth import CardapiowebAuthManager
-from src.config import settings
+
+SAO_PAULO_TZ = zoneinfo.ZoneInfo("America/Sao_Paulo")
 
 async def _run_snapshot_job():
     """Wrapper para instanciar e rodar o serviço de snapshots (Fase 1/3)."""
@@ -24,25 +29,16 @@ async def _run_proactive_token_rotation():
     Se sim, força a renovação preventiva dos tokens para o expediente.
     """
     try:
-        async with get_db_session() as session:
-            # Busca lojas ativas cujo horário de abertura é na próxima hora.
-            query = text("""
-                SELECT merchant_id, default_start_time 
-                FROM merchants 
-                WHERE is_active = TRUE 
-                  AND merchant_id = :mid
-                  AND EXTRACT(HOUR FROM default_start_time) = EXTRACT(HOUR FROM (NOW() AT TIME ZONE 'America/Sao_Paulo' + INTERVAL '1 hour'))
-            """)
-            
-            result = await session.execute(query, {"mid": str(settings.default_merchant_id)})
-            merchant_to_refresh = result.fetchone()
+        # Loja ativa cujo horário de abertura é na próxima hora (config em cache)
+        merchant = await merchant_configs.get(str(settings.default_merchant_id))
+        next_hour = (datetime.now(SAO_PAULO_TZ) + timedelta(hours=1)).hour
 
-        if merchant_to_refresh:
-            merchant_id, start_time = merchant_to_refresh
+        if merchant and merchant.is_active and merchant.default_start_time.hour == next_hour:
+            merchant_id = merchant.merchant_id
             logger.info(
                 "scheduler.proactive_rotation_triggered", 
                 merchant=merchant_id, 
-                opening_time=str(start_time),
+                opening_time=str(merchant.default_start_time),
                 msg="Loja abre em breve. Iniciando renovação preventiva de tokens."
             )
             
@@ -70,17 +66,15 @@ async def auto_close_shifts_and_reconcile():
     """
     try:
         async with get_db_session() as session:
-            # Busca lojas ativas cujo horário de encerramento acabou de passar
-            query = text("""
-                SELECT merchant_id 
-                FROM merchants 
-                WHERE is_active = TRUE 
-                  AND EXTRACT(HOUR FROM default_end_time) = EXTRACT(HOUR FROM NOW() AT TIME ZONE 'America/Sao_Paulo')
-            """)
-            result = await session.execute(query)
-            merchants_closing = result.fetchall()
-
-            for (merchant_id,) in merchants_closing:
+            # Lojas ativas cujo horário de encerramento acabou de passar
+            current_hour = datetime.now(SAO_PAULO_TZ).hour
+            merchants_closing = [
+                merchant.merchant_id
+                for merchant in await merchant_configs.list_active(session)
+                if merchant.default_end_time.hour == current_hour
+            ]
+
+            for merchant_id in merchants_closing:
                 # 1. Procura se a loja tem um caixa aberto
                 shift_query = text("""
                     SELECT id, opened_at FROM operation_days 
@@ -4,8 +4,12 @@
 # ============================================
 
 import asyncio
+import contextlib
 import json
+import os
+import random
 import signal
+import socket
 from datetime import datetime
 
 from sqlalchemy import text
@@ -16,9 +20,21 @@ from src.config import settings
 from src.core.logger import logger
 from src.core.services.order_enrichment import OrderEnrichmentService
 from src.core.services.historical_sync_service import HistoricalSyncService
+from src.core.services.inbox_stream_persister import InboxStreamPersister
 
+from src.infrastructure.cache.merchant_config import merchant_configs
+from src.infrastructure.cache.order_cache import order_cache
 from src.infrastructure.cache.redis_client import redis_client
 from src.infrastructure.db.connection import get_db_session
+from src.infrastructure.db.notifications import (
+    INBOX_CHANNEL,
+    MERCHANT_CONFIG_CHANNEL,
+    PgNotificationListener,
+)
+from src.infrastructure.external.base_client import (
+    CircuitOpenError,
+    close_shared_clients,
+)
 from src.infrastructure.external.cardapioweb_auth import CardapiowebAuthManager
 from src.infrastructure.external.cardapioweb_dashboard import CardapiowebDashboardAPI
 from src.tasks.scheduler import start_scheduler
@@ -33,8 +49,22 @@ class WebhookWorker:
         self.running = False
         self.poll_interval = settings.worker_poll_interval
         self.batch_size = settings.worker_batch_size
+        self.concurrency = max(1, settings.worker_concurrency)
         self.max_retries = settings.worker_max_retries
         self.merchant_id = settings.default_merchant_id
+        self.lease_seconds = settings.worker_lease_seconds
+        self.reaper_interval = settings.worker_reaper_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"[:50]
+        self.sync_concurrency = max(1, settings.worker_sync_concurrency)
+        self.sync_poll_interval = settings.worker_sync_poll_interval
+        self._sync_tasks: set[asyncio.Task] = set()
+
+        self.listen_enabled = settings.worker_listen_enabled
+        self.listener = PgNotificationListener()
+        self._inbox_signal = asyncio.Event()
+        self.listener.subscribe(INBOX_CHANNEL, lambda _payload: self._inbox_signal.set())
+        self.listener.subscribe(MERCHANT_CONFIG_CHANNEL, merchant_configs.invalidate)
+        self._listener_retry_at = 0.0
 
     async def start(self):
         import time
@@ -47,6 +77,9 @@ class WebhookWorker:
 
         await redis_client.connect()
 
+        # LISTEN desde o início: worker sempre ocupado também recebe invalidações
+        await self._ensure_listener()
+
         try:
             print("Validando token de acesso da API Cardapioweb...")
             await CardapiowebAuthManager().get_valid_access_token()
@@ -58,20 +91,42 @@ class WebhookWorker:
             )
 
         print(
-            f"🔄 Worker iniciado (intervalo: {self.poll_interval}s | batch: {self.batch_size})"
+            f"🔄 Worker iniciado (intervalo: {self.poll_interval}s | batch: {self.batch_size} | concorrência: {self.concurrency})"
         )
 
         logger.info(
-            "worker.started", interval=self.poll_interval, batch_size=self.batch_size
+            "worker.started",
+            interval=self.poll_interval,
+            batch_size=self.batch_size,
+            concurrency=self.concurrency,
         )
 
+        # Backfills rodam em raia própria: o loop do inbox nunca espera por eles
+        sync_lane = asyncio.create_task(self._sync_jobs_loop())
+
+        # Token da Dashboard renovado em background, antes de expirar
+        token_refresher = asyncio.create_task(CardapiowebAuthManager().run_refresher())
+
+        # Modo stream: a API só publica no Redis; aqui o stream vira linhas do inbox
+        persister_lane = None
+        if settings.inbox_ingestion_mode == "stream":
+            persister_lane = asyncio.create_task(InboxStreamPersister().run())
+
+        last_reap = 0.0
+
         while self.running:
             try:
                 start_time = time.time()
-                
+
+                await self._ensure_listener()
+
+                if start_time - last_reap >= self.reaper_interval:
+                    await self._reap_expired_leases()
+                    last_reap = start_time
+
+                # Limpa ANTES do claim: um NOTIFY que chegue durante o lote não se perde
+                self._inbox_signal.clear()
                 processed = await self._process_batch()
-                
-                await self._process_sync_jobs()
 
                 duration = time.time() - start_time
 
@@ -89,78 +144,379 @@ class WebhookWorker:
                             msg="Lote cheio processado. Fila pode estar atrasada.",
                         )
                 else:
-                    await asyncio.sleep(self.poll_interval)
+                    await self._wait_for_work()
 
             except Exception as e:
                 logger.error("worker.batch_error", error=str(e), exc_info=True)
                 await asyncio.sleep(self.poll_interval)
 
+        sync_lane.cancel()
+        token_refresher.cancel()
+        for task in list(self._sync_tasks):
+            task.cancel()
+        await asyncio.gather(
+            sync_lane, token_refresher, *self._sync_tasks, return_exceptions=True
+        )
+
+        if persister_lane:
+            # Entradas lidas e não confirmadas ficam pendentes e são reassumidas
+            persister_lane.cancel()
+            await asyncio.gather(persister_lane, return_exceptions=True)
+
+        try:
+            await self._release_own_leases()
+        except Exception as e:
+            logger.warning("worker.release_leases_failed", error=str(e))
+
+        await self.listener.close()
+        await close_shared_clients()
+
         print("Worker encerrado")
 
     def stop(self):
         print("Recebido sinal de parada...")
         self.running = False
 
-    async def _process_sync_jobs(self):
-        """Busca e executa UM trabalho de sincronização pendente por ciclo."""
+    async def _ensure_listener(self):
+        """
+        Conecta (ou reconecta) a conexão LISTEN.
+
+        Falha não interrompe o worker: segue em polling e tenta de novo
+        depois de algumas voltas.
+        """
+        if not self.listen_enabled or self.listener.is_connected:
+            return
+
+        now = asyncio.get_running_loop().time()
+        if now < self._listener_retry_at:
+            return
+
+        try:
+            await self.listener.connect()
+        except Exception as e:
+            self._listener_retry_at = now + self.poll_interval * 6
+            logger.warning("worker.listen_unavailable", error=str(e))
+            return
+
+        # Invalidações emitidas enquanto desconectado se perderam
+        merchant_configs.invalidate()
+
+    async def _wait_for_work(self):
+        """
+        Aguarda um NOTIFY do webhook_inbox ou, no máximo, `poll_interval`.
+
+        Sem LISTEN (desabilitado ou conexão caída) vira o polling tradicional.
+        """
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._inbox_signal.wait(), timeout=self.poll_interval)
+
+    async def _sync_jobs_loop(self):
+        """
+        Raia dedicada aos jobs de sincronização histórica.
+
+        Roda até `worker_sync_concurrency` jobs em paralelo, cada um como task
+        própria, sem nunca bloquear o processamento dos webhooks ao vivo.
+        """
+        while self.running:
+            try:
+                if len(self._sync_tasks) < self.sync_concurrency:
+                    job = await self._claim_sync_job()
+                    if job:
+                        task = asyncio.create_task(self._run_sync_job(*job))
+                        self._sync_tasks.add(task)
+                        task.add_done_callback(self._sync_tasks.discard)
+                        continue
+            except Exception as e:
+                logger.error("worker.sync_lane_error", error=str(e), exc_info=True)
+
+            await asyncio.sleep(self.sync_poll_interval)
+
+    async def _claim_sync_job(self) -> tuple | None:
+        """Reivindica UM trabalho de sincronização pendente (claim atômico)."""
         async with get_db_session() as session:
-            # Usa FOR UPDATE SKIP LOCKED para garantir que 2 workers não peguem o mesmo Job
+            # SKIP LOCKED + UPDATE garante que 2 workers não peguem o mesmo Job
             query = text("""
-                SELECT id, merchant_id, start_date, end_date 
-                FROM sync_jobs 
-                WHERE status = 'pending' 
-                ORDER BY created_at ASC LIMIT 1
-                FOR UPDATE SKIP LOCKED
+                UPDATE sync_jobs
+                SET status = 'processing', updated_at = NOW()
+                WHERE id = (
+                    SELECT id FROM sync_jobs
+                    WHERE status = 'pending'
+                    ORDER BY created_at ASC LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, merchant_id, start_date, end_date
             """)
             result = await session.execute(query)
             job = result.fetchone()
 
-        if job:
-            job_id, merchant_id, start_date, end_date = job
+        return tuple(job) if job else None
+
+    async def _run_sync_job(self, job_id, merchant_id, start_date, end_date):
+        logger.info("worker.sync_job_dispatched", job_id=job_id, merchant_id=merchant_id)
+        try:
             sync_service = HistoricalSyncService()
             await sync_service.run_job(job_id, merchant_id, start_date, end_date)
+        except asyncio.CancelledError:
+            # Worker parando: devolve o job para a fila para ser retomado depois
+            async with get_db_session() as session:
+                await session.execute(
+                    text(
+                        "UPDATE sync_jobs SET status = 'pending', updated_at = NOW() WHERE id = :job_id"
+                    ),
+                    {"job_id": job_id},
+                )
+            raise
 
     async def _process_batch(self) -> int:
-        """Processa lote de eventos pendentes."""
+        """
+        Reivindica um lote e processa particionado por order_id.
+
+        O claim entrega no máximo um evento por pedido (o mais antigo em
+        aberto); pedidos diferentes rodam em paralelo até `worker_concurrency`.
+        Enquanto o lote roda, um heartbeat renova o lease dos eventos ainda
+        em posse deste worker, para o reaper não devolvê-los à fila.
+        """
+        events = await self._claim_pending()
+        if not events:
+            return 0
+
+        partitions: dict[int | str, list[tuple]] = {}
+        for event in events:
+            event_id, order_id = event[0], event[1]
+            key = order_id if order_id is not None else event_id
+            partitions.setdefault(key, []).append(event)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        heartbeat = asyncio.create_task(self._lease_heartbeat())
+        try:
+            results = await asyncio.gather(
+                *(
+                    self._process_partition(partition, semaphore)
+                    for partition in partitions.values()
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
         processed_count = 0
+        for result in results:
+            # CancelledError é BaseException: também não pode virar contagem
+            if isinstance(result, BaseException):
+                logger.error("worker.partition_failed", error=str(result))
+            else:
+                processed_count += result
 
-        async with get_db_session() as session:
-            events = await self._fetch_pending(session)
+        return processed_count
 
-            for event in events:
+    async def _process_partition(
+        self, events: list[tuple], semaphore: asyncio.Semaphore
+    ) -> int:
+        """Processa os eventos de UM pedido, em ordem, um de cada vez."""
+        processed_count = 0
+
+        async with semaphore:
+            for index, event in enumerate(events):
                 if not self.running:
                     break
 
-                success = await self._process_event(session, event)
+                try:
+                    success = await self._process_event(event)
+                except CircuitOpenError as e:
+                    # Falha rápida: o pedido inteiro volta para a fila (ordem preservada)
+                    await self._defer_events(
+                        [pending[0] for pending in events[index:]], e
+                    )
+                    break
+
                 if success:
                     processed_count += 1
 
-            if events:
-                await session.commit()
-
         return processed_count
 
-    async def _fetch_pending(self, session: AsyncSession) -> list:
-        """Busca eventos pendentes."""
+    async def _lease_heartbeat(self):
+        """Renova, a cada terço do lease, os eventos que este worker ainda processa."""
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with get_db_session() as session:
+                    await session.execute(
+                        text("""
+                            UPDATE webhook_inbox
+                            SET lease_expires_at = NOW() + make_interval(secs => :lease_seconds)
+                            WHERE status = 'processing'
+                              AND worker_id = :worker_id
+                        """),
+                        {
+                            "worker_id": self.worker_id,
+                            "lease_seconds": float(self.lease_seconds),
+                        },
+                    )
+            except Exception as e:
+                logger.warning("worker.lease_heartbeat_failed", error=str(e))
+
+    async def _claim_pending(self) -> list:
+        """
+        Reivindica eventos pendentes com lease (status='processing' + worker_id).
+
+        O claim é commitado imediatamente: nenhum lock de linha fica aberto
+        durante as chamadas HTTP do enriquecimento.
+
+        Só é elegível o evento mais antigo em aberto ('pending' ou
+        'processing') de cada pedido. Como o filtro olha qualquer evento
+        anterior em aberto, e não apenas os travados, uma réplica que pula o
+        e1 de outra (SKIP LOCKED) também não pega o e2 do mesmo pedido: a
+        ordem por pedido vale entre réplicas, inclusive com eventos adiados
+        (available_at no futuro) segurando os posteriores.
+        """
         query = text("""
-            SELECT event_id, order_id, event_type, order_status,
-                   payload, received_at, processing_attempts
-            FROM webhook_inbox
-            WHERE status = 'pending'
-              AND processing_attempts < :max_retries
-            ORDER BY received_at ASC
-            LIMIT :limit
-            FOR UPDATE SKIP LOCKED
+            WITH candidates AS (
+                SELECT w.event_id
+                FROM webhook_inbox w
+                WHERE w.status = 'pending'
+                  AND w.processing_attempts < :max_retries
+                  AND (w.available_at IS NULL OR w.available_at <= NOW())
+                  AND NOT EXISTS (
+                      SELECT 1 FROM webhook_inbox p
+                      WHERE p.order_id = w.order_id
+                        AND p.status = 'processing'
+                  )
+                  AND NOT EXISTS (
+                      SELECT 1 FROM webhook_inbox o
+                      WHERE o.order_id = w.order_id
+                        AND o.status IN ('pending', 'processing')
+                        AND (o.received_at, o.event_id) < (w.received_at, w.event_id)
+                  )
+                ORDER BY w.received_at ASC
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE webhook_inbox i
+            SET status = 'processing',
+                worker_id = :worker_id,
+                lease_expires_at = NOW() + make_interval(secs => :lease_seconds)
+            FROM candidates c
+            WHERE i.event_id = c.event_id
+            RETURNING i.event_id, i.order_id, i.event_type, i.order_status,
+                      i.payload, i.received_at, i.processing_attempts
         """)
 
-        result = await session.execute(
-            query, {"max_retries": self.max_retries, "limit": self.batch_size}
+        async with get_db_session() as session:
+            result = await session.execute(
+                query,
+                {
+                    "max_retries": self.max_retries,
+                    "limit": self.batch_size,
+                    "worker_id": self.worker_id,
+                    "lease_seconds": float(self.lease_seconds),
+                },
+            )
+            events = result.fetchall()
+
+        # RETURNING não garante ordem
+        return sorted(events, key=lambda event: event[5])
+
+    async def _reap_expired_leases(self) -> int:
+        """
+        Devolve para a fila eventos cujo lease expirou (worker morto ou travado).
+
+        Ao esgotar as tentativas o evento vira 'failed': em 'pending' ele
+        seguraria os eventos posteriores do pedido para sempre.
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                text("""
+                    UPDATE webhook_inbox
+                    SET status = CASE
+                            WHEN processing_attempts + 1 >= :max_retries THEN 'failed'
+                            ELSE 'pending'
+                        END,
+                        processed_at = CASE
+                            WHEN processing_attempts + 1 >= :max_retries THEN NOW()
+                            ELSE processed_at
+                        END,
+                        worker_id = NULL,
+                        lease_expires_at = NULL,
+                        processing_attempts = processing_attempts + 1,
+                        last_error = 'Lease expirado antes da conclusão'
+                    WHERE status = 'processing'
+                      AND lease_expires_at < NOW()
+                    RETURNING event_id, status
+                """),
+                {"max_retries": self.max_retries},
+            )
+            reaped = result.fetchall()
+
+        if reaped:
+            failed = [row[0] for row in reaped if row[1] == "failed"]
+            logger.warning(
+                "worker.leases_reaped",
+                count=len(reaped),
+                event_ids=[row[0] for row in reaped],
+                failed_event_ids=failed,
+            )
+
+        return len(reaped)
+
+    async def _release_own_leases(self):
+        """Devolve para a fila os eventos ainda reivindicados por este worker."""
+        async with get_db_session() as session:
+            await session.execute(
+                text("""
+                    UPDATE webhook_inbox
+                    SET status = 'pending',
+                        worker_id = NULL,
+                        lease_expires_at = NULL
+                    WHERE status = 'processing'
+                      AND worker_id = :worker_id
+                """),
+                {"worker_id": self.worker_id},
+            )
+
+    async def _defer_events(self, event_ids: list[str], error: CircuitOpenError):
+        """
+        Devolve eventos para a fila com available_at no futuro, sem consumir
+        tentativa: circuito aberto não é falha do evento.
+        """
+        delay = error.retry_after * random.uniform(1.0, 1.2)
+
+        async with get_db_session() as session:
+            await session.execute(
+                text("""
+                    UPDATE webhook_inbox
+                    SET status = 'pending',
+                        worker_id = NULL,
+                        lease_expires_at = NULL,
+                        available_at = NOW() + make_interval(secs => :delay),
+                        last_error = :error
+                    WHERE event_id = ANY(:event_ids)
+                      AND worker_id = :worker_id
+                """),
+                {
+                    "event_ids": event_ids,
+                    "delay": delay,
+                    "error": str(error)[:500],
+                    "worker_id": self.worker_id,
+                },
+            )
+
+        logger.warning(
+            "worker.events_deferred",
+            endpoint=error.endpoint,
+            count=len(event_ids),
+            retry_in_seconds=round(delay, 1),
         )
 
-        return result.fetchall()
+    async def _process_event(self, event: tuple) -> bool:
+        """
+        Processa evento individual em duas fases: I/O externo fora de qualquer
+        transação e, em seguida, escrita + baixa no inbox numa transação curta.
 
-    async def _process_event(self, session: AsyncSession, event: tuple) -> bool:
-        """Processa evento individual injetando a sessão (Unit of Work)."""
+        CircuitOpenError sobe para a partição, que adia o evento em vez de
+        marcá-lo como falho.
+        """
         (
             event_id,
             order_id,
@@ -173,176 +529,240 @@ class WebhookWorker:
         log = logger.bind(event_id=event_id, order_id=order_id, event_type=event_type)
 
         try:
-            async with session.begin_nested():
-                log.info("event.processing_started")
-                payload_dict = (
-                    payload
-                    if isinstance(payload, dict)
-                    else (json.loads(payload) if isinstance(payload, str) else {})
+            log.info("event.processing_started")
+            payload_dict = (
+                payload
+                if isinstance(payload, dict)
+                else (json.loads(payload) if isinstance(payload, str) else {})
+            )
+            merchant_id = payload_dict.get("merchant_id", self.merchant_id)
+
+            if event_type == "ORDER_CREATED":
+                await self._handle_order_created(
+                    event_id, order_id, merchant_id, order_status, log
                 )
-                merchant_id = payload_dict.get("merchant_id", self.merchant_id)
 
-                if event_type == "ORDER_CREATED":
-                    enrichment = OrderEnrichmentService()
-                    success, error = await enrichment.enrich_order(
-                        session=session, order_id=order_id, merchant_id=merchant_id
-                    )
-                    if not success:
-                        log.error("event.enrichment_failed", error=error)
-                        raise Exception(f"Enrichment failed: {error}")
-                    log.info("event.order_enriched")
-
-                elif event_type == "ORDER_STATUS_UPDATED":
-                    new_status = payload_dict.get("order_status") or payload_dict.get(
-                        "new_status"
-                    )
+            elif event_type == "ORDER_STATUS_UPDATED":
+                await self._handle_status_updated(
+                    event_id, order_id, merchant_id, payload_dict, log
+                )
 
-                    if new_status:
-                        new_status = new_status.lower().strip()
+            else:
+                log.info("event.ignored", msg="Evento não tratado")
+                async with get_db_session() as session:
+                    await self._mark_processed(session, event_id)
 
-                        raw_event_at = payload_dict.get("created_at") or payload_dict.get(
-                            "timestamp"
-                        )
-                        event_dt = (
-                            datetime.fromisoformat(str(raw_event_at).replace("Z", "+00:00"))
-                            if raw_event_at
-                            else datetime.now()
-                        )
+            return True
 
-                        cancellation_reason = payload_dict.get("cancellation_reason")
-
-                        status_columns = {
-                            "confirmed": "confirmed_at",
-                            "ready": "ready_at",
-                            "released": "released_at",
-                            "waiting_to_catch": "waiting_to_catch_at",
-                            "canceling": "canceling_at",
-                            "canceled": "cancelled_at",
-                            "closed": "closed_at",
-                            "delivered": "delivered_at",
-                        }
-
-                        timestamp_update_query = (
-                            f", {status_columns[new_status]} = :event_dt"
-                            if new_status in status_columns
-                            else ""
-                        )
-                        cancel_update_query = (
-                            ", cancellation_reason = COALESCE(:cancel_reason, cancellation_reason)"
-                            if new_status in ["canceled", "canceling"]
-                            else ""
-                        )
+        except CircuitOpenError:
+            raise
 
-                        await session.execute(
-                            text(f"""
-                                UPDATE orders
-                                SET status = :status,
-                                    updated_at = NOW(),
-                                    status_changed_at = :event_dt
-                                    {timestamp_update_query}
-                                    {cancel_update_query}
-                                WHERE id = :order_id
-                            """),
-                            {
-                                "status": new_status,
-                                "order_id": order_id,
-                                "event_dt": event_dt,
-                                "cancel_reason": cancellation_reason,
-                            },
-                        )
+        except Exception as e:
+            # A transação do evento já sofreu rollback; a falha é registrada à parte
+            log.error("event.processing_failed", error=str(e), exc_info=True)
+            async with get_db_session() as session:
+                await self._mark_failed(session, event_id, str(e))
+            return False
 
-                        if new_status in ["closed"]:
-                            log.info(
-                                "event.final_enrichment",
-                                msg="Pedido atingiu status terminal. Atualizando dados finais",
-                            )
-                            enrichment = OrderEnrichmentService()
-                            await enrichment.enrich_order(
-                                session=session, order_id=order_id, merchant_id=merchant_id
-                            )
-
-                        # 4. Gatilho de Motoboy (API Dashboard)
-                        if new_status == "released":
-                            result = await session.execute(
-                                text("SELECT order_type FROM orders WHERE id = :order_id"),
-                                {"order_id": order_id},
-                            )
-                            row = result.fetchone()
-
-                            if row and row[0] == "delivery":
-                                try:
-                                    log.info(
-                                        "event.fetching_delivery_man",
-                                        msg="Buscando motoboy na API de Dashboard...",
-                                    )
-                                    enrichment = OrderEnrichmentService()
-                                    async with CardapiowebDashboardAPI() as api_dash:
-                                        dashboard_data = await api_dash.get_order_details(
-                                            order_id
-                                        )
-                                        if dashboard_data and not dashboard_data.get(
-                                            "_api_error"
-                                        ):
-                                            await enrichment._update_with_dashboard_data(
-                                                session, order_id, dashboard_data
-                                            )
-                                            log.info(
-                                                "event.delivery_man_updated",
-                                                msg="Motoboy registrado com sucesso.",
-                                            )
-                                except Exception as dash_err:
-                                    log.warning(
-                                        "event.delivery_man_fetch_failed",
-                                        error=str(dash_err),
-                                    )
-
-                        log.info(
-                            "event.status_updated",
-                            new_status=new_status,
-                            event_time=str(event_dt),
-                        )
-                    else:
-                        log.warning("event.missing_new_status", payload=payload_dict)
+    async def _handle_order_created(
+        self,
+        event_id: str,
+        order_id: int,
+        merchant_id: str,
+        order_status: str | None,
+        log,
+    ):
+        enrichment = OrderEnrichmentService()
+        payloads = await enrichment.fetch_order_payloads(
+            order_id, status_hint=order_status
+        )
 
-                else:
-                    log.info("event.ignored", msg="Evento não tratado")
+        async with get_db_session() as session:
+            success, error = await enrichment.persist_order(
+                session=session,
+                order_id=order_id,
+                merchant_id=merchant_id,
+                payloads=payloads,
+            )
+            if not success:
+                log.error("event.enrichment_failed", error=error)
+                raise Exception(f"Enrichment failed: {error}")
+
+            await self._mark_processed(session, event_id)
+
+        log.info("event.order_enriched")
 
+    async def _handle_status_updated(
+        self, event_id: str, order_id: int, merchant_id: str, payload_dict: dict, log
+    ):
+        new_status = payload_dict.get("order_status") or payload_dict.get(
+            "new_status"
+        )
+
+        if not new_status:
+            log.warning("event.missing_new_status", payload=payload_dict)
+            async with get_db_session() as session:
                 await self._mark_processed(session, event_id)
+            return
 
-            return True
+        new_status = new_status.lower().strip()
 
-        except Exception as e:
-            # Se der erro de BD, o rollback daquele webhook acontece silenciosamente
-            # e a transação principal sobrevive para registrar a falha abaixo
-            log.error("event.processing_failed", error=str(e), exc_info=True)
-            await self._mark_failed(session, event_id, str(e))
-            return False
+        raw_event_at = payload_dict.get("created_at") or payload_dict.get("timestamp")
+        event_dt = (
+            datetime.fromisoformat(str(raw_event_at).replace("Z", "+00:00"))
+            if raw_event_at
+            else datetime.now()
+        )
+
+        cancellation_reason = payload_dict.get("cancellation_reason")
+
+        status_columns = {
+            "confirmed": "confirmed_at",
+            "ready": "ready_at",
+            "released": "released_at",
+            "waiting_to_catch": "waiting_to_catch_at",
+            "canceling": "canceling_at",
+            "canceled": "cancelled_at",
+            "closed": "closed_at",
+            "delivered": "delivered_at",
+        }
+
+        timestamp_update_query = (
+            f", {status_columns[new_status]} = :event_dt"
+            if new_status in status_columns
+            else ""
+        )
+        cancel_update_query = (
+            ", cancellation_reason = COALESCE(:cancel_reason, cancellation_reason)"
+            if new_status in ["canceled", "canceling"]
+            else ""
+        )
+
+        # --- FASE 1: I/O externo (fora de transação) ---
+        # Status mudou: payloads em cache deste pedido estão velhos
+        await order_cache.invalidate(order_id)
+
+        enrichment = OrderEnrichmentService()
+        final_payloads = None
+        dashboard_data = None
+
+        if new_status in ["closed"]:
+            log.info(
+                "event.final_enrichment",
+                msg="Pedido atingiu status terminal. Atualizando dados finais",
+            )
+            final_payloads = await enrichment.fetch_order_payloads(order_id)
+
+        # Gatilho de Motoboy (API Dashboard)
+        if new_status == "released":
+            dashboard_data = await self._fetch_delivery_man(order_id, log)
+
+        # --- FASE 2: escrita + baixa no inbox (transação curta) ---
+        async with get_db_session() as session:
+            await session.execute(
+                text(f"""
+                    UPDATE orders
+                    SET status = :status,
+                        updated_at = NOW(),
+                        status_changed_at = :event_dt
+                        {timestamp_update_query}
+                        {cancel_update_query}
+                    WHERE id = :order_id
+                """),
+                {
+                    "status": new_status,
+                    "order_id": order_id,
+                    "event_dt": event_dt,
+                    "cancel_reason": cancellation_reason,
+                },
+            )
+
+            if final_payloads is not None:
+                await enrichment.persist_order(
+                    session=session,
+                    order_id=order_id,
+                    merchant_id=merchant_id,
+                    payloads=final_payloads,
+                )
+
+            if dashboard_data:
+                await enrichment._update_with_dashboard_data(
+                    session, order_id, dashboard_data
+                )
+                log.info(
+                    "event.delivery_man_updated",
+                    msg="Motoboy registrado com sucesso.",
+                )
+
+            await self._mark_processed(session, event_id)
+
+        log.info(
+            "event.status_updated",
+            new_status=new_status,
+            event_time=str(event_dt),
+        )
+
+    async def _fetch_delivery_man(self, order_id: int, log) -> dict | None:
+        """Busca o motoboy na API de Dashboard para pedidos de delivery."""
+        async with get_db_session() as session:
+            result = await session.execute(
+                text("SELECT order_type FROM orders WHERE id = :order_id"),
+                {"order_id": order_id},
+            )
+            row = result.fetchone()
+
+        if not row or row[0] != "delivery":
+            return None
+
+        try:
+            log.info(
+                "event.fetching_delivery_man",
+                msg="Buscando motoboy na API de Dashboard...",
+            )
+            async with CardapiowebDashboardAPI() as api_dash:
+                dashboard_data = await api_dash.get_order_details(order_id)
+
+            if dashboard_data and not dashboard_data.get("_api_error"):
+                return dashboard_data
+        except CircuitOpenError:
+            raise
+        except Exception as dash_err:
+            log.warning(
+                "event.delivery_man_fetch_failed",
+                error=str(dash_err),
+            )
+
+        return None
 
     async def _mark_processed(self, session: AsyncSession, event_id: str):
-        """Marca evento como processado."""
+        """Marca evento como processado (apenas se o lease ainda for deste worker)."""
         await session.execute(
             text("""
                 UPDATE webhook_inbox
                 SET status = 'processed',
                     processed_at = NOW(),
+                    lease_expires_at = NULL,
                     processing_attempts = processing_attempts + 1
                 WHERE event_id = :event_id
+                  AND worker_id = :worker_id
             """),
-            {"event_id": event_id},
+            {"event_id": event_id, "worker_id": self.worker_id},
         )
 
     async def _mark_failed(self, session: AsyncSession, event_id: str, error: str):
-        """Marca evento como falho."""
+        """Marca evento como falho (apenas se o lease ainda for deste worker)."""
         await session.execute(
             text("""
                 UPDATE webhook_inbox
                 SET status = 'failed',
                     last_error = :error,
+                    lease_expires_at = NULL,
                     processing_attempts = processing_attempts + 1,
                     processed_at = NOW()
                 WHERE event_id = :event_id
+                  AND worker_id = :worker_id
             """),
-            {"event_id": event_id, "error": error[:500]},
+            {"event_id": event_id, "error": error[:500], "worker_id": self.worker_id},
         )
 
 
@@ -0,0 +1,21 @@
+# ============================================
+# FIXTURES COMPARTILHADAS - TESTES UNITÁRIOS
+# ============================================
+
+import asyncio
+import time
+
+import pytest
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Relógio falso: asyncio.sleep não espera, só avança o time.monotonic."""
+    now = [1000.0]
+
+    async def fake_sleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return now
@@ -0,0 +1,109 @@
+# ============================================
+# TESTES UNITÁRIOS - CARDAPIOWEB AUTH (RENOVAÇÃO E LOCK)
+# ============================================
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+import src.infrastructure.external.cardapioweb_auth as module
+from src.infrastructure.external.cardapioweb_auth import CardapiowebAuthManager
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = AsyncMock()
+    redis.get_with_ttl.return_value = (None, None)
+    redis.acquire_lock.return_value = "lock-1"
+    monkeypatch.setattr(module, "redis_client", redis)
+    return redis
+
+
+@pytest.fixture
+def auth(monkeypatch):
+    """Instância nova do singleton, com o token semente do .env."""
+    monkeypatch.setattr(CardapiowebAuthManager, "_instance", None)
+    monkeypatch.setattr(module.settings, "cardapioweb_dashboard_api_key", "seed")
+    monkeypatch.setattr(module.settings, "cardapioweb_token_refresh_margin", 300)
+    return CardapiowebAuthManager()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refresh_calls_api_once(auth, redis):
+    release = asyncio.Event()
+
+    async def refresh_with_api():
+        await release.wait()
+        auth._remember("novo", 3600)
+        return "novo"
+
+    auth._refresh_with_api = AsyncMock(side_effect=refresh_with_api)
+
+    tasks = [asyncio.create_task(auth.refresh_tokens()) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert results == ["novo"] * 5
+    assert auth._refresh_with_api.await_count == 1
+    redis.acquire_lock.assert_awaited_once()
+    redis.release_lock.assert_awaited_once_with(auth.REFRESH_LOCK_KEY, "lock-1")
+
+
+@pytest.mark.asyncio
+async def test_refresh_adopts_token_renewed_by_peer(auth, redis):
+    redis.get_with_ttl.return_value = ("do-vizinho", 3600)
+    auth._refresh_with_api = AsyncMock()
+
+    assert await auth.refresh_tokens() == "do-vizinho"
+    assert auth._memory_access_token == "do-vizinho"
+    auth._refresh_with_api.assert_not_awaited()
+    redis.acquire_lock.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_waiting_for_peer_lock_adopts_its_token(fake_clock, auth, redis):
+    redis.acquire_lock.return_value = None
+    # Double check ainda vê o token antigo; após a espera, o vizinho já gravou
+    redis.get_with_ttl.side_effect = [(None, None), ("do-vizinho", 3600)]
+    auth._refresh_with_api = AsyncMock()
+
+    assert await auth.refresh_tokens() == "do-vizinho"
+    auth._refresh_with_api.assert_not_awaited()
+    redis.release_lock.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_hot_path_reads_memory_only(fake_clock, auth, redis):
+    auth._remember("tok", 3600)
+
+    assert await auth.get_valid_access_token() == "tok"
+    redis.get_with_ttl.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_refresher_renews_before_expiry_and_retries_on_failure(
+    fake_clock, auth
+):
+    auth._remember("tok", 3600)
+    renewed_at = []
+
+    async def renew():
+        renewed_at.append(fake_clock[0])
+        if len(renewed_at) == 1:
+            raise Exception("auth fora do ar")
+        if len(renewed_at) == 2:
+            auth._remember("novo", 3600)
+            return "novo"
+        raise asyncio.CancelledError
+
+    auth._renew = AsyncMock(side_effect=renew)
+
+    with pytest.raises(asyncio.CancelledError):
+        await auth.run_refresher()
+
+    # Renova com a margem antes de expirar; a falha espera o retry e tenta de novo
+    assert renewed_at[0] == 1000.0 + 3600 - 300
+    assert renewed_at[1] == renewed_at[0] + module.BACKGROUND_RETRY_SECONDS + 1.0
+    assert renewed_at[2] == renewed_at[1] + 3600 - 300
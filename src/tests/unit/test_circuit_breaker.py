@@ -0,0 +1,111 @@
+# ============================================
+# TESTES UNITÁRIOS - CIRCUIT BREAKER / BACKOFF
+# ============================================
+
+import pytest
+
+import src.infrastructure.external.base_client as base_client
+from src.infrastructure.external.base_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    backoff_delay,
+    get_circuit_breaker,
+    parse_retry_after,
+    wait_for_circuit,
+)
+from src.infrastructure.external.quota_governor import ApiPriority, priority_lane
+
+
+def test_opens_after_threshold_and_fails_fast():
+    """Falhas seguidas abrem o circuito; a próxima chamada nem sai."""
+    breaker = CircuitBreaker("GET /orders/{id}", failure_threshold=3, reset_seconds=60)
+
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.retry_after > 0
+
+
+def test_half_open_allows_single_probe():
+    """Passado o reset, só uma chamada de teste; sucesso fecha o circuito."""
+    breaker = CircuitBreaker("GET /orders/{id}", failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    breaker.reset_seconds = 60
+
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_retry_after_cooldown_opens_immediately():
+    """Retry-After do servidor abre o circuito pelo tempo pedido."""
+    breaker = CircuitBreaker("GET /orders/history", failure_threshold=5, reset_seconds=1)
+    breaker.record_failure(cooldown=120)
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.retry_after > 100
+
+
+def test_numeric_ids_share_endpoint_breaker():
+    first = get_circuit_breaker("GET", "https://api.test", "/v1/company/orders/123")
+    second = get_circuit_breaker("get", "https://api.test", "/v1/company/orders/456")
+    other = get_circuit_breaker("GET", "https://api.test", "/v1/company/cash_flows")
+
+    assert first is second
+    assert first is not other
+
+
+def test_backoff_and_retry_after_parsing():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("not-a-date") is None
+    assert backoff_delay(3, retry_after=2.5) == 2.5
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt) <= 8.0
+
+
+@pytest.mark.asyncio
+async def test_live_lane_does_not_wait_for_circuit(fake_clock):
+    breaker = CircuitBreaker("GET /orders/{id}", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        await wait_for_circuit(breaker)
+    assert fake_clock[0] == 1000.0
+
+
+@pytest.mark.asyncio
+async def test_backfill_lane_waits_circuit_and_resumes(fake_clock):
+    """Fora da raia LIVE a chamada espera o circuito e segue como teste do half-open."""
+    breaker = CircuitBreaker("GET /orders/history", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+
+    with priority_lane(ApiPriority.BACKFILL):
+        await wait_for_circuit(breaker)
+
+    assert fake_clock[0] >= 1030.0
+    assert breaker.state == "half_open"
+
+
+@pytest.mark.asyncio
+async def test_circuit_wait_is_capped(fake_clock, monkeypatch):
+    monkeypatch.setattr(
+        base_client.settings, "cardapioweb_breaker_max_wait_seconds", 5
+    )
+    breaker = CircuitBreaker("GET /orders/history", failure_threshold=1, reset_seconds=60)
+    breaker.record_failure()
+
+    with priority_lane(ApiPriority.RECONCILIATION), pytest.raises(CircuitOpenError):
+        await wait_for_circuit(breaker)
+    assert fake_clock[0] < 1060.0
@@ -0,0 +1,96 @@
+# ============================================
+# TESTES UNITÁRIOS - INBOX BATCH WRITER (GROUP COMMIT)
+# ============================================
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.exc import DataError
+
+import src.core.services.inbox_batch_writer as module
+from src.core.services.inbox_batch_writer import InboxBatchWriter
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Troca a sessão e o INSERT: registra os lotes; `existing` simula o ON CONFLICT."""
+    state = {"batches": [], "existing": set(), "error": None}
+
+    @asynccontextmanager
+    async def fake_session():
+        yield None
+
+    async def fake_insert(session, rows):
+        if state["error"]:
+            raise state["error"]
+        if any(row["event_id"] == "bad" for row in rows):
+            raise DataError("INSERT", {}, ValueError("value too long"))
+        state["batches"].append([row["event_id"] for row in rows])
+        return {row["event_id"] for row in rows} - state["existing"]
+
+    monkeypatch.setattr(module, "get_db_session", fake_session)
+    monkeypatch.setattr(module, "insert_inbox_rows", fake_insert)
+    return state
+
+
+def _row(event_id: str) -> dict:
+    return {"event_id": event_id}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_batches(fake_db):
+    """Chegadas durante o linger entram no mesmo lote, até max_batch_size."""
+    writer = InboxBatchWriter(max_batch_size=2, linger_ms=5)
+
+    results = await asyncio.gather(
+        *(writer.submit(_row(f"evt-{i}")) for i in range(3))
+    )
+
+    assert results == [True, True, True]
+    assert fake_db["batches"] == [["evt-0", "evt-1"], ["evt-2"]]
+
+
+@pytest.mark.asyncio
+async def test_each_caller_gets_its_own_result(fake_db):
+    """Já existente no inbox ou repetido no lote: só a primeira ocorrência é nova."""
+    fake_db["existing"] = {"old"}
+    writer = InboxBatchWriter(max_batch_size=10, linger_ms=5)
+
+    results = await asyncio.gather(
+        writer.submit(_row("new")),
+        writer.submit(_row("old")),
+        writer.submit(_row("new")),
+    )
+
+    assert results == [True, False, False]
+    assert len(fake_db["batches"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_failure_reaches_every_caller(fake_db):
+    fake_db["error"] = RuntimeError("db down")
+    writer = InboxBatchWriter(max_batch_size=10, linger_ms=5)
+
+    results = await asyncio.gather(
+        writer.submit(_row("a")), writer.submit(_row("b")), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_bad_row_fails_only_its_own_caller(fake_db):
+    """Lote rejeitado por dado inválido: regravado linha a linha, só o dono do erro falha."""
+    writer = InboxBatchWriter(max_batch_size=10, linger_ms=5)
+
+    results = await asyncio.gather(
+        writer.submit(_row("a")),
+        writer.submit(_row("bad")),
+        writer.submit(_row("b")),
+        return_exceptions=True,
+    )
+
+    assert results[0] is True and results[2] is True
+    assert isinstance(results[1], DataError)
+    assert fake_db["batches"] == [["a"], ["b"]]
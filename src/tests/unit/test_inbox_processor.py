@@ -0,0 +1,70 @@
+# ============================================
+# TESTES UNITÁRIOS - INBOX PROCESSOR (FALLBACK PARA O SPOOL)
+# ============================================
+
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.exc import DataError, OperationalError
+
+import src.core.services.inbox_processor as module
+from src.core.models.webhook import WebhookEnvelope
+from src.core.services.inbox_processor import InboxProcessor
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    """Redis ok, spool ligado; o INSERT no inbox é configurado por teste."""
+    monkeypatch.setattr(module.settings, "spool_enabled", True)
+    monkeypatch.setattr(module.settings, "inbox_ingestion_mode", "postgres")
+    monkeypatch.setattr(module.settings, "recent_events_filter_enabled", False)
+    monkeypatch.setattr(module, "_backend_down_until", {})
+
+    redis = AsyncMock()
+    redis.claim_event.return_value = True
+    monkeypatch.setattr(module, "redis_client", redis)
+
+    spool = AsyncMock()
+    monkeypatch.setattr(module, "inbox_spool", spool)
+
+    processor = InboxProcessor()
+    return processor, redis, spool
+
+
+def _envelope(event_id: str) -> WebhookEnvelope:
+    return WebhookEnvelope(
+        event_id=event_id, order_id=1, event_type="ORDER_CREATED", merchant_id="6758"
+    )
+
+
+@pytest.mark.asyncio
+async def test_data_error_fails_only_that_webhook(processor):
+    """Dado rejeitado: erro para o provedor reenviar, sem spool e sem marcar o banco fora."""
+    processor, redis, spool = processor
+    processor._write_row = AsyncMock(
+        side_effect=DataError("INSERT", {}, ValueError("value too long"))
+    )
+
+    status, error = await processor.process_webhook(_envelope("bad"), raw_body=b"{}")
+
+    assert status == "error"
+    assert "value too long" in error
+    processor._write_row.assert_awaited_once()
+    spool.append.assert_not_awaited()
+    redis.finalize_event.assert_not_awaited()
+    redis.release_event_lock.assert_awaited_once_with("bad")
+    assert module._backend_available("db") is True
+
+
+@pytest.mark.asyncio
+async def test_connectivity_error_spools_event(processor):
+    processor, redis, spool = processor
+    processor._write_row = AsyncMock(
+        side_effect=OperationalError("INSERT", {}, ConnectionError("db down"))
+    )
+
+    status, _ = await processor.process_webhook(_envelope("evt-1"), raw_body=b"{}")
+
+    assert status == "accepted"
+    spool.append.assert_awaited_once()
+    assert module._backend_available("db") is False
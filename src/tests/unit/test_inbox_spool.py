@@ -0,0 +1,102 @@
+# ============================================
+# TESTES UNITÁRIOS - INBOX SPOOL (APPEND / DRAIN)
+# ============================================
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.exc import DataError
+
+import src.core.services.inbox_spool as module
+from src.core.services.inbox_spool import DEAD_LETTER_FILE, InboxSpool
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Troca a sessão e o INSERT; `fail` simula o banco caindo, `bad` é rejeitado."""
+    state = {"rows": [], "fail": False}
+
+    @asynccontextmanager
+    async def fake_session():
+        yield None
+
+    async def fake_insert(session, rows):
+        if state["fail"]:
+            raise ConnectionError("db down")
+        if any(row["event_id"] == "bad" for row in rows):
+            raise DataError("INSERT", {}, ValueError("value too long"))
+        new = {row["event_id"] for row in rows} - {
+            row["event_id"] for row in state["rows"]
+        }
+        state["rows"].extend(rows)
+        return new
+
+    monkeypatch.setattr(module, "get_db_session", fake_session)
+    monkeypatch.setattr(module, "insert_inbox_rows", fake_insert)
+    return state
+
+
+def _row(event_id: str) -> dict:
+    return {"event_id": event_id, "order_id": 1, "payload": "{}"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_land_in_one_file(tmp_path):
+    spool = InboxSpool(directory=str(tmp_path))
+
+    await asyncio.gather(*(spool.append(_row(f"evt-{i}")) for i in range(5)))
+
+    lines = spool.path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 5
+    assert spool.has_pending() is True
+
+
+@pytest.mark.asyncio
+async def test_drain_replays_rows_and_clears_spool(tmp_path, fake_db):
+    spool = InboxSpool(directory=str(tmp_path))
+    for event_id in ("a", "b", "c"):
+        await spool.append(_row(event_id))
+
+    inserted = await spool.drain_to_inbox(chunk_size=2)
+
+    assert inserted == 3
+    assert [row["event_id"] for row in fake_db["rows"]] == ["a", "b", "c"]
+    assert spool.has_pending() is False
+
+
+@pytest.mark.asyncio
+async def test_failed_drain_is_resumed_and_skips_corrupt_lines(tmp_path, fake_db):
+    """Banco fora: o .draining fica e é retomado; linha truncada é ignorada."""
+    spool = InboxSpool(directory=str(tmp_path))
+    await spool.append(_row("a"))
+    with open(spool.path, "a", encoding="utf-8") as f:
+        f.write('{"event_id": "trunc\n')
+
+    fake_db["fail"] = True
+    with pytest.raises(ConnectionError):
+        await spool.drain_to_inbox()
+    assert spool.has_pending() is True
+
+    fake_db["fail"] = False
+    await spool.append(_row("b"))
+    assert await spool.drain_to_inbox() == 2
+    assert spool.has_pending() is False
+
+
+@pytest.mark.asyncio
+async def test_poison_row_is_dead_lettered_and_drain_completes(tmp_path, fake_db):
+    """Linha rejeitada pelo banco não trava o replay dos eventos bons."""
+    spool = InboxSpool(directory=str(tmp_path))
+    for event_id in ("a", "bad", "b", "c"):
+        await spool.append(_row(event_id))
+
+    inserted = await spool.drain_to_inbox(chunk_size=2)
+
+    assert inserted == 3
+    assert [row["event_id"] for row in fake_db["rows"]] == ["a", "b", "c"]
+    assert spool.has_pending() is False
+
+    dead_letters = (tmp_path / DEAD_LETTER_FILE).read_text(encoding="utf-8").splitlines()
+    assert len(dead_letters) == 1
+    assert '"event_id":"bad"' in dead_letters[0]
@@ -0,0 +1,78 @@
+# ============================================
+# TESTES UNITÁRIOS - INBOX STREAM PERSISTER (DEAD-LETTER)
+# ============================================
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.exc import DataError, OperationalError
+
+import src.core.services.inbox_stream_persister as module
+from src.core.services.inbox_stream_persister import InboxStreamPersister
+
+
+def _entry(entry_id: str, event_id: str, payload: str = "{}") -> tuple[str, dict]:
+    return entry_id, {
+        "event_id": event_id,
+        "order_id": "1",
+        "event_type": "ORDER_STATUS_UPDATED",
+        "order_status": "",
+        "payload": payload,
+    }
+
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    """Sessão falsa; o INSERT rejeita payload com \\u0000 (ou tudo, com `db_down`)."""
+    state = {"inserted": [], "db_down": False}
+
+    @asynccontextmanager
+    async def fake_session():
+        yield None
+
+    async def fake_insert(session, rows):
+        if state["db_down"]:
+            raise OperationalError("INSERT", {}, ConnectionError("db down"))
+        if any("\\u0000" in row["payload"] for row in rows):
+            raise DataError("INSERT", {}, ValueError("unsupported Unicode escape"))
+        state["inserted"].extend(row["event_id"] for row in rows)
+        return {row["event_id"] for row in rows}
+
+    redis = AsyncMock()
+    monkeypatch.setattr(module, "get_db_session", fake_session)
+    monkeypatch.setattr(module, "insert_inbox_rows", fake_insert)
+    monkeypatch.setattr(module, "redis_client", redis)
+    return state, redis
+
+
+@pytest.mark.asyncio
+async def test_poison_entry_goes_to_dead_letter_and_is_acked(fake_backends):
+    state, redis = fake_backends
+    entries = [
+        _entry("1-0", "a"),
+        _entry("1-1", "poison", payload='{"x":"\\u0000"}'),
+        _entry("1-2", "b"),
+    ]
+
+    await InboxStreamPersister()._persist(entries)
+
+    assert state["inserted"] == ["a", "b"]
+    redis.stream_ack.assert_awaited_once()
+    assert redis.stream_ack.await_args.args[2] == ["1-0", "1-1", "1-2"]
+    dead_letter_stream, fields = redis.stream_add.await_args.args
+    assert dead_letter_stream == module.settings.inbox_stream_dead_letter_key
+    assert fields["event_id"] == "poison"
+    assert fields["source_entry_id"] == "1-1"
+
+
+@pytest.mark.asyncio
+async def test_database_outage_keeps_entries_pending(fake_backends):
+    state, redis = fake_backends
+    state["db_down"] = True
+
+    with pytest.raises(OperationalError):
+        await InboxStreamPersister()._persist([_entry("1-0", "a")])
+
+    redis.stream_ack.assert_not_awaited()
+    redis.stream_add.assert_not_awaited()
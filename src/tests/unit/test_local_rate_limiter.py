@@ -0,0 +1,42 @@
+# ============================================
+# TESTES UNITÁRIOS - RATE LIMITER LOCAL
+# ============================================
+
+from src.infrastructure.cache.local_rate_limiter import LocalRateLimiter
+
+
+def test_blocks_only_after_limit_reached():
+    """Só recusa quando este processo já deixou passar o limite inteiro."""
+    limiter = LocalRateLimiter()
+
+    for _ in range(3):
+        assert limiter.is_over_limit("ip", max_requests=3, window_seconds=10) is False
+        limiter.record("ip", window_seconds=10)
+
+    assert limiter.is_over_limit("ip", max_requests=3, window_seconds=10) is True
+    assert limiter.is_over_limit("other_ip", max_requests=3, window_seconds=10) is False
+
+
+def test_window_expiration_resets_counter(monkeypatch):
+    """Janela expirada libera a chave novamente."""
+    import src.infrastructure.cache.local_rate_limiter as module
+
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+
+    limiter = LocalRateLimiter()
+    limiter.record("ip", window_seconds=10)
+    assert limiter.is_over_limit("ip", max_requests=1, window_seconds=10) is True
+
+    now[0] += 10
+    assert limiter.is_over_limit("ip", max_requests=1, window_seconds=10) is False
+
+
+def test_memory_is_bounded():
+    """Número de chaves nunca passa de max_keys."""
+    limiter = LocalRateLimiter(max_keys=10)
+
+    for i in range(100):
+        limiter.record(f"ip-{i}", window_seconds=60)
+
+    assert len(limiter._windows) <= 10
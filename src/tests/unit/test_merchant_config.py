@@ -0,0 +1,91 @@
+# ============================================
+# TESTES UNITÁRIOS - MERCHANT CONFIG (GERAÇÃO E INVALIDAÇÃO)
+# ============================================
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+import src.infrastructure.cache.merchant_config as module
+from src.infrastructure.cache.merchant_config import MerchantConfigCache
+
+SESSION = object()
+
+
+def _configs(name: str) -> dict:
+    return {"m-1": name}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once():
+    cache = MerchantConfigCache()
+    release = asyncio.Event()
+
+    async def slow_load(session):
+        await release.wait()
+        return _configs("loja")
+
+    cache._load = AsyncMock(side_effect=slow_load)
+
+    tasks = [asyncio.create_task(cache.get("m-1", SESSION)) for _ in range(20)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert results == ["loja"] * 20
+    assert cache._load.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_bumps_generation_and_forces_reload():
+    cache = MerchantConfigCache()
+    cache._load = AsyncMock(side_effect=[_configs("antes"), _configs("depois")])
+
+    assert await cache.get("m-1", SESSION) == "antes"
+    assert await cache.get("m-1", SESSION) == "antes"
+    assert cache._load.await_count == 1
+
+    cache.invalidate("m-1")
+    assert cache._generation == 1
+    assert cache._expires_at == 0.0
+
+    assert await cache.get("m-1", SESSION) == "depois"
+    assert cache._load.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_is_not_cached():
+    cache = MerchantConfigCache()
+
+    async def load_then_invalidated(session):
+        # NOTIFY chega enquanto a query ainda está em andamento
+        cache.invalidate("m-1")
+        return _configs("obsoleto")
+
+    loads = [load_then_invalidated, AsyncMock(return_value=_configs("novo"))]
+
+    async def load(session):
+        return await loads.pop(0)(session)
+
+    cache._load = AsyncMock(side_effect=load)
+
+    # O chamador em curso recebe o resultado, mas ele não fica em cache
+    assert await cache.get("m-1", SESSION) == "obsoleto"
+    assert cache._expires_at == 0.0
+
+    assert await cache.get("m-1", SESSION) == "novo"
+    assert cache._load.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry_reloads(fake_clock, monkeypatch):
+    monkeypatch.setattr(module.settings, "merchant_config_ttl", 300)
+    cache = MerchantConfigCache()
+    cache._load = AsyncMock(side_effect=[_configs("antes"), _configs("depois")])
+
+    assert await cache.get("m-1", SESSION) == "antes"
+    fake_clock[0] += 299
+    assert await cache.get("m-1", SESSION) == "antes"
+    fake_clock[0] += 1
+    assert await cache.get("m-1", SESSION) == "depois"
@@ -0,0 +1,92 @@
+# ============================================
+# TESTES UNITÁRIOS - OPERATION DAY RESOLVER
+# ============================================
+
+import asyncio
+from datetime import date, datetime, time
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+
+import src.core.services.operation_day_resolver as module
+from src.core.services.operation_day_resolver import (
+    SAO_PAULO_TZ,
+    OperationDayResolver,
+    logical_date_for,
+)
+from src.infrastructure.cache.merchant_config import MerchantConfig
+
+MERCHANT = MerchantConfig(
+    merchant_id="m1",
+    name="Loja",
+    default_start_time=time(18, 0),
+    default_end_time=time(2, 0),
+    address_lat=Decimal("0"),
+    address_lng=Decimal("0"),
+    distance_threshold_near=None,
+    distance_threshold_medium=None,
+    default_delivery_capacity=None,
+    is_active=True,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio local (São Paulo) controlado pelo teste."""
+    now = [datetime(2024, 5, 10, 20, 0, tzinfo=SAO_PAULO_TZ)]
+
+    class FakeDateTime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now[0]
+
+    monkeypatch.setattr(module, "datetime", FakeDateTime)
+    monkeypatch.setattr(module.merchant_configs, "get", AsyncMock(return_value=MERCHANT))
+    return now
+
+
+def test_overnight_shift_belongs_to_previous_day():
+    assert logical_date_for(MERCHANT, datetime(2024, 5, 11, 1, 30)) == date(2024, 5, 10)
+    assert logical_date_for(MERCHANT, datetime(2024, 5, 11, 2, 30)) == date(2024, 5, 11)
+
+
+@pytest.mark.asyncio
+async def test_same_logical_date_is_served_from_memory(clock):
+    resolver = OperationDayResolver()
+    resolver._cross_boundary = AsyncMock(return_value=7)
+
+    results = await asyncio.gather(*(resolver.resolve("m1") for _ in range(10)))
+
+    # Depois da meia-noite o turno ainda é do dia 10
+    clock[0] = datetime(2024, 5, 11, 1, 0, tzinfo=SAO_PAULO_TZ)
+    assert await resolver.resolve("m1") == 7
+
+    assert results == [7] * 10
+    resolver._cross_boundary.assert_awaited_once_with(MERCHANT, date(2024, 5, 10))
+
+
+@pytest.mark.asyncio
+async def test_date_rollover_crosses_boundary_once(clock):
+    resolver = OperationDayResolver()
+    resolver._cross_boundary = AsyncMock(side_effect=[7, 8])
+
+    assert await resolver.resolve("m1") == 7
+
+    clock[0] = datetime(2024, 5, 11, 18, 30, tzinfo=SAO_PAULO_TZ)
+    assert await resolver.resolve("m1") == 8
+    assert await resolver.resolve("m1") == 8
+
+    assert resolver._cross_boundary.await_count == 2
+    assert resolver._cross_boundary.await_args.args == (MERCHANT, date(2024, 5, 11))
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_new_lookup(clock):
+    resolver = OperationDayResolver()
+    resolver._cross_boundary = AsyncMock(side_effect=[7, 9])
+
+    await resolver.resolve("m1")
+    resolver.invalidate("m1")
+
+    assert await resolver.resolve("m1") == 9
@@ -0,0 +1,68 @@
+# ============================================
+# TESTES UNITÁRIOS - ORDER CACHE (TTL E ESCRITA)
+# ============================================
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+import src.infrastructure.cache.order_cache as module
+from src.infrastructure.cache.order_cache import OrderCache
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    monkeypatch.setattr(module.settings, "order_cache_enabled", True)
+    redis = AsyncMock()
+    redis.get_json.return_value = None
+    monkeypatch.setattr(module, "redis_client", redis)
+    return redis
+
+
+def test_ttl_follows_status_per_resource():
+    """Dashboard aninha o pedido em data/order; o status final vale nos dois formatos."""
+    cache = OrderCache()
+    terminal = module.settings.order_cache_terminal_ttl
+    active = module.settings.order_cache_active_ttl
+
+    assert cache.ttl_for("partner", {"status": "closed"}) == terminal
+    assert cache.ttl_for("partner", {"status": "released"}) == active
+    assert cache.ttl_for("dashboard", {"data": {"status": "Canceled"}}) == terminal
+    assert cache.ttl_for("dashboard", {"order": {"status": "closed"}}) == terminal
+    assert cache.ttl_for("dashboard", {"data": {"status": "dispatched"}}) == active
+    assert cache.ttl_for("dashboard", {"delivery": {}}) == active
+
+
+@pytest.mark.asyncio
+async def test_miss_stores_payload_with_status_ttl(redis):
+    payload = {"data": {"status": "closed"}}
+
+    result = await OrderCache().read_through(
+        "dashboard", 42, AsyncMock(return_value=payload)
+    )
+
+    assert result == payload
+    redis.set_json.assert_awaited_once_with(
+        "cw:cache:dashboard:order:42", payload, module.settings.order_cache_terminal_ttl
+    )
+
+
+@pytest.mark.asyncio
+async def test_api_error_fallback_is_not_cached(redis):
+    fallback = {"_api_error": True, "_fallback": True, "id": 42}
+
+    result = await OrderCache().read_through(
+        "partner", 42, AsyncMock(return_value=fallback)
+    )
+
+    assert result == fallback
+    redis.set_json.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_hit_skips_fetch(redis):
+    redis.get_json.return_value = {"status": "closed"}
+    fetch = AsyncMock()
+
+    assert await OrderCache().read_through("partner", 42, fetch) == {"status": "closed"}
+    fetch.assert_not_awaited()
@@ -0,0 +1,137 @@
+# ============================================
+# TESTES UNITÁRIOS - ORDER ENRICHMENT (GRAVAÇÃO)
+# ============================================
+
+from contextlib import asynccontextmanager
+from datetime import time
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+
+import src.core.services.order_enrichment as module
+from src.core.services.order_enrichment import OrderEnrichmentService
+from src.infrastructure.cache.merchant_config import MerchantConfig
+
+ORDER_DATA = {
+    "status": "closed",
+    "order_type": "delivery",
+    "total_value": 42.5,
+    "items": [{"item_id": 1, "name": "X-Burger", "quantity": 1}],
+    "payments": [{"payment_method": "Pix", "total": 42.5}],
+}
+
+
+MERCHANT = MerchantConfig(
+    merchant_id="m1",
+    name="Loja",
+    default_start_time=time(18, 0),
+    default_end_time=time(2, 0),
+    address_lat=Decimal("0"),
+    address_lng=Decimal("0"),
+    distance_threshold_near=None,
+    distance_threshold_medium=None,
+    default_delivery_capacity=None,
+    is_active=True,
+)
+
+
+class FakeSession:
+    """Só o savepoint: o SQL fica nos métodos mockados do serviço."""
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+
+@pytest.fixture
+def service():
+    service = OrderEnrichmentService()
+    service._replace_relations = AsyncMock()
+    service._count_write = AsyncMock()
+    return service
+
+
+def test_content_hash_ignores_key_order_and_tracks_changes(service):
+    reordered = dict(reversed(list(ORDER_DATA.items())))
+    changed = {**ORDER_DATA, "status": "canceled"}
+
+    base = service._content_hash(ORDER_DATA, 1.2, "near")
+
+    assert service._content_hash(reordered, 1.2, "near") == base
+    assert service._content_hash(changed, 1.2, "near") != base
+    assert service._content_hash(ORDER_DATA, 3.4, "medium") != base
+
+
+@pytest.mark.asyncio
+async def test_unchanged_order_skips_relations_rewrite(service):
+    """Upsert sem linha gravada (hash igual): itens e pagamentos ficam como estão."""
+    service._upsert_orders = AsyncMock(return_value=set())
+
+    await service._insert_order(None, 10, "m1", 1, ORDER_DATA, None, None)
+
+    service._replace_relations.assert_not_awaited()
+    service._count_write.assert_awaited_once_with("skipped")
+
+
+@pytest.mark.asyncio
+async def test_changed_order_rewrites_relations(service):
+    service._upsert_orders = AsyncMock(return_value={10})
+
+    await service._insert_order(None, 10, "m1", 1, ORDER_DATA, None, None)
+
+    service._replace_relations.assert_awaited_once_with(None, [(10, ORDER_DATA)])
+    service._count_write.assert_awaited_once_with("written")
+
+
+@pytest.fixture
+def batch_service(service, monkeypatch):
+    """Página com 3 pedidos; o pedido 3 falha na API."""
+    monkeypatch.setattr(module.merchant_configs, "get", AsyncMock(return_value=MERCHANT))
+
+    async def fetch(order_id, status_hint=None):
+        if order_id == 3:
+            raise RuntimeError("timeout")
+        return {"id": order_id, "status": "closed"}, None
+
+    service.fetch_order_payloads = fetch
+    return service
+
+
+PAGE = [{"id": 1, "status": "closed"}, {"id": 2, "status": "closed"}, {"id": 3}]
+
+
+@pytest.mark.asyncio
+async def test_batch_writes_page_set_based(batch_service):
+    batch_service._upsert_orders = AsyncMock(return_value={1})
+    batch_service.persist_order = AsyncMock()
+
+    failures = await batch_service.enrich_orders(
+        FakeSession(), PAGE, "m1", operation_day_id=5
+    )
+
+    assert set(failures) == {3}
+    rows = batch_service._upsert_orders.await_args.args[1]
+    assert [row["id"] for row in rows] == [1, 2]
+    # Só o pedido que mudou tem itens/pagamentos regravados
+    assert [order_id for order_id, _ in batch_service._replace_relations.await_args.args[1]] == [1]
+    batch_service.persist_order.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_falls_back_to_per_order(batch_service):
+    """Lote rejeitado pelo banco: cada pedido é gravado sozinho, falhas isoladas."""
+    batch_service._upsert_orders = AsyncMock(side_effect=RuntimeError("deadlock"))
+
+    async def persist(session, order_id, merchant_id, payloads, operation_day_id=None):
+        assert operation_day_id == 5
+        return (True, None) if order_id == 1 else (False, "bad row")
+
+    batch_service.persist_order = AsyncMock(side_effect=persist)
+
+    failures = await batch_service.enrich_orders(
+        FakeSession(), PAGE, "m1", operation_day_id=5
+    )
+
+    assert failures == {2: "bad row", 3: "timeout"}
+    assert batch_service.persist_order.await_count == 2
@@ -0,0 +1,55 @@
+# ============================================
+# TESTES UNITÁRIOS - PAGINAÇÃO (FALHA NÃO É FIM DOS DADOS)
+# ============================================
+
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.infrastructure.external.base_client import PageFetchError
+from src.infrastructure.external.cardapioweb_dashboard import CardapiowebDashboardAPI
+from src.infrastructure.external.cardapioweb_public import _parse_history_page
+
+
+async def _collect(iterator) -> list:
+    return [items async for items in iterator]
+
+
+def test_history_error_page_raises():
+    with pytest.raises(PageFetchError):
+        _parse_history_page({"_api_error": True}, 2)
+
+    orders, has_more = _parse_history_page(
+        {"orders": [{"id": 1}], "pagination": {"current_page": 1, "total_pages": 2}}, 1
+    )
+    assert orders == [{"id": 1}] and has_more is True
+
+
+@pytest.mark.asyncio
+async def test_cash_flow_failed_page_raises_instead_of_truncating():
+    api = CardapiowebDashboardAPI()
+    api._execute_with_auth = AsyncMock(side_effect=[[{"id": 2}, {"id": 1}], None])
+
+    with pytest.raises(PageFetchError) as exc_info:
+        await _collect(api.iter_cash_flow_pages("6758"))
+    assert exc_info.value.page == 2
+
+
+@pytest.mark.asyncio
+async def test_cash_flow_empty_page_ends_iteration():
+    api = CardapiowebDashboardAPI()
+    api._execute_with_auth = AsyncMock(side_effect=[{"data": [{"id": 1}]}, []])
+
+    assert await _collect(api.iter_cash_flow_pages("6758")) == [[{"id": 1}]]
+
+
+@pytest.mark.asyncio
+async def test_delivery_man_failed_page_raises():
+    api = CardapiowebDashboardAPI()
+    api._execute_with_auth = AsyncMock(side_effect=[[{"id": i} for i in range(100)], None])
+
+    with pytest.raises(PageFetchError):
+        await _collect(
+            api.iter_orders_by_delivery_man(7, datetime(2024, 5, 1), datetime(2024, 5, 2))
+        )
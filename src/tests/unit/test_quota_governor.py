@@ -0,0 +1,107 @@
+# ============================================
+# TESTES UNITÁRIOS - QUOTA GOVERNOR (RAIAS E REFILL)
+# ============================================
+
+import pytest
+
+import src.infrastructure.external.quota_governor as module
+from src.infrastructure.external.quota_governor import (
+    ApiPriority,
+    LocalTokenBucket,
+    QuotaGovernor,
+    SharedLane,
+    priority_lane,
+    shared_lane,
+)
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    """Governor sem Redis: cai no bucket local (6 tokens, 1 token/s)."""
+
+    async def redis_down(*args, **kwargs):
+        raise ConnectionError("redis offline")
+
+    monkeypatch.setattr(module.redis_client, "reserve_tokens", redis_down)
+    monkeypatch.setitem(module.QUOTA_BUCKETS, "test", lambda: 60)
+    return QuotaGovernor()
+
+
+def test_local_bucket_refills_up_to_capacity(fake_clock):
+    bucket = LocalTokenBucket(capacity=5, refill_per_second=1)
+    for _ in range(5):
+        assert bucket.reserve() == (True, 0.0)
+
+    fake_clock[0] += 2
+    assert bucket.reserve() == (True, 0.0)
+    assert bucket.tokens == pytest.approx(1)
+
+    fake_clock[0] += 60
+    bucket.reserve()
+    assert bucket.tokens == pytest.approx(4)
+
+
+def test_live_reserves_below_zero_and_waits_its_turn(fake_clock):
+    """LIVE sempre reserva; o saldo negativo vira a espera na fila."""
+    bucket = LocalTokenBucket(capacity=1, refill_per_second=0.5)
+    assert bucket.reserve() == (True, 0.0)
+
+    reserved, wait = bucket.reserve()
+    assert reserved is True
+    assert wait == pytest.approx(2.0)
+
+
+def test_lane_floor_keeps_headroom(fake_clock):
+    """Com piso, a raia não reserva e recebe o tempo até haver sobra acima dele."""
+    bucket = LocalTokenBucket(capacity=10, refill_per_second=1)
+    for _ in range(7):
+        bucket.reserve(floor=2)
+
+    reserved, wait = bucket.reserve(floor=2)
+    assert reserved is True
+    assert bucket.tokens == pytest.approx(2)
+
+    reserved, wait = bucket.reserve(floor=2)
+    assert reserved is False
+    assert wait == pytest.approx(1.0)
+    assert bucket.tokens == pytest.approx(2)
+
+    # LIVE ignora o piso
+    assert bucket.reserve()[0] is True
+
+
+@pytest.mark.asyncio
+async def test_backfill_leaves_half_the_bucket_for_live(governor, fake_clock):
+    """Backfill para no piso (50% de capacity - 1); LIVE ainda passa na hora."""
+    with priority_lane(ApiPriority.BACKFILL):
+        for _ in range(3):
+            await governor.acquire("test")
+    assert fake_clock[0] == 1000.0
+
+    with priority_lane(ApiPriority.BACKFILL):
+        await governor.acquire("test")
+    assert fake_clock[0] > 1000.0
+
+    started = fake_clock[0]
+    await governor.acquire("test")
+    assert fake_clock[0] == started
+
+
+@pytest.mark.asyncio
+async def test_promoted_shared_lane_stops_waiting_for_floor(governor, fake_clock):
+    """Chamada compartilhada promovida a LIVE deixa de respeitar o piso do backfill."""
+    bucket = LocalTokenBucket(capacity=6, refill_per_second=1)
+    bucket.tokens = 0
+    governor._local_buckets["test"] = bucket
+
+    lane = SharedLane(ApiPriority.BACKFILL)
+    token = shared_lane.set(lane)
+    try:
+        with priority_lane(ApiPriority.BACKFILL):
+            lane.promote(ApiPriority.LIVE)
+            await governor.acquire("test")
+    finally:
+        shared_lane.reset(token)
+
+    # Esperou só pelo próprio token, não pelo piso de 2.5 tokens
+    assert fake_clock[0] == pytest.approx(1001.0)
@@ -0,0 +1,49 @@
+# ============================================
+# TESTES UNITÁRIOS - RECENT EVENTS (ROTAÇÃO DE GERAÇÕES)
+# ============================================
+
+from src.infrastructure.cache.recent_events import RecentEventFilter
+
+
+def test_event_survives_one_rotation_and_is_evicted_after_two(fake_clock):
+    recent = RecentEventFilter(ttl_seconds=60, max_entries=100)
+    recent.add("evt-1")
+    assert recent.contains("evt-1")
+
+    # Primeira rotação por TTL: o id passa para a geração anterior
+    fake_clock[0] += 60
+    assert recent.contains("evt-1")
+
+    # Segunda rotação: a geração anterior é descartada
+    fake_clock[0] += 60
+    assert not recent.contains("evt-1")
+
+
+def test_rotation_before_ttl_does_not_evict(fake_clock):
+    recent = RecentEventFilter(ttl_seconds=60, max_entries=100)
+    recent.add("evt-1")
+
+    fake_clock[0] += 59
+    assert recent.contains("evt-1")
+    assert "evt-1" in recent._current
+
+
+def test_full_generation_rotates_and_bounds_memory(fake_clock):
+    recent = RecentEventFilter(ttl_seconds=60, max_entries=4)
+    assert recent.generation_size == 2
+
+    recent.add("evt-1")
+    recent.add("evt-2")
+    # Geração atual cheia: o próximo add rotaciona sem esperar o TTL
+    recent.add("evt-3")
+    assert recent._previous == {"evt-1", "evt-2"}
+    assert recent._current == {"evt-3"}
+    assert recent.contains("evt-1")
+
+    recent.add("evt-4")
+    recent.add("evt-5")
+    assert not recent.contains("evt-1")
+    assert not recent.contains("evt-2")
+    assert recent.contains("evt-3")
+    assert recent.contains("evt-5")
+    assert len(recent._current) + len(recent._previous) <= 4
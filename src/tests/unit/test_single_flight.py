@@ -0,0 +1,106 @@
+# ============================================
+# TESTES UNITÁRIOS - SINGLE FLIGHT
+# ============================================
+
+import asyncio
+
+import pytest
+
+from src.infrastructure.external.quota_governor import (
+    ApiPriority,
+    current_priority,
+    priority_lane,
+)
+from src.infrastructure.external.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    results = await asyncio.gather(*(flights.do(("order", 1), fetch) for _ in range(5)))
+
+    assert calls == 1
+    assert all(result == {"id": 1} for result in results)
+    assert flights._in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_exception_is_shared_and_not_cached():
+    flights = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flights.do("k", fetch), flights.do("k", fetch), return_exceptions=True
+    )
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    with pytest.raises(RuntimeError):
+        await flights.do("k", fetch)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    """shield: o chamador cancelado sai, os demais recebem o resultado."""
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "ok"
+
+    first = asyncio.create_task(flights.do("k", fetch))
+    second = asyncio.create_task(flights.do("k", fetch))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "ok"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_shared_call_runs_in_most_urgent_waiters_lane():
+    """Backfill começa o voo; um chamador LIVE que entra promove a chamada."""
+    flights = SingleFlight()
+    started = asyncio.Event()
+    proceed = asyncio.Event()
+    seen = []
+
+    async def fetch():
+        seen.append(current_priority())
+        started.set()
+        await proceed.wait()
+        seen.append(current_priority())
+        return "ok"
+
+    async def backfill_caller():
+        with priority_lane(ApiPriority.BACKFILL):
+            return await flights.do("k", fetch)
+
+    backfill = asyncio.create_task(backfill_caller())
+    await started.wait()
+
+    live = asyncio.create_task(flights.do("k", fetch))
+    await asyncio.sleep(0)
+    proceed.set()
+
+    assert await asyncio.gather(backfill, live) == ["ok", "ok"]
+    assert seen == [ApiPriority.BACKFILL, ApiPriority.LIVE]
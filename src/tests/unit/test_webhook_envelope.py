@@ -0,0 +1,61 @@
+# ============================================
+# TESTES UNITÁRIOS - FAST PATH DO WEBHOOK
+# ============================================
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from src.core.models.webhook import WebhookEnvelope
+
+
+def test_envelope_extracts_only_routing_fields():
+    """Extrai os campos de roteamento e ignora o resto do corpo."""
+    body = json.dumps(
+        {
+            "event_id": "evt_001",
+            "order_id": 12345,
+            "event_type": "order_created",
+            "merchant_id": "6758",
+            "order_status": "pending",
+            "customer": {"name": "Fulano"},
+        }
+    ).encode()
+
+    envelope = WebhookEnvelope.model_validate_json(body)
+
+    assert envelope.event_id == "evt_001"
+    assert envelope.order_id == 12345
+    assert envelope.event_type == "ORDER_CREATED"
+    assert envelope.order_status == "pending"
+    assert not hasattr(envelope, "customer")
+
+
+def test_envelope_rejects_missing_event_id():
+    """Sem event_id não há idempotência: payload inválido."""
+    body = b'{"order_id": 1, "event_type": "ORDER_CREATED", "merchant_id": 1}'
+
+    with pytest.raises(ValidationError):
+        WebhookEnvelope.model_validate_json(body)
+
+
+def test_envelope_rejects_malformed_json():
+    """JSON quebrado vira ValidationError (400), nunca chega ao inbox."""
+    with pytest.raises(ValidationError):
+        WebhookEnvelope.model_validate_json(b'{"event_id": "evt_001",')
+
+
+def test_envelope_rejects_event_id_longer_than_inbox_column():
+    """event_id maior que VARCHAR(30) é recusado na validação (4xx), antes do lote."""
+    body = json.dumps(
+        {
+            "event_id": "x" * 31,
+            "order_id": 1,
+            "event_type": "ORDER_CREATED",
+            "merchant_id": "6758",
+        }
+    ).encode()
+
+    with pytest.raises(ValidationError):
+        WebhookEnvelope.model_validate_json(body)
@@ -0,0 +1,54 @@
+# ============================================
+# TESTES UNITÁRIOS - LISTEN DO WORKER
+# ============================================
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import src.tasks.worker as module
+from src.tasks.worker import WebhookWorker
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    invalidate = MagicMock()
+    monkeypatch.setattr(module.merchant_configs, "invalidate", invalidate)
+
+    worker = WebhookWorker()
+    worker.listen_enabled = True
+    worker.listener = MagicMock(is_connected=False)
+    worker.listener.connect = AsyncMock()
+    return worker, invalidate
+
+
+@pytest.mark.asyncio
+async def test_connect_invalidates_configs_missed_while_offline(worker):
+    worker, invalidate = worker
+
+    await worker._ensure_listener()
+
+    worker.listener.connect.assert_awaited_once()
+    invalidate.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_failed_connect_backs_off_before_retrying(worker):
+    worker, invalidate = worker
+    worker.listener.connect.side_effect = OSError("connection refused")
+
+    await worker._ensure_listener()
+    await worker._ensure_listener()
+
+    worker.listener.connect.assert_awaited_once()
+    invalidate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_connected_listener_is_left_alone(worker):
+    worker, invalidate = worker
+    worker.listener.is_connected = True
+
+    await worker._ensure_listener()
+
+    worker.listener.connect.assert_not_awaited()
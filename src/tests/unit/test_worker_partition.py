@@ -0,0 +1,62 @@
+# ============================================
+# TESTES UNITÁRIOS - PARTIÇÃO DO WORKER (CIRCUITO ABERTO)
+# ============================================
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.infrastructure.external.base_client import CircuitOpenError
+from src.tasks.worker import WebhookWorker
+
+
+def _worker(process_results: list) -> WebhookWorker:
+    worker = WebhookWorker()
+    worker.running = True
+    worker._process_event = AsyncMock(side_effect=process_results)
+    worker._defer_events = AsyncMock()
+    return worker
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_defers_rest_of_partition():
+    """Circuito aberto adia o evento atual e os seguintes do pedido, em ordem."""
+    error = CircuitOpenError("GET /orders/{id}", retry_after=30)
+    worker = _worker([True, error])
+    events = [("evt-1",), ("evt-2",), ("evt-3",)]
+
+    processed = await worker._process_partition(events, asyncio.Semaphore(1))
+
+    assert processed == 1
+    assert worker._process_event.await_count == 2
+    worker._defer_events.assert_awaited_once_with(["evt-2", "evt-3"], error)
+
+
+@pytest.mark.asyncio
+async def test_partition_without_open_circuit_does_not_defer():
+    worker = _worker([True, False, True])
+    events = [("evt-1",), ("evt-2",), ("evt-3",)]
+
+    processed = await worker._process_partition(events, asyncio.Semaphore(1))
+
+    assert processed == 2
+    worker._defer_events.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_batch_count_ignores_cancelled_partitions():
+    """Partição cancelada (BaseException) é registrada, não somada à contagem."""
+    worker = WebhookWorker()
+    worker.running = True
+    worker._claim_pending = AsyncMock(return_value=[("evt-1", 1), ("evt-2", 2)])
+    worker._lease_heartbeat = AsyncMock()
+
+    async def partition(events, semaphore):
+        if events[0][0] == "evt-2":
+            raise asyncio.CancelledError()
+        return 1
+
+    worker._process_partition = partition
+
+    assert await worker._process_batch() == 1